@@ -0,0 +1,105 @@
+# alignment.py
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from configuration import Config
+from utils import calculate_ema, interval_to_seconds
+
+def _sma(closes, period):
+    return pd.Series(closes, dtype=float).rolling(period).mean().to_numpy()
+
+# Indicators computed on a timeframe's closes: name -> fn(closes, period)
+INDICATORS = {
+    'EMA': calculate_ema,
+    'SMA': _sma,
+}
+
+def _ns(times):
+    return pd.DatetimeIndex(times).as_unit('ns').asi8
+
+def visible_rows(entry_times, entry_interval, htf_times, htf_interval):
+    """
+    Row of the last higher timeframe candle that has CLOSED by the close of
+    every entry candle (-1 = none yet). Both take candle OPEN times.
+    The strategy decides at the close of the entry candle, so a 1H candle
+    opened at 10:00 is first visible on the 5m candle 10:55 - 11:00.
+    """
+    entry_close = _ns(entry_times) + interval_to_seconds(entry_interval) * 10**9
+    htf_close = _ns(htf_times) + interval_to_seconds(htf_interval) * 10**9
+    return np.searchsorted(htf_close, entry_close, side='right') - 1
+
+def take_rows(values, rows):
+    """values[rows] with NaN where rows == -1."""
+    out = np.asarray(values, dtype=float)[np.maximum(rows, 0)]
+    out[rows < 0] = np.nan
+    return out
+
+class TimeframeAligner:
+    """
+    Aligns any number of higher timeframes, each with its own indicators,
+    onto the entry timeframe. Every entry candle only sees higher timeframe
+    candles that had closed by its own close (no lookahead), mapped with one
+    searchsorted per timeframe instead of DataFrame merges.
+
+    Indicator arrays and row mappings are cached by (timeframe, spec, data
+    hash), so re-aligning the same data, or adding one more timeframe, only
+    computes what is new.
+    """
+
+    def __init__(self, entry_tf=None, cache_size=None):
+        self.entry_tf = entry_tf or Config.TF_ENTRY
+        self.cache_size = cache_size or Config.ALIGNMENT_CACHE_SIZE
+        self._cache = OrderedDict()
+
+    @staticmethod
+    def digest(*arrays):
+        h = hashlib.blake2b(digest_size=16)
+        for arr in arrays:
+            h.update(np.ascontiguousarray(arr).view(np.uint8))
+        return h.hexdigest()
+
+    def _cached(self, key, build):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        value = self._cache[key] = build()
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    def indicator(self, closes, name, period, data_hash):
+        """One indicator on one timeframe's closes."""
+        return self._cached(('indicator', name, period, data_hash), lambda: INDICATORS[name](closes, period))
+
+    def rows(self, entry_times, entry_hash, tf, htf_times, htf_hash):
+        return self._cached(('rows', self.entry_tf, entry_hash, tf, htf_hash),
+                            lambda: visible_rows(entry_times, self.entry_tf, htf_times, tf))
+
+    def align(self, df_entry, frames, indicators=None):
+        """
+        df_entry: entry timeframe candles indexed by open time.
+        frames:   {timeframe: candles indexed by open time}, e.g. {'1h': df_1h, '4h': df_4h}
+        indicators: {timeframe: [(name, period), ...]}, Config.TIMEFRAME_INDICATORS by default.
+        Returns the entry candles (Open/High/Low/Close/...) plus Close_<tf> and
+        <NAME>_<period>_<tf> per timeframe, NaN until the first closed value.
+        """
+        indicators = Config.TIMEFRAME_INDICATORS if indicators is None else indicators
+        df = df_entry.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close'})
+        entry_times = df.index.as_unit('ns').asi8
+        entry_hash = self.digest(entry_times)
+
+        columns = {}
+        for tf, htf in frames.items():
+            htf_times = htf.index.as_unit('ns').asi8
+            closes = htf['close' if 'close' in htf else 'Close'].to_numpy(dtype=float)
+            htf_hash = self.digest(htf_times, closes)
+            rows = self.rows(entry_times, entry_hash, tf, htf_times, htf_hash)
+
+            columns[f'Close_{tf}'] = take_rows(closes, rows)
+            for name, period in indicators.get(tf, ()):
+                columns[f'{name}_{period}_{tf}'] = take_rows(self.indicator(closes, name, period, htf_hash), rows)
+        return df.assign(**columns)
+
+# Shared by calculate_indicators, so repeated calls on the same data hit the cache
+ALIGNER = TimeframeAligner()
@@ -0,0 +1,279 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from configuration import Config
+from strategy import BiTimeframeStrategy
+from backtest_runner import CustomBacktester
+from indicators import IncrementalIndicators
+from live_runner import BinanceClient
+from utils import calculate_indicators, setup_logger
+
+logger = setup_logger('Benchmarks')
+
+# History lengths benchmarked, in days of 5m bars
+SIZES = {'1M': 30, '6M': 182, '1Y': 365, '5Y': 1825, '10Y': 3650}
+# Per-bar (scalar) stages are O(1) per bar, so they are timed on at most this many bars
+SCALAR_BARS = 50000
+LIVE_CYCLES = 300
+
+def _exit_loop(direction, sl, tp, lows, highs, start):
+    """Reference bar-by-bar exit search (the pre-vectorization behaviour)."""
+    for j in range(start, len(lows)):
+        reason = BiTimeframeStrategy.check_exit(direction, sl, tp, lows[j], highs[j])
+        if reason:
+            return j, reason
+    return None, None
+
+def bench_exit_resolution(data, target_scales=(1, 5, 20)):
+    """
+    Times resolve_exit against the bar-by-bar check_exit loop for every
+    signal in the dataset and checks both give the same exits. Like
+    StrategyKernel.manage_position the search starts at the entry bar.
+    Scale 1 is the strategy's own SL/TP distance, larger target_scales
+    widen SL/TP around the entry to emulate longer holds.
+    """
+    arrays = [data[c].values for c in ['Open', 'High', 'Low', 'Close', 'Close_1h', f'EMA_{Config.EMA_PERIOD}_1h']]
+    opens, highs, lows = arrays[0], arrays[1], arrays[2]
+    signals, sls, tps = BiTimeframeStrategy.get_signals_batch(*arrays)
+    candidates = np.flatnonzero(signals)
+
+    results = {}
+    logger.info("-" * 40)
+    logger.info(f"EXIT RESOLUTION ({len(data)} bars, {len(candidates)} entries)")
+    for scale in target_scales:
+        entries = [('BUY' if signals[i] == 1 else 'SELL',
+                    opens[i] - (opens[i] - sls[i]) * scale,
+                    opens[i] + (tps[i] - opens[i]) * scale,
+                    i) for i in candidates]
+
+        t0 = time.perf_counter()
+        expected = [_exit_loop(d, sl, tp, lows, highs, s) for d, sl, tp, s in entries]
+        loop_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        resolved = [BiTimeframeStrategy.resolve_exit(d, sl, tp, lows, highs, start=s) for d, sl, tp, s in entries]
+        vector_time = time.perf_counter() - t0
+
+        if resolved != expected:
+            raise AssertionError(f"resolve_exit disagrees with the check_exit loop (scale {scale})")
+
+        results[scale] = (loop_time, vector_time)
+        holds = [(len(lows) if j is None else j) - s for (j, _), (_, _, _, s) in zip(expected, entries)]
+        logger.info(f"   SL/TP x{scale:<3}: loop {loop_time:.3f}s | resolve_exit {vector_time:.3f}s | "
+                    f"speedup {loop_time / vector_time:.1f}x | median hold {np.median(holds):.0f} bars")
+    logger.info("-" * 40)
+    return results
+
+# --- SUITE ---
+
+def synthetic_candles(days, seed=0, start='2020-01-01'):
+    """
+    Random-walk 5m OHLCV for `days` days and the matching 1H candles
+    (resampled from it), laid out like the CSV exports. Deterministic per seed.
+    """
+    rng = np.random.default_rng(seed)
+    n = days * 24 * 12
+    closes = 20000 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    opens = np.concatenate([[20000.0], closes[:-1]])
+    wicks = np.abs(rng.normal(0, 0.001, (2, n)))
+    index = pd.date_range(start, periods=n, freq='5min', name='timestamp')
+    df_5m = pd.DataFrame({
+        'open': opens,
+        'high': np.maximum(opens, closes) * (1 + wicks[0]),
+        'low': np.minimum(opens, closes) * (1 - wicks[1]),
+        'close': closes,
+        'volume': rng.uniform(1, 100, n),
+    }, index=index)
+    df_1h = df_5m.resample('1h').agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+    return df_5m, df_1h
+
+class _OfflineSession:
+    """Stands in for the market-data HttpSession: serves prepared kline payloads."""
+
+    def __init__(self):
+        self.klines = {}
+
+    def get(self, path, params=None, weight=1, timeout=None):
+        return self.klines[params['interval']]
+
+def _kline_rows(df):
+    """Rows in the /klines response layout (numbers as strings, like the exchange)."""
+    ms = df.index.as_unit('ms').asi8
+    return [[int(t), str(o), str(h), str(l), str(c), '0', int(t) + 1, '0', 0, '0', '0', '0']
+            for t, o, h, l, c in zip(ms, df['open'], df['high'], df['low'], df['close'])]
+
+def _live_cycles(df_5m, df_1h, cycles):
+    """
+    The CPU side of one run_live cycle, repeated `cycles` times: parse the
+    two kline responses, push the new candles into the incremental state,
+    read the closed candle and check for a signal. The exchange is replaced
+    by an offline session, no network is used.
+    """
+    seed_bars = Config.LIVE_HISTORY_LIMIT * 12
+    state = IncrementalIndicators.seed(df_5m.iloc[:seed_bars], df_1h[df_1h.index < df_5m.index[seed_bars]])
+    client = BinanceClient()
+    client.data = _OfflineSession()
+
+    # Each cycle sees the last closed candles plus the forming one
+    first, last = seed_bars - 1, seed_bars + cycles + 1
+    hours = df_1h.index.searchsorted(df_5m.index[first:last], side='right')
+    first_1h = hours[0] - 2
+    rows_5m, rows_1h = _kline_rows(df_5m.iloc[first:last]), _kline_rows(df_1h.iloc[first_1h:hours[-1] + 1])
+    hours -= first_1h
+    payloads = [(rows_5m[k - 1:k + 2], rows_1h[hours[k] - 2:hours[k] + 1]) for k in range(1, cycles + 1)]
+
+    t0 = time.perf_counter()
+    for rows_5m, rows_1h in payloads:
+        client.data.klines = {Config.TF_ENTRY: rows_5m, Config.TF_FILTER: rows_1h}
+        new_5m = client.get_klines(Config.SYMBOL, Config.TF_ENTRY, limit=3)
+        new_1h = client.get_klines(Config.SYMBOL, Config.TF_FILTER, limit=3)
+        state.update(new_5m.iloc[:-1], new_1h.iloc[:-1])
+        state.last_closed()
+        BiTimeframeStrategy.get_signal(*state.signal_inputs(new_5m['Open'].iloc[-1]))
+    return time.perf_counter() - t0
+
+def _stages(df_5m, df_1h):
+    """(name, bars processed, callable) for every benchmarked stage."""
+    data = calculate_indicators(df_5m, df_1h).dropna()
+    arrays = [data[c].to_numpy() for c in ['Open', 'High', 'Low', 'Close', 'Close_1h', f'EMA_{Config.EMA_PERIOD}_1h']]
+    opens, highs, lows = arrays[0], arrays[1], arrays[2]
+    scalar = min(len(data), SCALAR_BARS)
+
+    def per_bar_signals():
+        for i in range(3, scalar):
+            BiTimeframeStrategy.get_signal(*(a[i - 2:i + 1] for a in arrays))
+
+    def per_bar_exits():
+        # A BUY whose SL/TP are never hit: every bar is checked
+        sl, tp = lows.min() - 1, highs.max() + 1
+        for j in range(scalar):
+            BiTimeframeStrategy.check_exit('BUY', sl, tp, lows[j], highs[j])
+
+    cycles = min(LIVE_CYCLES, len(df_5m) - Config.LIVE_HISTORY_LIMIT * 12 - 2)
+    return [
+        ('calculate_indicators', len(df_5m), lambda: calculate_indicators(df_5m, df_1h).dropna()),
+        ('get_signals_batch', len(data), lambda: BiTimeframeStrategy.get_signals_batch(*arrays)),
+        ('get_signal', scalar, per_bar_signals),
+        ('check_exit', scalar, per_bar_exits),
+        ('backtest_run', len(data), lambda: CustomBacktester(data).run(save=False)),
+        ('live_cycle', cycles, lambda: _live_cycles(df_5m, df_1h, cycles)),
+    ]
+
+def _measure(fn, memory=True, min_time=1.0, max_repeat=5):
+    """
+    Best wall time of fn() over up to `max_repeat` runs (stops once `min_time`
+    has been spent) and, in an extra traced run, its peak Python heap in MB.
+    """
+    times, spent = [], 0.0
+    while len(times) < max_repeat and spent < min_time:
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        spent += elapsed
+        # Stages returning a float timed their own hot loop (setup excluded)
+        times.append(result if isinstance(result, float) else elapsed)
+    seconds = min(times)
+
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return seconds, peak_mb
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True)
+        return out.stdout.strip() + ('-dirty' if dirty.stdout.strip() else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def run_suite(sizes=None, memory=True, output_file=None):
+    """
+    Times every stage on synthetic data of each size and writes the results
+    (plus commit and environment) as JSON. Returns the results dict.
+    """
+    sizes = sizes or list(SIZES)
+    commit = git_commit()
+    output_file = output_file or os.path.join(Config.BENCHMARK_DIR, f"{commit}.json")
+    # One log line per simulated trade would dominate the timings
+    logging.getLogger('CustomBacktest').disabled = True
+
+    rows = []
+    for size in sizes:
+        df_5m, df_1h = synthetic_candles(SIZES[size])
+        logger.info("-" * 40)
+        logger.info(f"SIZE {size}: {len(df_5m)} x 5m bars")
+        for stage, bars, fn in _stages(df_5m, df_1h):
+            seconds, peak_mb = _measure(fn, memory)
+            rows.append({'size': size, 'stage': stage, 'bars': bars, 'seconds': seconds,
+                         'bars_per_sec': bars / seconds if seconds else None, 'peak_mb': peak_mb})
+            mem = f" | peak {peak_mb:.1f} MB" if peak_mb is not None else ""
+            logger.info(f"   {stage:<21} {seconds:8.3f}s | {bars / seconds:>12,.0f} bars/s{mem}")
+    logging.getLogger('CustomBacktest').disabled = False
+
+    results = {
+        'commit': commit,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'results': rows,
+    }
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"Saved benchmark results to {output_file}")
+    return results
+
+def compare_results(baseline_file, current_file, threshold=0.10):
+    """Logs the per-stage change in bars/sec between two result files. Returns the regressions."""
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    with open(current_file) as f:
+        current = json.load(f)
+    before = {(r['size'], r['stage']): r['bars_per_sec'] for r in baseline['results']}
+
+    regressions = []
+    logger.info(f"COMPARE {baseline['commit']} -> {current['commit']}")
+    for r in current['results']:
+        key = (r['size'], r['stage'])
+        if not before.get(key) or not r['bars_per_sec']:
+            continue
+        change = r['bars_per_sec'] / before[key] - 1
+        flag = "  <-- REGRESSION" if change < -threshold else ""
+        logger.info(f"   {r['size']:>4} {r['stage']:<21} {change:+7.1%}{flag}")
+        if flag:
+            regressions.append((*key, change))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the backtest and live hot paths")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), help="History lengths (default: all)")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the traced peak-memory pass")
+    parser.add_argument('--output', help=f"Results JSON (default: {Config.BENCHMARK_DIR}/<commit>.json)")
+    parser.add_argument('--compare', metavar='BASELINE_JSON', help="Compare the new results against an earlier run")
+    parser.add_argument('--exit-resolution', action='store_true', help="Run the resolve_exit benchmark on the backtest CSVs instead")
+    args = parser.parse_args()
+
+    if args.exit_resolution:
+        df_5m = pd.read_csv(Config.CSV_5M, parse_dates=True, index_col='timestamp')
+        df_1h = pd.read_csv(Config.CSV_1H, parse_dates=True, index_col='timestamp')
+        bench_exit_resolution(calculate_indicators(df_5m, df_1h).dropna())
+    else:
+        results = run_suite(args.sizes, memory=not args.no_memory, output_file=args.output)
+        if args.compare:
+            output_file = args.output or os.path.join(Config.BENCHMARK_DIR, f"{results['commit']}.json")
+            compare_results(args.compare, output_file)
@@ -0,0 +1,129 @@
+# candle_store.py
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from configuration import Config
+from utils import setup_logger
+
+logger = setup_logger('CandleStore')
+
+class CandleStore:
+    """
+    Columnar on-disk OHLCV store: one .npy file per column in a version
+    directory under <root>/<SYMBOL>/<interval>/, named by the CURRENT file
+    next to it. Columns are opened memory-mapped, so opening and
+    time-range slicing are zero-copy.
+    Timestamps are candle open times in int64 epoch milliseconds.
+    """
+    COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+    POINTER = 'CURRENT'
+
+    def __init__(self, root=None):
+        self.root = root or Config.DATA_DIR
+
+    def path(self, symbol, interval):
+        return os.path.join(self.root, symbol, interval)
+
+    def folder(self, symbol, interval):
+        """Directory of the current columns (the stored path itself for stores written before versioning)."""
+        path = self.path(symbol, interval)
+        try:
+            with open(os.path.join(path, self.POINTER)) as f:
+                return os.path.join(path, f.read().strip())
+        except FileNotFoundError:
+            return path
+
+    def exists(self, symbol, interval):
+        return os.path.exists(os.path.join(self.folder(symbol, interval), 'timestamp.npy'))
+
+    def write(self, symbol, interval, df):
+        """
+        Replaces the stored candles with df (indexed or with a 'timestamp'
+        column, lower- or capitalised OHLCV names). Written to a new version
+        directory first, then CURRENT is pointed at it with one os.replace,
+        so readers see either the old or the new dataset, never half of one.
+        The previous version is kept until the next write for readers that
+        resolved CURRENT just before the swap (open memory maps stay valid).
+        """
+        df = df.rename(columns=str.lower)
+        if 'timestamp' in df.columns:
+            df = df.set_index('timestamp')
+        df = df.sort_index()
+
+        path = self.path(symbol, interval)
+        os.makedirs(path, exist_ok=True)
+        previous = os.path.basename(self.folder(symbol, interval))
+        version = tempfile.mkdtemp(prefix='v', dir=path)
+
+        np.save(os.path.join(version, 'timestamp.npy'), to_epoch_ms(df.index))
+        for col in self.COLUMNS[1:]:
+            values = df[col].to_numpy(dtype=np.float64) if col in df.columns else np.zeros(len(df))
+            np.save(os.path.join(version, f'{col}.npy'), values)
+
+        pointer = os.path.join(path, self.POINTER)
+        with open(f"{pointer}.tmp", 'w') as f:
+            f.write(os.path.basename(version))
+        os.replace(f"{pointer}.tmp", pointer)
+
+        # Older versions, and the columns of a store written before versioning
+        for name in os.listdir(path):
+            if name in (os.path.basename(version), previous, self.POINTER):
+                continue
+            target = os.path.join(path, name)
+            if os.path.isdir(target):
+                shutil.rmtree(target, ignore_errors=True)
+            elif name.endswith('.npy'):
+                os.remove(target)
+        logger.info(f"Stored {len(df)} {symbol} {interval} candles in {version}")
+
+    def open(self, symbol, interval, start=None, end=None):
+        """
+        Memory-maps the columns and returns {column: array} limited to
+        start <= timestamp < end (anything pd.Timestamp accepts, or epoch ms).
+        No data is read until the arrays are used.
+        """
+        folder = self.folder(symbol, interval)
+        columns = {col: np.load(os.path.join(folder, f'{col}.npy'), mmap_mode='r') for col in self.COLUMNS}
+
+        ts = columns['timestamp']
+        lo = 0 if start is None else int(np.searchsorted(ts, to_epoch_ms(start), side='left'))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, to_epoch_ms(end), side='left'))
+        return {col: values[lo:hi] for col, values in columns.items()}
+
+    def read_frame(self, symbol, interval, start=None, end=None):
+        """Same layout as pd.read_csv(..., index_col='timestamp') on the CSV exports."""
+        columns = self.open(symbol, interval, start, end)
+        index = pd.DatetimeIndex(pd.to_datetime(columns['timestamp'], unit='ms'), name='timestamp')
+        return pd.DataFrame({col: columns[col] for col in self.COLUMNS[1:]}, index=index)
+
+def to_epoch_ms(value):
+    """Timestamps (scalar, index or array) to int64 epoch milliseconds."""
+    if isinstance(value, (int, np.integer)):
+        return np.int64(value)
+    if isinstance(value, (pd.Index, pd.Series, np.ndarray, list)):
+        return pd.DatetimeIndex(value).as_unit('ms').asi8.astype(np.int64)
+    return np.int64(pd.Timestamp(value).value // 1_000_000)
+
+def load_candles(symbol, interval, csv_path=None, store=None):
+    """Reads candles from the store, falling back to the CSV export if not converted yet."""
+    store = store or CandleStore()
+    if store.exists(symbol, interval):
+        return store.read_frame(symbol, interval)
+    logger.warning(f"{symbol} {interval} not in {store.root}, parsing {csv_path} (run candle_store.py to convert)")
+    return pd.read_csv(csv_path, parse_dates=True, index_col='timestamp')
+
+def convert_csv(csv_path, symbol, interval, store=None):
+    """One-time conversion of a candle CSV into the store."""
+    store = store or CandleStore()
+    store.write(symbol, interval, pd.read_csv(csv_path, parse_dates=['timestamp']))
+    return store
+
+if __name__ == "__main__":
+    # Convert the backtest CSVs
+    for csv_path, interval in ((Config.CSV_5M, Config.TF_ENTRY), (Config.CSV_1H, Config.TF_FILTER)):
+        if os.path.exists(csv_path):
+            convert_csv(csv_path, Config.SYMBOL, interval)
+        else:
+            logger.warning(f"{csv_path} not found, skipping")
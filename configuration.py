@@ -3,6 +3,14 @@ class Config:
     # Exchange Settings
     SYMBOL = 'BTCUSDT' # bitcoin perpetual contract
     TESTNET_BASE_URL = "https://testnet.binance.vision"
+    DATA_BASE_URL = "https://fapi.binance.com" # Market data REST (Mainnet)
+    HISTORY_BASE_URL = "https://api.binance.com" # Spot klines for historical downloads (data_fetcher.py)
+    STREAM_URL = "wss://fstream.binance.com" # Market data WebSocket (stream_runner.py)
+
+    # Request weight per minute allowed by each host (rate limiter budget)
+    DATA_WEIGHT_LIMIT = 2400
+    TRADE_WEIGHT_LIMIT = 6000
+    HISTORY_WEIGHT_LIMIT = 6000
     
     # API KEYS (Replace with your Testnet Keys)
     API_KEY = 'YOUR API KEY'
@@ -11,14 +19,84 @@ class Config:
     # Timeframes
     TF_ENTRY = '5m'  # Entry timeframe
     TF_FILTER = '1h'  # Filter timeframe
+    TF_INTRABAR = '1m'  # Exit replay data (replay_simulator.py)
 
     # Strategy Params
     EMA_PERIOD = 21
     RISK_PER_TRADE = 0.001  # 0.01% of capital
     RR_RATIO = 1.5         # Reward to Risk 1:1.5
+
+    # Execution Model (execution.py): simulated fills in the backtests, lot step everywhere
+    FEE_RATE = 0.0004    # Taker fee per fill, fraction of the notional
+    SPREAD_BPS = 0.5     # Bid/ask spread in basis points (a market order pays half)
+    SLIPPAGE_BPS = 1.0   # Extra price impact per market order, basis points
+    QTY_STEP = 0.001     # Lot step size, quantities are floored to it
+    MIN_QTY = 0.001      # Smallest order quantity
+    LOT_SIZES = {        # Per-symbol (lot step, min quantity) of the USDT-M contracts, others use the two above
+        'BTCUSDT': (0.001, 0.001), 'ETHUSDT': (0.001, 0.001), 'SOLUSDT': (1, 1), 'BNBUSDT': (0.01, 0.01)}
+
+    # Multi-Timeframe Alignment (alignment.py)
+    TIMEFRAME_INDICATORS = {TF_FILTER: [('EMA', EMA_PERIOD)]}  # e.g. add '4h': [('EMA', 50)] for a 4H filter
+    ALIGNMENT_CACHE_SIZE = 64  # Indicator arrays / row mappings kept in memory
+
+    # Resampling (resampler.py)
+    TF_BASE = TF_ENTRY  # Only these candles are downloaded, higher timeframes are built from them
+    RESAMPLE_INTERVALS = ['15m', '1h', '4h', '1d']
+    RESAMPLE_LIVE = True  # Live: build the TF_FILTER candles from TF_ENTRY instead of fetching / streaming them
+
+    # Live Indicator State
+    LIVE_HISTORY_LIMIT = 500  # Candles fetched once to seed the incremental EMA
+
+    # Multi-Symbol Live Trading (live_orchestrator.py), capital split evenly
+    LIVE_SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'BNBUSDT']
+    LIVE_POLL_SECONDS = 60   # Exit price checks while positions are open (one request for all symbols)
+    LIVE_CANDLE_DELAY = 5    # Seconds after the 5m close before fetching it (API update buffer)
+    LIVE_MAX_CONCURRENT = 8  # REST calls in flight at once
     
     # File Paths
+    DATA_DIR = 'data' # Columnar candle store (candle_store.py)
     CSV_5M = 'BTCUSDT_5m_1000.csv' # User provided CSV path
     CSV_1H = 'BTCUSDT_1h_1000.csv'   # User provided CSV path
     BACKTEST_OUTPUT = 'backtest_trades.csv' # To store trades while backtesting
-    LIVE_OUTPUT = 'live_trades.csv' # To store live trades
+    LIVE_OUTPUT = 'live_trades.csv' # CSV export of the live trade journal (python state_store.py)
+    STATE_DB = 'live_state.db' # Live positions, indicator state and trade journal (SQLite, WAL)
+    REPLAY_POLL_SECONDS = 60 # run_live's monitor interval, replayed by replay_simulator.py
+    METRICS_FILE = 'live_metrics.json' # Live timings / counters snapshot (telemetry.py)
+    METRICS_INTERVAL = 60 # Seconds between snapshots
+    METRICS_PORT = None # e.g. 9108 to also serve http://127.0.0.1:9108/metrics
+    MOCK_EXCHANGE_PORT = 8766 # Local mock exchange (mock_exchange.py)
+    MOCK_SPEED = 100 # Replayed seconds per real second on the mock exchange
+    SWEEP_OUTPUT = 'sweep_results.csv' # Parameter sweep results table
+    BACKTEST_CHUNK_SIZE = 100000 # 5m candles per chunk in streaming_backtester.py
+    BENCHMARK_DIR = 'bench_results' # benchmarks.py results, one JSON per commit
+    DATASET_CACHE_DIR = 'dataset_cache' # Prepared backtest inputs (dataset_cache.py)
+    DATASET_CACHE_MAX_MB = 2048 # Least recently used entries are evicted beyond this
+    ROLLING_SHARPE_DAYS = 30 # Window of performance.py's rolling Sharpe
+
+    # Portfolio Backtest (portfolio_backtester.py)
+    PORTFOLIO_SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'BNBUSDT']
+    MAX_OPEN_POSITIONS = 10     # Across all symbols
+    MAX_SYMBOL_EXPOSURE = 0.5   # Max cost of one position, fraction of capital
+    MAX_TOTAL_EXPOSURE = 1.0    # Max cost of all open positions, fraction of capital
+    PORTFOLIO_OUTPUT = 'portfolio_trades.csv'
+
+    # Parameter Sweep Grids (sweep_runner.py)
+    SWEEP_EMA_PERIODS = [13, 21, 34, 55]
+    SWEEP_RR_RATIOS = [1.0, 1.5, 2.0, 3.0]
+    SWEEP_RISK_PER_TRADE = [0.001, 0.002]
+
+    # Walk-Forward Optimization (walk_forward.py), EMA / RR grids as above
+    WALK_FORWARD_IN_SAMPLE_DAYS = 90    # Optimization window
+    WALK_FORWARD_OUT_OF_SAMPLE_DAYS = 30  # Traded with the winner, then the windows roll forward
+    WALK_FORWARD_METRIC = 'sharpe_ratio'  # Any calculate_metrics key, higher is better
+    WALK_FORWARD_OUTPUT = 'walk_forward_equity.csv'  # Stitched out-of-sample equity curve
+    WALK_FORWARD_TRADES = 'walk_forward_trades.csv'
+
+    # Monte Carlo Robustness (monte_carlo.py)
+    MC_PATHS = 20000        # Resampled paths per method
+    MC_BATCH_SIZE = 100     # Paths per vectorized NumPy batch (small enough to stay in cache)
+    MC_BLOCK_SIZE = 20      # Consecutive trades per block (bootstrap)
+    MC_SKIP_PROB = 0.1      # Chance of missing each trade (skip)
+    MC_RUIN_FRACTION = 0.5  # Ruined once equity falls to this fraction of the start
+    MC_CONFIDENCE = 0.95
+    MC_OUTPUT = 'monte_carlo_summary.csv'
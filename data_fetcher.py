@@ -1,44 +1,207 @@
-import pandas as pd
-import requests
+import json
+import os
 import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from configuration import Config
+from candle_store import CandleStore
+from http_client import HttpSession
+from resampler import store_resampled
+from utils import interval_to_seconds, setup_logger
+
+logger = setup_logger('DataFetcher')
+
+KLINES_PATH = "/api/v3/klines"
+KLINES_WEIGHT = 2  # Spot klines weight for limit <= 1000
+LIMIT = 1000  # Binance API max limit per request
+COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+def missing_ranges(existing_ms, start_ms, end_ms, step_ms, known_gaps=()):
+    """
+    [start, end) millisecond ranges not covered by the existing candle open times:
+    before the first candle, after the last one, and any internal gaps.
+    Ranges in known_gaps (the exchange has no candles there) count as covered.
+    """
+    return subtract_ranges(_uncovered(existing_ms, start_ms, end_ms, step_ms), known_gaps)
 
-def fetch_binance_data(symbol="BTCUSDT", interval ='1H' , days=365*2):
-    base_url = "https://api.binance.com/api/v3/klines"
-    end_time = int(time.time() * 1000)  # Current time in milliseconds
-    start_time = end_time - (days * 24 * 60 * 60 * 1000)  # pass parameters AS per need
+def _uncovered(existing_ms, start_ms, end_ms, step_ms):
+    existing_ms = existing_ms[(existing_ms >= start_ms) & (existing_ms < end_ms)]
+    if len(existing_ms) == 0:
+        return [(start_ms, end_ms)]
 
-    all_data = []
-    limit = 1000  # Binance API max limit per request 
+    ranges = []
+    if existing_ms[0] > start_ms:
+        ranges.append((start_ms, existing_ms[0]))
+    gaps = (existing_ms[1:] - existing_ms[:-1]) > step_ms
+    for left, right in zip(existing_ms[:-1][gaps], existing_ms[1:][gaps]):
+        ranges.append((left + step_ms, right))
+    if existing_ms[-1] + step_ms < end_ms:
+        ranges.append((existing_ms[-1] + step_ms, end_ms))
+    return ranges
 
-    while start_time < end_time:
-        url = f"{base_url}?symbol={symbol}&interval={interval}&limit={limit}&startTime={start_time}"
-        response = requests.get(url)
-        data = response.json()
+def subtract_ranges(ranges, removed):
+    """The parts of the [start, end) ranges outside every `removed` range."""
+    for cut_start, cut_end in removed:
+        kept = []
+        for start, end in ranges:
+            if cut_end <= start or cut_start >= end:
+                kept.append((start, end))
+                continue
+            if start < cut_start:
+                kept.append((start, cut_start))
+            if cut_end < end:
+                kept.append((cut_end, end))
+        ranges = kept
+    return ranges
 
-        if not data:
-            break  # When no more data available
+def merge_ranges(ranges):
+    """Sorted [start, end) ranges with overlapping and touching ones joined."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(r) for r in merged]
 
-        all_data.extend(data)
-        start_time = data[-1][0] + 1  # Moving to the next 1000 units of data
+def answered_gaps(chunks, stored_ms, step_ms):
+    """
+    Ranges of answered chunks the exchange returned no candles for (e.g.
+    maintenance windows, or before the listing). Only ranges with a stored
+    candle after them count: the newest candles may just not be out yet.
+    """
+    if len(stored_ms) == 0:
+        return []
+    return [(start, end) for chunk in chunks for start, end in _uncovered(stored_ms, *chunk, step_ms)
+            if end <= stored_ms[-1]]
 
-        print(f"Fetched {len(all_data)} records so far...")
+def gaps_path(store, symbol, interval):
+    return os.path.join(store.path(symbol, interval), 'gaps.json')
 
-    df = pd.DataFrame(all_data, columns=[
-        "timestamp", "open", "high", "low", "close", "volume", "close_time",
-        "quote_asset_volume", "number_of_trades", "taker_buy_base_asset_volume",
-        "taker_buy_quote_asset_volume", "ignore"
-    ])
+def load_gaps(store, symbol, interval):
+    """Exchange-side gaps recorded by earlier downloads, as [start, end) ms ranges."""
+    try:
+        with open(gaps_path(store, symbol, interval)) as f:
+            return [tuple(r) for r in json.load(f)]
+    except (OSError, ValueError):
+        return []
 
-    df = df[["timestamp", "open", "high", "low", "close", "volume"]]
+def save_gaps(store, symbol, interval, gaps):
+    path = gaps_path(store, symbol, interval)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump([[int(start), int(end)] for start, end in gaps], f)
+    os.replace(f"{path}.tmp", path)
+
+def split_chunks(ranges, step_ms):
+    """Splits ranges into chunks of at most LIMIT candles (one request each)."""
+    chunks = []
+    for start, end in ranges:
+        while start < end:
+            stop = min(start + LIMIT * step_ms, end)
+            chunks.append((start, stop))
+            start = stop
+    return chunks
+
+def fetch_chunk(session, symbol, interval, start_ms, end_ms):
+    params = {'symbol': symbol, 'interval': interval, 'limit': LIMIT,
+              'startTime': start_ms, 'endTime': end_ms - 1}
+    return session.get(KLINES_PATH, params=params, weight=KLINES_WEIGHT)
+
+def load_existing(store, symbol, interval):
+    if not store.exists(symbol, interval):
+        return pd.DataFrame(columns=COLUMNS)
+    return store.read_frame(symbol, interval).reset_index()
+
+def to_frame(rows):
+    df = pd.DataFrame([r[:6] for r in rows], columns=COLUMNS)
     df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    df[["open", "high", "low", "close","volume"]] = df[["open", "high", "low", "close","volume"]].astype(float)
+    df[COLUMNS[1:]] = df[COLUMNS[1:]].astype(float)
+    return df
 
-    filename = f"{symbol}_{interval}_{days}.csv"
-    df.to_csv(filename, index=False)
-    print(f"Data saved as {filename}")
+def validate(df, step_ms, name):
+    """Logs duplicate timestamps and gaps. Returns the de-duplicated, sorted frame."""
+    duplicates = int(df["timestamp"].duplicated().sum())
+    if duplicates:
+        logger.warning(f"{name}: dropped {duplicates} duplicate timestamps")
+    df = df.drop_duplicates("timestamp", keep="last").sort_values("timestamp").reset_index(drop=True)
 
+    steps = df["timestamp"].diff().dt.total_seconds().iloc[1:] * 1000
+    gaps = int((steps > step_ms).sum())
+    if gaps:
+        logger.warning(f"{name}: {gaps} gaps remain (no data returned by the exchange)")
     return df
 
-# Fetch 1-year BTC/USDT data (1m timeframe)
-df = fetch_binance_data(symbol="BTCUSDT", interval="1h", days= 1000) #pass final parameters.
-print(df.head())
+def store_candles(store, symbol, interval, existing, rows, step_ms, chunks=(), known_gaps=()):
+    """
+    Merges downloaded kline rows into the existing candles and writes them
+    to the store, with the gaps of the answered `chunks` added to known_gaps.
+    """
+    df = pd.concat([existing, to_frame(rows)], ignore_index=True) if len(existing) else to_frame(rows)
+    df = validate(df, step_ms, f"{symbol} {interval}")
+    store.write(symbol, interval, df)
+
+    stored_ms = df["timestamp"].values.astype("datetime64[ms]").astype(np.int64)
+    new_gaps = answered_gaps(chunks, stored_ms, step_ms)
+    if new_gaps:
+        save_gaps(store, symbol, interval, merge_ranges([*known_gaps, *new_gaps]))
+        logger.info(f"{symbol} {interval}: {len(new_gaps)} ranges without candles on the exchange, not requested again")
+    return df
+
+def fetch_binance_data(symbol="BTCUSDT", interval='1h', days=365*2, workers=8, session=None, store=None):
+    """
+    Downloads `days` of closed klines into the candle store (written atomically).
+    Only ranges missing from the stored candles are requested, in parallel
+    chunks under the shared rate limiter. Ranges the exchange answered
+    without candles are recorded (gaps.json) and skipped by later runs.
+    If a chunk fails, the chunks
+    downloaded so far are stored before the error is raised, so a rerun
+    only requests what is still missing.
+    """
+    store = store or CandleStore()
+    session = session or HttpSession(Config.HISTORY_BASE_URL, weight_limit=Config.HISTORY_WEIGHT_LIMIT)
+    step_ms = interval_to_seconds(interval) * 1000
+
+    end_ms = int(time.time() * 1000) // step_ms * step_ms  # Only closed candles
+    start_ms = end_ms - (days * 24 * 60 * 60 * 1000)  # pass parameters AS per need
+
+    existing = load_existing(store, symbol, interval)
+    existing_ms = existing["timestamp"].values.astype("datetime64[ms]").astype("int64")
+    known_gaps = load_gaps(store, symbol, interval)
+    chunks = split_chunks(missing_ranges(existing_ms, start_ms, end_ms, step_ms, known_gaps), step_ms)
+    logger.info(f"{symbol} {interval}: {len(existing)} candles on disk, fetching {len(chunks)} chunks...")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(fetch_chunk, session, symbol, interval, *chunk) for chunk in chunks]
+        try:
+            for future in as_completed(futures):
+                future.result()  # Raises on the first failed chunk
+        except BaseException:
+            # Keep the finished chunks (the running ones complete, the queued ones are dropped)
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            answered = [(chunk, f) for chunk, f in zip(chunks, futures) if not f.cancelled() and f.exception() is None]
+            rows = [row for _, f in answered for row in f.result()]
+            if rows:
+                store_candles(store, symbol, interval, existing, rows, step_ms,
+                              [chunk for chunk, _ in answered], known_gaps)
+            logger.error(f"{symbol} {interval}: download failed, stored {len(rows)} new candles, rerun to resume")
+            raise
+    rows = [row for future in futures for row in future.result()]
+
+    df = store_candles(store, symbol, interval, existing, rows, step_ms, chunks, known_gaps)
+    logger.info(f"{symbol} {interval}: {len(df)} candles stored, {len(rows)} new")
+    return df
+
+def fetch_many(symbols, intervals, days, workers=8, store=None):
+    """Downloads every symbol/interval pair, sharing one pooled session and rate limiter."""
+    session = HttpSession(Config.HISTORY_BASE_URL, weight_limit=Config.HISTORY_WEIGHT_LIMIT, pool_size=workers)
+    return {(symbol, interval): fetch_binance_data(symbol, interval, days, workers=workers, session=session, store=store)
+            for symbol in symbols for interval in intervals}
+
+if __name__ == "__main__":
+    # Fetch 1000 days of BTC/USDT base candles, the higher timeframes are resampled from them
+    df = fetch_binance_data(symbol="BTCUSDT", interval=Config.TF_BASE, days=1000) #pass final parameters.
+    store_resampled("BTCUSDT")
+    print(df.head())
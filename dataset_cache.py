@@ -0,0 +1,196 @@
+# dataset_cache.py
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from configuration import Config
+from candle_store import CandleStore, load_candles
+from utils import setup_logger
+
+logger = setup_logger('DatasetCache')
+
+FEATURES_VERSION = 1  # Bump when calculate_indicators changes what it computes
+
+class DatasetCache:
+    """
+    On-disk cache of prepared backtest inputs: one directory of .npy
+    columns per entry under <root>/<key>/, opened memory-mapped.
+    Entries are keyed by a hash of their spec (symbol, intervals, date
+    range, indicator spec, ...) and of the content of the source files, so
+    changed candles or parameters never hit a stale entry.
+    Least recently used entries are evicted beyond max_mb.
+    """
+
+    def __init__(self, root=None, max_mb=None):
+        self.root = root or Config.DATASET_CACHE_DIR
+        self.max_bytes = (Config.DATASET_CACHE_MAX_MB if max_mb is None else max_mb) * 1024 ** 2
+        os.makedirs(self.root, exist_ok=True)
+        self._hashes_path = os.path.join(self.root, 'file_hashes.json')
+
+    # --- 1. KEYS ---
+    def file_hash(self, path):
+        """
+        Content hash of a file, or of a CandleStore directory. Only
+        recomputed when a file's size or mtime changed since the last call.
+        """
+        files = sorted(os.path.join(path, f) for f in os.listdir(path)) if os.path.isdir(path) else [path]
+        stamp = [[f, os.path.getsize(f), os.stat(f).st_mtime_ns] for f in files]
+        known = self._load_hashes()
+        entry = known.get(os.path.abspath(path))
+        if entry is not None and entry['stamp'] == stamp:
+            return entry['hash']
+
+        h = hashlib.blake2b(digest_size=16)
+        for f in files:
+            with open(f, 'rb') as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), b''):
+                    h.update(chunk)
+        known[os.path.abspath(path)] = {'stamp': stamp, 'hash': h.hexdigest()}
+        tmp = f"{self._hashes_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(known, f)
+        os.replace(tmp, self._hashes_path)
+        return h.hexdigest()
+
+    def _load_hashes(self):
+        try:
+            with open(self._hashes_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def key(self, spec, sources):
+        """Entry name for a spec (JSON-able dict) built from the given source files."""
+        payload = json.dumps({'spec': spec, 'sources': [self.file_hash(p) for p in sources]},
+                             sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    # --- 2. ENTRIES ---
+    def get(self, key):
+        """{name: memory-mapped array} and the stored meta of an entry, None if not cached."""
+        folder = os.path.join(self.root, key)
+        meta_path = os.path.join(folder, 'meta.json')
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(meta_path)  # Last use, for the LRU eviction
+        arrays = {name: np.load(os.path.join(folder, f'{i}.npy'), mmap_mode='r') for i, name in enumerate(meta['arrays'])}
+        return arrays, meta
+
+    def put(self, key, arrays, meta=None):
+        """Stores {name: array}; written to a temp directory and renamed, so readers never see half an entry."""
+        final = os.path.join(self.root, key)
+        tmp = f"{final}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for i, values in enumerate(arrays.values()):
+            np.save(os.path.join(tmp, f'{i}.npy'), np.asarray(values))
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({**(meta or {}), 'arrays': list(arrays)}, f, default=str)
+        shutil.rmtree(final, ignore_errors=True)
+        os.rename(tmp, final)
+        self.evict(keep=key)
+
+    def cached(self, spec, sources, build):
+        """{name: array} for the spec, built by build() and stored on a miss."""
+        key = self.key(spec, sources)
+        hit = self.get(key)
+        if hit is not None:
+            return hit[0]
+        logger.info(f"Dataset cache miss, building {spec}")
+        arrays = build()
+        self.put(key, arrays, {'spec': spec})
+        return arrays
+
+    def evict(self, keep=None):
+        """Removes least recently used entries until the cache fits in max_mb."""
+        entries = []
+        for name in os.listdir(self.root):
+            folder = os.path.join(self.root, name)
+            meta_path = os.path.join(folder, 'meta.json')
+            if not os.path.isdir(folder) or not os.path.exists(meta_path):
+                continue
+            size = sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder))
+            entries.append((os.stat(meta_path).st_mtime_ns, name, size))
+        total = sum(size for _, _, size in entries)
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            total -= size
+            logger.info(f"Evicted dataset {name} ({size / 1024 ** 2:.1f} MB)")
+
+def frame_arrays(df):
+    """A DataFrame with a DatetimeIndex as {column: array} plus its index (epoch ns under '__index__')."""
+    arrays = {'__index__': df.index.as_unit('ns').asi8}
+    arrays.update({col: df[col].to_numpy() for col in df.columns})
+    return arrays
+
+def arrays_frame(arrays, index_name='timestamp'):
+    index = pd.DatetimeIndex(np.asarray(arrays['__index__']).view('datetime64[ns]'), name=index_name)
+    return pd.DataFrame({col: np.asarray(values) for col, values in arrays.items() if col != '__index__'}, index=index)
+
+def candle_source(symbol, interval, csv_path=None, store=None):
+    """The file load_candles reads: the store's current column directory, or the CSV it falls back to."""
+    store = store or CandleStore()
+    return store.folder(symbol, interval) if store.exists(symbol, interval) else csv_path
+
+def dataset_sources(symbol, csv_5m=None, csv_1h=None):
+    """(5m CSV, 1H CSV, [5m source, 1H source]) of a symbol; the backtest CSVs are the fallback for Config.SYMBOL."""
+    if symbol == Config.SYMBOL:
+        csv_5m, csv_1h = csv_5m or Config.CSV_5M, csv_1h or Config.CSV_1H
+    sources = [candle_source(symbol, Config.TF_ENTRY, csv_5m), candle_source(symbol, Config.TF_FILTER, csv_1h)]
+    if None in sources or not all(os.path.exists(p) for p in sources):
+        raise FileNotFoundError(f"No {symbol} candles in the store or as CSV")
+    return csv_5m, csv_1h, sources
+
+_CACHE = None
+
+def default_cache():
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = DatasetCache()
+    return _CACHE
+
+def load_dataset(symbol=None, ema_period=None, start=None, end=None, csv_5m=None, csv_1h=None, cache=None):
+    """
+    calculate_indicators(5m, 1H, ema_period).dropna() limited to
+    start <= timestamp < end (indicators are computed on the whole
+    history first), from the cache when the candles and spec are unchanged.
+    The CSVs are only read if the symbol is not in the candle store.
+    """
+    symbol = symbol or Config.SYMBOL
+    ema_period = Config.EMA_PERIOD if ema_period is None else ema_period
+    start, end = (None if t is None else pd.Timestamp(t) for t in (start, end))
+    csv_5m, csv_1h, sources = dataset_sources(symbol, csv_5m, csv_1h)
+
+    spec = {'features': 'indicators', 'version': FEATURES_VERSION, 'symbol': symbol,
+            'intervals': [Config.TF_ENTRY, Config.TF_FILTER], 'start': start, 'end': end,
+            'indicators': {Config.TF_FILTER: [('EMA', ema_period)]}}
+
+    def build():
+        from utils import calculate_indicators
+        df_5m = load_candles(symbol, Config.TF_ENTRY, csv_5m)
+        df_1h = load_candles(symbol, Config.TF_FILTER, csv_1h)
+        data = calculate_indicators(df_5m, df_1h, ema_period).dropna()
+        keep = np.ones(len(data), dtype=bool)
+        if start is not None:
+            keep &= data.index >= start
+        if end is not None:
+            keep &= data.index < end
+        return frame_arrays(data[keep])
+
+    return arrays_frame((cache or default_cache()).cached(spec, sources, build))
+
+if __name__ == "__main__":
+    # Warm the cache for the backtest dataset
+    import time
+    t0 = time.perf_counter()
+    data = load_dataset()
+    logger.info(f"{len(data)} rows in {time.perf_counter() - t0:.3f}s")
@@ -0,0 +1,145 @@
+# execution.py
+import math
+import numpy as np
+import pandas as pd
+from configuration import Config
+from utils import setup_logger
+
+logger = setup_logger('Execution')
+
+class Fill:
+    """One executed MARKET order: average fill price, filled quantity, fee (quote asset) and latency."""
+    __slots__ = ('side', 'quote', 'price', 'quantity', 'fee', 'latency')
+
+    def __init__(self, side, quote, price, quantity, fee=0.0, latency=None):
+        self.side = side
+        self.quote = quote      # Price the decision was made on
+        self.price = price
+        self.quantity = quantity
+        self.fee = fee
+        self.latency = latency  # Seconds from sending the order to the response (live only)
+
+class ExecutionModel:
+    """
+    How MARKET orders fill, shared by every runner through StrategyKernel:
+    - quantities are floored to the symbol's lot step (below min_qty: no trade)
+    - the fill is the quoted price moved against the order by half the
+      spread plus slippage (backtests; live uses the exchange's fill)
+    - a taker fee is paid on the filled notional of every fill
+    Works on scalars and, for the reports, on whole arrays.
+    """
+
+    def __init__(self, fee_rate=None, spread_bps=None, slippage_bps=None, qty_step=None, min_qty=None, symbol=None):
+        self.fee_rate = Config.FEE_RATE if fee_rate is None else fee_rate
+        self.spread_bps = Config.SPREAD_BPS if spread_bps is None else spread_bps
+        self.slippage_bps = Config.SLIPPAGE_BPS if slippage_bps is None else slippage_bps
+        # Lot step and minimum of `symbol` (Config.LOT_SIZES), unless given
+        default_step, default_min = Config.LOT_SIZES.get(symbol, (Config.QTY_STEP, Config.MIN_QTY))
+        self.qty_step = default_step if qty_step is None else qty_step
+        self.min_qty = default_min if min_qty is None else min_qty
+        # Decimals of the step, so floored quantities carry no float noise
+        self._decimals = max(0, -math.floor(math.log10(self.qty_step))) if self.qty_step else None
+
+    @property
+    def cost_bps(self):
+        """Price impact of one market order (basis points)."""
+        return self.spread_bps / 2 + self.slippage_bps
+
+    def round_qty(self, quantity):
+        if self._decimals is not None:
+            quantity = np.round(np.floor(np.asarray(quantity) / self.qty_step + 1e-9) * self.qty_step, self._decimals)
+        quantity = np.where(quantity >= self.min_qty, quantity, 0.0)
+        return float(quantity) if quantity.ndim == 0 else quantity
+
+    def fill_price(self, side, price):
+        """Simulated fill of a market order on `side` ('BUY' / 'SELL') at the quoted price."""
+        direction = np.where(np.asarray(side) == 'BUY', 1.0, -1.0)
+        filled = price * (1 + direction * self.cost_bps / 10000)
+        return float(filled) if np.ndim(filled) == 0 else filled
+
+    def fee(self, price, quantity):
+        return price * quantity * self.fee_rate
+
+    def simulate(self, side, quote, quantity):
+        price = self.fill_price(side, quote)
+        return Fill(side, quote, price, quantity, self.fee(price, quantity))
+
+def parse_fill(response, side, quote, quantity, symbol, latency=None, model=None):
+    """
+    Fill of a MARKET order response. Spot responses list the partial fills
+    (price, qty, commission); futures ones only carry avgPrice. Without a
+    reported price (or fee) the quote (or the model fee) is used instead.
+    """
+    model = model or ExecutionModel(symbol=symbol)
+    fills = response.get('fills') or []
+    filled = float(response.get('executedQty') or 0) or quantity
+    price = None
+    fee = None
+    if fills:
+        qtys = np.array([float(f['qty']) for f in fills])
+        prices = np.array([float(f['price']) for f in fills])
+        filled = float(qtys.sum())
+        price = float((prices * qtys).sum() / filled)
+        fee = 0.0
+        for f in fills:
+            commission, asset = float(f.get('commission', 0)), f.get('commissionAsset', '')
+            if symbol.endswith(asset):
+                fee += commission
+            elif symbol.startswith(asset):
+                fee += commission * float(f['price'])  # Paid in the base asset
+            else:
+                fee = None  # e.g. paid in BNB
+                break
+    elif float(response.get('cummulativeQuoteQty') or 0) > 0 and filled:
+        price = float(response['cummulativeQuoteQty']) / filled
+    elif float(response.get('avgPrice') or 0) > 0:
+        price = float(response['avgPrice'])
+    price = quote if price is None else price
+    fee = model.fee(price, filled) if fee is None else fee
+    return Fill(side, quote, price, filled, fee, latency)
+
+# --- SLIPPAGE REPORT ---
+
+def slippage(trades):
+    """
+    Per-trade execution costs of a trade table (StrategyKernel.close records,
+    backtest_trades.csv or the live journal), vectorized over all trades:
+    entry / exit slippage against the quoted prices in basis points
+    (positive = paid), and fees as a share of the entry notional.
+    """
+    trades = pd.DataFrame(trades)
+    direction = np.where(trades['direction'] == 'BUY', 1.0, -1.0)
+    entry_quote, exit_quote = trades['entry_quote'].to_numpy(float), trades['exit_quote'].to_numpy(float)
+    return pd.DataFrame({
+        'entry_bps': direction * (trades['entry_price'].to_numpy(float) / entry_quote - 1) * 10000,
+        'exit_bps': -direction * (trades['exit_price'].to_numpy(float) / exit_quote - 1) * 10000,
+        'fee_bps': trades['fees'].to_numpy(float) / (trades['entry_price'].to_numpy(float) * trades['size'].to_numpy(float)) * 10000,
+    }, index=trades.index)
+
+def slippage_report(**sources):
+    """
+    Side-by-side execution costs, e.g. slippage_report(backtest=..., live=...):
+    mean / p50 / p95 bps per source and cost, plus the order latency where known.
+    """
+    rows = {}
+    for name, trades in sources.items():
+        if trades is None or len(trades) == 0:
+            continue
+        costs = slippage(trades)
+        trades = pd.DataFrame(trades)
+        for col in ('entry_latency', 'exit_latency'):
+            if col in trades:
+                costs[col.replace('latency', 'ms')] = pd.to_numeric(trades[col], errors='coerce').to_numpy() * 1000
+        stats = costs.agg(['mean', 'median', lambda c: c.quantile(0.95)]).T
+        stats.columns = ['mean', 'p50', 'p95']
+        stats['trades'] = len(costs)
+        rows[name] = stats
+    return pd.concat(rows, names=['source', 'cost']) if rows else pd.DataFrame()
+
+if __name__ == "__main__":
+    # Modelled (backtest) vs real (live journal) execution costs
+    from state_store import StateStore
+    backtest = pd.read_csv(Config.BACKTEST_OUTPUT)
+    live = StateStore().trades()
+    report = slippage_report(backtest=backtest, live=live)
+    logger.info(f"Execution costs (bps, latency ms):\n{report.round(3).to_string()}")
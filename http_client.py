@@ -0,0 +1,162 @@
+# http_client.py
+import random
+import threading
+import time
+from collections import defaultdict, deque
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from utils import setup_logger
+
+logger = setup_logger('HttpClient')
+
+RETRY_STATUS = {418, 429, 500, 502, 503, 504}
+WEIGHT_HEADER = 'X-MBX-USED-WEIGHT-1M'
+
+class TokenBucket:
+    """
+    Request-weight limiter for one Binance host.
+    Refills continuously at `capacity` per minute and is corrected by the
+    used-weight header the exchange returns on every response.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.rate = capacity / 60.0  # Weight per second
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, weight=1):
+        """Blocks until `weight` tokens are available, then takes them."""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                wait = (weight - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def sync(self, used_weight):
+        """Never allow more than what the exchange says is left in this minute."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, self.capacity - used_weight)
+
+    def drain(self, seconds):
+        """Exchange asked us to back off (429/418): stop issuing requests for `seconds`."""
+        with self.lock:
+            self.tokens = -seconds * self.rate
+            self.updated = time.monotonic()
+
+class LatencyStats:
+    """Rolling per-endpoint latency samples (seconds) with percentile summaries."""
+
+    def __init__(self, window=1000):
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds, ok=True):
+        with self.lock:
+            self.samples[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def summary(self):
+        with self.lock:
+            report = {}
+            for endpoint, values in self.samples.items():
+                p50, p95, p99 = np.percentile(list(values), [50, 95, 99]) * 1000
+                report[endpoint] = {'count': len(values), 'errors': self.errors[endpoint],
+                                    'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99}
+            return report
+
+class HttpSession:
+    """
+    Keep-alive connection pool for one host, with bounded retries
+    (exponential backoff + full jitter) and a weight-driven rate limiter.
+    """
+
+    def __init__(self, base_url, weight_limit=1200, max_retries=3, backoff=0.5,
+                 timeout=10, pool_size=10, headers=None):
+        self.base_url = base_url.rstrip('/')
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = TokenBucket(weight_limit)
+        self.stats = LatencyStats()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def get(self, path, params=None, weight=1, timeout=None):
+        return self.request('GET', path, params=params, weight=weight, timeout=timeout)
+
+    def post(self, path, params=None, weight=1, timeout=None, sign=None):
+        # Orders are not idempotent: only retry when the exchange surely rejected them
+        return self.request('POST', path, params=params, weight=weight, timeout=timeout,
+                            sign=sign, idempotent=False)
+
+    def request(self, method, path, params=None, weight=1, timeout=None, sign=None, idempotent=True):
+        """
+        Sends the request and returns the decoded JSON body.
+        `sign(params)` returns a signed query string and is called again on every
+        attempt, so retried requests carry a fresh timestamp.
+        Raises the last error once retries are exhausted.
+        """
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(weight)
+            if sign:
+                args = {'url': f"{url}?{sign(dict(params or {}))}"}
+            else:
+                args = {'url': url, 'params': params}
+
+            start = time.perf_counter()
+            try:
+                r = self.session.request(method, timeout=timeout or self.timeout, **args)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.stats.record(path, time.perf_counter() - start, ok=False)
+                # A POST that timed out after connecting may have reached the exchange
+                retryable = idempotent or isinstance(e, requests.ConnectTimeout)
+                if not retryable or attempt == self.max_retries:
+                    raise
+                logger.warning(f"{method} {path} failed ({e}), retry {attempt + 1}/{self.max_retries}")
+                self._sleep_backoff(attempt)
+                continue
+
+            self.stats.record(path, time.perf_counter() - start, ok=r.ok)
+            used = r.headers.get(WEIGHT_HEADER)
+            if used is not None:
+                self.limiter.sync(int(used))
+
+            rejected = r.status_code in (418, 429)  # Rate limited: never executed
+            if r.status_code in RETRY_STATUS and (idempotent or rejected) and attempt < self.max_retries:
+                logger.warning(f"{method} {path} -> HTTP {r.status_code}, retry {attempt + 1}/{self.max_retries}")
+                if rejected:
+                    self.limiter.drain(float(r.headers.get('Retry-After', 1)))
+                else:
+                    self._sleep_backoff(attempt)
+                continue
+
+            # Order errors (4xx) carry a JSON body the caller logs
+            if rejected or r.status_code >= 500 or (idempotent and not r.ok):
+                r.raise_for_status()
+            return r.json()
+
+    def _sleep_backoff(self, attempt):
+        time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    def close(self):
+        self.session.close()
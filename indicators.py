@@ -0,0 +1,186 @@
+# indicators.py
+import numpy as np
+from configuration import Config
+from resampler import CandleResampler
+from utils import interval_to_seconds
+
+# A 1H candle is visible from the 5m candle closing with or after it (open + 1H <= open + 5m)
+HTF_LAG = np.timedelta64(interval_to_seconds(Config.TF_FILTER) - interval_to_seconds(Config.TF_ENTRY), 's')
+
+class IncrementalEMA:
+    """
+    O(1) per-update EMA matching ta.ema (SMA seed, adjust=False).
+    The update uses the same arithmetic as pandas' ewm so values are
+    bit-for-bit equal to the batch calculation over the same history.
+    """
+    __slots__ = ('period', 'alpha', 'value', '_seed')
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 1.0 / (1.0 + (period - 1) / 2.0)
+        self.value = np.nan
+        self._seed = []  # first `period` closes until the SMA seed is ready
+
+    def update(self, close):
+        """Feeds one CLOSED candle close. Returns the EMA (NaN during warm-up)."""
+        if self._seed is not None:
+            self._seed.append(close)
+            if len(self._seed) == self.period:
+                self.value = float(np.mean(self._seed))
+                self._seed = None
+            return self.value
+
+        old_wt = 1.0 - self.alpha
+        if self.value != close:
+            self.value = (old_wt * self.value + self.alpha * close) / (old_wt + self.alpha)
+        return self.value
+
+    @property
+    def ready(self):
+        return self._seed is None
+
+class IncrementalIndicators:
+    """
+    Live replacement for calculate_indicators.
+    Seeded once from history, then updated one closed candle at a time:
+    - 1H EMA in O(1) per closed 1H candle
+    - fixed-size ring buffer of the last 5m bars with their aligned 1H values
+
+    Feeding every 1H candle before the 5m candle that closes with it gives
+    the same rows as calculate_indicators. In live trading only CLOSED 1H
+    candles are fed, so the trend filter always reads the last closed 1H
+    candle, the one calculate_indicators aligns. 1H candles that are not
+    fed are resampled from the 5m candles (Config.RESAMPLE_LIVE).
+    """
+    COLUMNS = ('Open', 'High', 'Low', 'Close', 'Close_1h', 'EMA_1h')
+
+    def __init__(self, ema_period=None, buffer_size=3):
+        self.ema = IncrementalEMA(ema_period or Config.EMA_PERIOD)
+        self.size = buffer_size
+        self._bars = np.full((buffer_size, len(self.COLUMNS)), np.nan)
+        self._times = np.empty(buffer_size, dtype='datetime64[ns]')
+        self._head = 0   # Next slot to write
+        self._count = 0
+        self.close_1h = np.nan
+        self.last_1h_time = None
+        self.last_5m_time = None
+        self.resampler = CandleResampler([Config.TF_FILTER], Config.TF_ENTRY)
+
+    @classmethod
+    def seed(cls, df_5m, df_1h=None, ema_period=None, buffer_size=3):
+        """Builds the state from CLOSED candle history (DataFrames indexed by timestamp)."""
+        state = cls(ema_period, buffer_size)
+        state.update(df_5m, df_1h)
+        return state
+
+    def update(self, df_5m, df_1h=None):
+        """
+        Pushes every candle newer than the last one seen, in close time order
+        (1H first on equal close times). Both frames must only hold CLOSED candles.
+        Without df_1h the 1H candles come from the 5m ones.
+        """
+        df_5m = df_5m.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close'})
+        df_1h = (df_5m.iloc[:0] if df_1h is None else df_1h).rename(columns={'close': 'Close'})
+        if self.last_5m_time is not None:
+            df_5m = df_5m[df_5m.index > self.last_5m_time]
+        if self.last_1h_time is not None:
+            df_1h = df_1h[df_1h.index > self.last_1h_time]
+
+        times_1h = df_1h.index
+        closes_1h = df_1h['Close'].to_numpy(dtype=float)
+        # Only the last `size` 5m bars can survive in the ring buffer
+        first_kept = max(len(df_5m) - self.size, 0)
+
+        k = 0
+        for i, (ts, row) in enumerate(zip(df_5m.index, df_5m[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=float))):
+            while k < len(times_1h) and times_1h[k] + HTF_LAG <= ts:
+                self.update_1h(times_1h[k], closes_1h[k])
+                k += 1
+            if i >= first_kept:
+                self.update_5m(ts, *row)
+            else:
+                self._resample_1h(ts, *row)
+                self.last_5m_time = ts
+        for k in range(k, len(times_1h)):
+            self.update_1h(times_1h[k], closes_1h[k])
+
+    def update_1h(self, timestamp, close):
+        """O(1) update for one newly CLOSED 1H candle."""
+        self.ema.update(close)
+        self.close_1h = close
+        self.last_1h_time = timestamp
+
+    def _resample_1h(self, timestamp, open_, high, low, close):
+        """Feeds the 1H candle this 5m candle closes, unless it was fed already."""
+        for _, bar in self.resampler.update(timestamp, open_, high, low, close):
+            if self.last_1h_time is None or bar[0] > self.last_1h_time:
+                self.update_1h(bar[0], bar[4])
+
+    def update_5m(self, timestamp, open_, high, low, close):
+        """Pushes one CLOSED 5m candle into the ring buffer (after the 1H candle it closes)."""
+        self._resample_1h(timestamp, open_, high, low, close)
+        self._bars[self._head] = (open_, high, low, close, self.close_1h, self.ema.value)
+        self._times[self._head] = np.datetime64(timestamp, 'ns')
+        self._head = (self._head + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+        self.last_5m_time = timestamp
+
+    def window(self):
+        """Returns (timestamps, bars) of the buffered 5m candles, oldest first."""
+        order = (self._head - self._count + np.arange(self._count)) % self.size
+        return self._times[order], self._bars[order]
+
+    def last_closed(self):
+        """The most recent closed 5m candle as a dict keyed like calculate_indicators columns."""
+        times, bars = self.window()
+        row = dict(zip(self.COLUMNS, bars[-1]))
+        row['timestamp'] = times[-1]
+        return row
+
+    def signal_inputs(self, next_open):
+        """
+        Arguments for BiTimeframeStrategy.get_signal: the buffered closed
+        candles plus the just-opened candle (only its open is used).
+        """
+        _, bars = self.window()
+        forming = np.array([[next_open] * 4 + [self.close_1h, self.ema.value]])
+        bars = np.vstack([bars, forming])
+        return tuple(bars[:, c] for c in range(len(self.COLUMNS)))
+
+    @property
+    def ready(self):
+        return self.ema.ready and self._count >= 2
+
+    def state(self):
+        """Everything needed to resume without history, as plain (JSON-able) values."""
+        ns = lambda ts: None if ts is None else int(np.datetime64(ts, 'ns').astype(np.int64))
+        return {
+            'ema_period': self.ema.period,
+            'ema_value': float(self.ema.value),
+            'ema_seed': self.ema._seed,
+            'bars': self._bars.tolist(),
+            'times': self._times.astype(np.int64).tolist(),
+            'head': self._head,
+            'count': self._count,
+            'close_1h': float(self.close_1h),
+            'last_1h_time': ns(self.last_1h_time),
+            'last_5m_time': ns(self.last_5m_time),
+            'resampler': self.resampler.state(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        import pandas as pd
+        ts = lambda ns: None if ns is None else pd.Timestamp(ns)
+        indicators = cls(state['ema_period'], len(state['bars']))
+        indicators.ema.value = state['ema_value']
+        indicators.ema._seed = state['ema_seed']
+        indicators._bars = np.array(state['bars'], dtype=float)
+        indicators._times = np.array(state['times'], dtype=np.int64).astype('datetime64[ns]')
+        indicators._head = state['head']
+        indicators._count = state['count']
+        indicators.close_1h = state['close_1h']
+        indicators.last_1h_time = ts(state['last_1h_time'])
+        indicators.last_5m_time = ts(state['last_5m_time'])
+        indicators.resampler = CandleResampler.from_state(state['resampler'])
+        return indicators
@@ -0,0 +1,168 @@
+# live_orchestrator.py
+import asyncio
+import time
+import pandas as pd
+from configuration import Config
+from strategy_kernel import StrategyKernel
+from live_runner import BinanceClient, enter_position, exit_position, refresh_indicators, restore_state, track_performance
+from telemetry import metrics
+from utils import interval_to_seconds, setup_logger
+
+logger = setup_logger('LiveOrchestrator')
+
+class SymbolTrader:
+    """Per-symbol state: strategy kernel (capital, position), indicators and the task's event queue."""
+
+    def __init__(self, symbol, capital, clock=time.time):
+        self.symbol = symbol
+        self.kernel = StrategyKernel(capital, symbol=symbol, logger=logger)
+        self.performance = track_performance(self.kernel, prefix=f'perf.{symbol}', clock=clock)
+        self.indicators = restore_state(self.kernel)  # None unless resuming after a restart
+        self.events = asyncio.Queue()
+
+    @property
+    def position(self):
+        return self.kernel.position
+
+class LiveOrchestrator:
+    """
+    Polling live trading for many symbols in one process, same strategy and
+    order path as run_live. One asyncio task per symbol works through that
+    symbol's events in order, so its entries and exits never race. Two shared
+    tasks produce the events:
+    - candle clock: after every 5m close, wakes every symbol at once to
+      fetch its klines (Binance has no multi-symbol klines endpoint, the
+      requests run concurrently)
+    - price poller: while positions are open, one ticker request prices
+      every symbol for the exit checks
+    All REST calls go through one BinanceClient (shared connection pool and
+    rate limiters), at most max_concurrent at a time. clock / sleep can be
+    replaced to run against a replayed exchange.
+    """
+
+    def __init__(self, client=None, symbols=None, capital=10000, poll_seconds=None, candle_delay=None,
+                 max_concurrent=None, max_positions=None, clock=time.time, sleep=asyncio.sleep):
+        self.client = client or BinanceClient()
+        self.symbols = list(symbols or Config.LIVE_SYMBOLS)
+        self.poll_seconds = poll_seconds or Config.LIVE_POLL_SECONDS
+        self.candle_delay = Config.LIVE_CANDLE_DELAY if candle_delay is None else candle_delay
+        self.max_concurrent = max_concurrent or Config.LIVE_MAX_CONCURRENT
+        self.max_positions = max_positions or Config.MAX_OPEN_POSITIONS
+        self.clock, self.sleep = clock, sleep
+        self.capital = capital
+        self.traders = {}
+        self._requests = None
+        self._entering = 0  # Entry orders in flight, counted against max_positions
+
+    @property
+    def open_positions(self):
+        return sum(trader.position is not None for trader in self.traders.values())
+
+    async def call(self, fn, *args):
+        """Runs a blocking client call in a thread, at most max_concurrent at once."""
+        async with self._requests:
+            return await asyncio.to_thread(fn, *args)
+
+    async def run(self, cycles=None):
+        """Seeds every symbol, then trades until cancelled (or `cycles` candles have closed)."""
+        self._requests = asyncio.Semaphore(self.max_concurrent)
+        # Capital is split evenly, every symbol sizes on its own share
+        self.traders = {s: SymbolTrader(s, self.capital / len(self.symbols), self.clock) for s in self.symbols}
+        logger.info(f"Starting Live Trading on {len(self.symbols)} symbols: {', '.join(self.symbols)}")
+        await asyncio.gather(*(self.seed(trader) for trader in self.traders.values()))
+
+        tasks = [asyncio.create_task(self.trade(trader)) for trader in self.traders.values()]
+        poller = asyncio.create_task(self.poll_prices())
+        try:
+            await self.candle_clock(cycles)
+            # Let every symbol finish its last candle
+            await asyncio.gather(*(trader.events.join() for trader in self.traders.values()))
+        finally:
+            for task in tasks + [poller]:
+                task.cancel()
+            await asyncio.gather(*tasks, poller, return_exceptions=True)
+
+    async def seed(self, trader):
+        """Seeds the indicators from history, or catches restored ones up on the candles missed."""
+        trader.indicators, _ = await self.call(refresh_indicators, self.client, trader.indicators, trader.symbol, self.clock())
+
+    # --- 1. SHARED EVENT SOURCES ---
+    async def candle_clock(self, cycles=None):
+        step = interval_to_seconds(Config.TF_ENTRY)
+        count = 0
+        while cycles is None or count < cycles:
+            now = self.clock()
+            await self.sleep(step - now % step + self.candle_delay)
+            metrics.incr('cycles')
+            for trader in self.traders.values():
+                trader.events.put_nowait(('candle', None))
+            count += 1
+
+    async def poll_prices(self):
+        while True:
+            await self.sleep(self.poll_seconds)
+            holding = [s for s, trader in self.traders.items() if trader.position]
+            if not holding:
+                continue
+            prices = await self.call(self.client.get_prices, holding)
+            for symbol in holding:
+                if symbol in prices:
+                    self.traders[symbol].events.put_nowait(('price', prices[symbol]))
+
+    # --- 2. ONE TASK PER SYMBOL ---
+    async def trade(self, trader):
+        while True:
+            event, price = await trader.events.get()
+            try:
+                if event == 'candle':
+                    await self.on_candle(trader)
+                elif trader.position:
+                    await self.on_price(trader, price)
+            except Exception as e:
+                metrics.incr('loop_errors')
+                logger.error(f"{trader.symbol}: error in loop: {e}")
+            finally:
+                trader.events.task_done()
+
+    async def on_candle(self, trader):
+        with metrics.span('cycle.refresh'):
+            trader.indicators, next_open = await self.call(
+                refresh_indicators, self.client, trader.indicators, trader.symbol, self.clock())
+        if trader.position or not trader.indicators.ready:
+            return
+
+        with metrics.span('cycle.signal'):
+            signal, sl, tp = trader.kernel.signal(trader.indicators.signal_inputs(next_open))
+        if not signal:
+            return
+        metrics.incr('signals')
+        if self.open_positions + self._entering >= self.max_positions:
+            metrics.incr('signals_skipped')
+            logger.warning(f"{trader.symbol}: skipped {signal}, {self.max_positions} positions already open")
+            return
+
+        closed = trader.indicators.last_closed()
+        candle_close = pd.Timestamp(closed['timestamp']) + pd.Timedelta(seconds=interval_to_seconds(Config.TF_ENTRY))
+        metrics.observe('decision_lag', self.clock() - candle_close.timestamp())
+        logger.info(f"{trader.symbol}: SIGNAL DETECTED: {signal} (SL: {sl:.2f} TP: {tp:.2f})")
+        self._entering += 1
+        try:
+            with metrics.span('cycle.entry'):
+                await self.call(enter_position, self.client, trader.kernel, signal, next_open, sl, tp, candle_close)
+        finally:
+            self._entering -= 1
+
+    async def on_price(self, trader, price):
+        exit_reason = trader.kernel.check_exit(price)
+        if exit_reason:
+            await self.call(exit_position, self.client, trader.kernel, price, exit_reason,
+                            pd.Timestamp(self.clock(), unit='s'))
+
+def run_orchestrator(symbols=None):
+    metrics.start_snapshots(Config.METRICS_FILE, Config.METRICS_INTERVAL)
+    if Config.METRICS_PORT:
+        metrics.serve(port=Config.METRICS_PORT)
+    asyncio.run(LiveOrchestrator(symbols=symbols).run())
+
+if __name__ == "__main__":
+    run_orchestrator()
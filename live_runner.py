@@ -1,43 +1,60 @@
 import time
-import math
 import pandas as pd
-import requests
 import hmac
 import hashlib
-from datetime import datetime, timedelta
 from configuration import Config
-from strategy import BiTimeframeStrategy
-from utils import calculate_indicators, setup_logger
+from strategy_kernel import StrategyKernel
+from indicators import IncrementalIndicators
+from execution import parse_fill
+from http_client import HttpSession
+from performance import LiveMetrics
+from telemetry import metrics
+from state_store import StateStore
+from utils import interval_to_seconds, setup_logger
 
 # Initialize Logger
 logger = setup_logger('LiveTrading')
 
+def klines_weight(limit):
+    """Request weight of /fapi/v1/klines for a given limit."""
+    if limit < 100: return 1
+    if limit < 500: return 2
+    if limit <= 1000: return 5
+    return 10
+
 class BinanceClient:
-    def __init__(self):
+    def __init__(self, trade_url=None, data_url=None):
         # 1. URL for TRADING (Testnet)
         # We use the URL from your Config file for placing orders.
-        self.trade_url = Config.TESTNET_BASE_URL
+        self.trade_url = trade_url or Config.TESTNET_BASE_URL
         
         # 2. URL for DATA (Mainnet - Real Money/Charts)
-        # We hardcode the live URL here so candles match TradingView.
-        self.data_url = "https://fapi.binance.com"
+        # Live URL by default so candles match TradingView (overridable for local stubs).
+        self.data_url = data_url or Config.DATA_BASE_URL
         
         self.headers = {'X-MBX-APIKEY': Config.API_KEY}
 
+        # Pooled keep-alive sessions, one rate limiter per host
+        self.data = HttpSession(self.data_url, weight_limit=Config.DATA_WEIGHT_LIMIT)
+        self.trade = HttpSession(self.trade_url, weight_limit=Config.TRADE_WEIGHT_LIMIT, headers=self.headers)
+
+    def latency_report(self):
+        """Per-endpoint latency stats (count, errors, p50/p95/p99 in ms) for both hosts."""
+        return {**self.data.stats.summary(), **self.trade.stats.summary()}
+
     def _sign(self, params):
+        params['timestamp'] = int(time.time() * 1000)  # Fresh on every (re)try
         query_string = '&'.join([f"{k}={v}" for k, v in params.items()])
         signature = hmac.new(Config.API_SECRET.encode('utf-8'), query_string.encode('utf-8'), hashlib.sha256).hexdigest()
         return f"{query_string}&signature={signature}"
 
     def get_klines(self, symbol, interval, limit=100):
         # FETCH DATA FROM MAINNET (REAL MARKET DATA)
-        url = f"{self.data_url}/fapi/v1/klines"
         params = {'symbol': symbol, 'interval': interval, 'limit': limit}
         
         try:
-            r = requests.get(url, params=params, timeout=10)
-            r.raise_for_status()
-            data = r.json()
+            with metrics.span('api.klines'):
+                data = self.data.get('/fapi/v1/klines', params=params, weight=klines_weight(limit))
             
             df = pd.DataFrame(data, columns=['timestamp', 'Open', 'High', 'Low', 'Close', 'Volume', 'CloseTime', '7', '8', '9', '10', '11'])
             df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
@@ -45,122 +62,268 @@ class BinanceClient:
             df = df[['Open', 'High', 'Low', 'Close']].astype(float)
             return df
         except Exception as e:
+            metrics.incr('api_errors')
             logger.error(f"Error fetching klines from Mainnet: {e}")
             raise e
 
     def get_current_price(self, symbol):
         # FETCH PRICE FROM MAINNET (REAL MARKET PRICE)
-        url = f"{self.data_url}/fapi/v1/ticker/price"
         params = {'symbol': symbol}
         try:
-            r = requests.get(url, params=params, timeout=5)
-            return float(r.json()['price'])
+            with metrics.span('api.price'):
+                return float(self.data.get('/fapi/v1/ticker/price', params=params, timeout=5)['price'])
         except Exception as e:
+            metrics.incr('api_errors')
             logger.error(f"Error fetching price from Mainnet: {e}")
             return None
 
-    def place_order(self, side, quantity):
+    def get_prices(self, symbols=None):
+        """Last price of every symbol in one request ({symbol: price}, empty on error)."""
+        try:
+            with metrics.span('api.prices'):
+                data = self.data.get('/fapi/v1/ticker/price', weight=2, timeout=5)
+        except Exception as e:
+            metrics.incr('api_errors')
+            logger.error(f"Error fetching prices from Mainnet: {e}")
+            return {}
+        wanted = set(symbols) if symbols is not None else None
+        return {row['symbol']: float(row['price']) for row in data if wanted is None or row['symbol'] in wanted}
+
+    def place_order(self, side, quantity, symbol=None, quote=None):
+        """
+        MARKET order of a quantity already on the lot step (StrategyKernel sizes it).
+        Returns the execution.Fill (average price, fee, latency), None if it failed.
+        `quote` is the price the order was decided on, the fill price if none is reported.
+        """
         # EXECUTE ORDER ON TESTNET (PAPER TRADING)
-        url = f"{self.trade_url}/api/v3/order"
-        
+        symbol = symbol or Config.SYMBOL
         params = {
-            'symbol': Config.SYMBOL,
+            'symbol': symbol,
             'side': side,
             'type': 'MARKET',
-            'quantity': round(quantity, 3),
-            'timestamp': int(time.time() * 1000)
+            'quantity': round(quantity, 8),  # Drops float noise only
         }
         
-        query = self._sign(params)
         try:
-            r = requests.post(f"{url}?{query}", headers=self.headers, timeout=5)
-            res_json = r.json()
+            start = time.perf_counter()
+            with metrics.span('api.order'):
+                res_json = self.trade.post('/api/v3/order', params=params, timeout=5, sign=self._sign)
+            latency = time.perf_counter() - start
             
             if 'orderId' in res_json:
-                logger.info(f"ORDER FILLED (Testnet): {side} {quantity} @ Market")
-                return True
+                fill = parse_fill(res_json, side, quote, quantity, symbol, latency)
+                metrics.incr('orders_filled')
+                if quote:
+                    metrics.observe('slippage_bps', (fill.price / quote - 1) * 10000 * (1 if side == 'BUY' else -1))
+                logger.info(f"ORDER FILLED (Testnet): {side} {fill.quantity} @ {fill.price} (fee {fill.fee:.4f}, {latency * 1000:.0f} ms)")
+                return fill
             else:
+                metrics.incr('orders_failed')
                 logger.error(f"Order Failed: {res_json}")
-                return False
+                return None
         except Exception as e:
+            metrics.incr('orders_failed')
+            metrics.incr('api_errors')
             logger.error(f"Order execution error: {e}")
-            return False
-
-def get_seconds_to_next_candle():
-    """Calculates seconds remaining until the next 5-minute mark."""
-    now = datetime.now()
-    minutes_to_next = 5 - (now.minute % 5)
-    target_time = now + timedelta(minutes=minutes_to_next)
-    target_time = target_time.replace(second=0, microsecond=0)
-    
-    seconds_remaining = (target_time - now).total_seconds()
+            return None
+
+def get_seconds_to_next_candle(now=None):
+    """Calculates seconds remaining until the next 5-minute mark (`now` in epoch seconds)."""
+    now = time.time() if now is None else now
+    step = interval_to_seconds(Config.TF_ENTRY)
+    seconds_remaining = step - now % step
     return max(seconds_remaining, 1)
 
-def run_live():
-    client = BinanceClient()
+def refresh_indicators(client, indicators=None, symbol=None, now=None):
+    """
+    Feeds the candles closed since the last update into the incremental
+    indicator state. Seeds (or re-seeds after a long gap) from history.
+    Only CLOSED candles are used, the last kline is always still forming.
+    With Config.RESAMPLE_LIVE the 1H candles are only fetched for the seed,
+    afterwards they are resampled from the 5m ones.
+    `now` (epoch seconds) defaults to the wall clock.
+    Returns (indicators, open of the just-opened 5m candle).
+    """
+    symbol = symbol or Config.SYMBOL
+    now = time.time() if now is None else now
+    limits = {}
+    if indicators is not None:
+        last_times = {Config.TF_ENTRY: indicators.last_5m_time}
+        if not Config.RESAMPLE_LIVE:
+            last_times[Config.TF_FILTER] = indicators.last_1h_time
+        for interval, last_time in last_times.items():
+            missed = int((now - last_time.timestamp()) // interval_to_seconds(interval))
+            limits[interval] = missed + 2
+        if max(limits.values()) > Config.LIVE_HISTORY_LIMIT:
+            indicators = None
+
+    if indicators is None:
+        df_5m = client.get_klines(symbol, Config.TF_ENTRY, limit=Config.LIVE_HISTORY_LIMIT)
+        df_1h = client.get_klines(symbol, Config.TF_FILTER, limit=Config.LIVE_HISTORY_LIMIT)
+        logger.info(f"Seeding {symbol} indicators from {len(df_5m)} x {Config.TF_ENTRY} and {len(df_1h)} x {Config.TF_FILTER} candles")
+        metrics.incr('indicator_seeds')
+        with metrics.span('indicators.seed'):
+            indicators = IncrementalIndicators.seed(df_5m.iloc[:-1], df_1h.iloc[:-1])
+        state_store().save_indicators(symbol, indicators)
+        return indicators, df_5m['Open'].iloc[-1]
+
+    df_5m = client.get_klines(symbol, Config.TF_ENTRY, limit=limits[Config.TF_ENTRY])
+    df_1h = None if Config.RESAMPLE_LIVE else client.get_klines(symbol, Config.TF_FILTER, limit=limits[Config.TF_FILTER])
+
+    # The last candle we processed must overlap the new fetch, otherwise we missed some
+    if indicators.last_5m_time not in df_5m.index or (df_1h is not None and indicators.last_1h_time not in df_1h.index):
+        logger.warning(f"Gap in {symbol} candle stream detected. Re-seeding indicators...")
+        return refresh_indicators(client, None, symbol, now)
+
+    with metrics.span('indicators.update'):
+        indicators.update(df_5m.iloc[:-1], None if df_1h is None else df_1h.iloc[:-1])
+    with metrics.span('state.save'):
+        state_store().save_indicators(symbol, indicators)
+    return indicators, df_5m['Open'].iloc[-1]
+
+def enter_position(client, kernel, signal, entry_price, sl, tp, timestamp=None):
+    """
+    Sizes the entry with the strategy kernel and places the order. Shared by
+    the polling and streaming loops. `timestamp` defaults to the wall clock
+    in UTC, like the candle times. Returns the new Position (also open in
+    the kernel), or None if skipped / not filled.
+    """
+    # Short trades are not supported on the Spot Testnet
+    if signal == 'SELL':
+        metrics.incr('signals_skipped')
+        logger.warning("Skipped SELL signal (Spot Long-Only Mode)")
+        return None
+
+    position = kernel.prepare(timestamp or pd.Timestamp(time.time(), unit='s'), signal, entry_price, sl, tp)
+    if position is None:
+        metrics.incr('signals_skipped')
+        return None
+
+    # Execute Entry on Testnet, booked at the exchange's fill
+    fill = client.place_order(signal, position.size, kernel.symbol, quote=entry_price)
+    if fill:
+        logger.info(f"Entered {signal}. Size: {fill.quantity:.4f}")
+        kernel.commit(position, fill)
+        state_store().save_kernel(kernel)
+        return position
+    return None
+
+_store = None
+
+def state_store():
+    """The live state store (positions, indicator state, trade journal), opened on first use."""
+    global _store
+    if _store is None:
+        _store = StateStore(Config.STATE_DB)
+    return _store
+
+def restore_state(kernel):
+    """Resumes the kernel's capital / open position and its indicators after a restart (indicators None if new)."""
+    store = state_store()
+    store.restore_kernel(kernel)
+    return store.load_indicators(kernel.symbol)
+
+def exit_position(client, kernel, price, exit_reason, timestamp=None):
+    """Places the closing order for the kernel's position and books the trade. Returns True once flat."""
+    position = kernel.position
+    timestamp = timestamp or pd.Timestamp(time.time(), unit='s')  # UTC, like the candle times
+    logger.info(f"EXIT SIGNAL: {exit_reason} at {price}")
+    close_side = 'SELL' if position.type == 'BUY' else 'BUY'
+
+    # Execute Exit on Testnet
+    fill = client.place_order(close_side, position.size, kernel.symbol, quote=price)
+    if fill:
+        record = kernel.close(timestamp, exit_reason, price, fill=fill)
+        state_store().record_exit(kernel, record, position.latency, fill.latency)
+        metrics.incr(f'exits_{exit_reason}')
+        return True
+    return False
+
+def track_performance(kernel, prefix='perf', clock=time.time):
+    """
+    Books every trade the kernel closes into an incremental LiveMetrics
+    (no recomputation from the journal) and publishes the summary as
+    telemetry gauges (perf.win_rate, perf.max_drawdown, ...).
+    The metrics period starts now on `clock` (epoch seconds, as run_live's).
+    """
+    performance = LiveMetrics(kernel.initial_capital, start=pd.Timestamp(clock(), unit='s'))
+
+    def on_trade(record):
+        performance.add(record)
+        summary = performance.summary()
+        for key, value in summary.items():
+            metrics.gauge(f'{prefix}.{key}', value)
+        logger.info(f"Live {kernel.symbol}: {summary['total_trades']} trades | Net ${summary['net_profit']:.2f} | "
+                    f"Win {summary['win_rate']:.1%} | Max DD {summary['max_drawdown']:.2%}")
+
+    kernel.on_trade = on_trade
+    return performance
+
+def run_live(client=None, clock=time.time, sleep=time.sleep, max_cycles=None):
+    """
+    Polling live loop. clock / sleep (epoch seconds) can be replaced to run
+    on a replayed exchange (mock_exchange.py); max_cycles stops it after that
+    many 5m candles. Returns the strategy kernel.
+    """
+    client = client or BinanceClient()
     logger.info(f"Starting Live Trading on {Config.SYMBOL} (Hybrid Mode: Real Data / Testnet Execution)")
     
-    current_position = None 
     INITIAL_CAPITAL = 10000 
+    kernel = StrategyKernel(INITIAL_CAPITAL, logger=logger)  # Same per-trade logic as the backtests
+    track_performance(kernel, clock=clock)
+    indicators = restore_state(kernel)  # Open position and indicators from before a restart
+
+    # Structured timings / counters next to the log lines
+    metrics.start_snapshots(Config.METRICS_FILE, Config.METRICS_INTERVAL)
+    if Config.METRICS_PORT:
+        metrics.serve(port=Config.METRICS_PORT)
 
-    while True:
+    cycles = 0
+    while max_cycles is None or cycles < max_cycles:
         try:
             # --- PHASE 1: MONITOR OPEN TRADE (FAST LOOP) ---
-            if current_position:
+            if kernel.position:
                 # Get Real Market Price for Signal Check
                 current_price = client.get_current_price(Config.SYMBOL)
                 
                 if current_price:
-                    exit_reason = BiTimeframeStrategy.check_exit(
-                        current_position['type'],
-                        current_position['sl'],
-                        current_position['tp'],
-                        low_price=current_price, 
-                        high_price=current_price
-                    )
+                    exit_reason = kernel.check_exit(current_price)
                     
                     if exit_reason:
-                        logger.info(f"EXIT SIGNAL: {exit_reason} at {current_price}")
-                        close_side = 'SELL' if current_position['type'] == 'BUY' else 'BUY'
-                        
-                        # Execute Exit on Testnet
-                        if client.place_order(close_side, current_position['size']):
-                            with open(Config.LIVE_OUTPUT, 'a') as f:
-                                f.write(f"{datetime.now()},{Config.SYMBOL},{close_side},{current_position['entry']},{current_price},{exit_reason}\n")
-                            current_position = None 
+                        exit_position(client, kernel, current_price, exit_reason, pd.Timestamp(clock(), unit='s'))
                     else:
-                        logger.info(f"In Trade. Price: {current_price} (SL: {current_position['sl']} TP: {current_position['tp']})")
+                        logger.info(f"In Trade. Price: {current_price} (SL: {kernel.position.sl} TP: {kernel.position.tp})")
                 
-                time.sleep(60) 
+                sleep(60) 
                 continue 
 
             # --- PHASE 2: WAIT FOR CANDLE CLOSE (SYNC LOOP) ---
-            wait_seconds = get_seconds_to_next_candle()
+            wait_seconds = get_seconds_to_next_candle(clock())
             logger.info(f"Waiting {wait_seconds:.0f}s for next 5m candle close...")
-            time.sleep(wait_seconds)
+            sleep(wait_seconds)
             
             logger.info("Candle Closed. Fetching Data...")
-            time.sleep(5) # Buffer for API to update
+            sleep(5) # Buffer for API to update
+            cycles += 1
 
             # --- PHASE 3: FETCH & PRINT DATA ---
-            # These now fetch from MAINNET
-            df_5m = client.get_klines(Config.SYMBOL, Config.TF_ENTRY)
-            df_1h = client.get_klines(Config.SYMBOL, Config.TF_FILTER)
-            
-            data = calculate_indicators(df_5m, df_1h)
+            # These now fetch from MAINNET, only the candles closed since last cycle
+            metrics.incr('cycles')
+            with metrics.span('cycle.refresh'):
+                indicators, next_open = refresh_indicators(client, indicators, now=clock())
 
-            # GRAB THE JUST CLOSED CANDLE (Index -2)
-            closed_candle = data.iloc[-2]
+            # GRAB THE JUST CLOSED CANDLE
+            closed_candle = indicators.last_closed()
             
             # 1. Print 1H Trend Status
             trend_price = closed_candle['Close_1h']
-            trend_ema = closed_candle['EMA_21_1h']
+            trend_ema = closed_candle['EMA_1h']
             trend_dir = "BULLISH" if trend_price > trend_ema else "BEARISH"
             
             logger.info("------------------------------------------------")
-            logger.info(f"1H TREND CHECK ({closed_candle.name})")
+            logger.info(f"1H TREND CHECK ({closed_candle['timestamp']})")
             logger.info(f"   1H Close: {trend_price:.2f}")
-            logger.info(f"   1H EMA21: {trend_ema:.2f}")
+            logger.info(f"   1H EMA{Config.EMA_PERIOD}: {trend_ema:.2f}")
             logger.info(f"   STATUS  : {trend_dir}")
             
             # 2. Print 5M Candle Data
@@ -172,44 +335,29 @@ def run_live():
             logger.info("------------------------------------------------")
 
             # --- PHASE 4: CHECK STRATEGY ---
-            signal, sl, tp = BiTimeframeStrategy.get_signal(
-                data.Open.values[-3:], 
-                data.High.values[-3:], 
-                data.Low.values[-3:], 
-                data.Close.values[-3:],
-                data.Close_1h.values[-3:], 
-                data.EMA_21_1h.values[-3:]
-            )
+            with metrics.span('cycle.signal'):
+                signal, sl, tp = kernel.signal(indicators.signal_inputs(next_open))
+
+            # How long after the candle close the decision was made
+            candle_close = pd.Timestamp(closed_candle['timestamp']) + pd.Timedelta(seconds=interval_to_seconds(Config.TF_ENTRY))
+            metrics.observe('decision_lag', clock() - candle_close.timestamp())
 
-            print(f"Signal: {signal}, SL: {sl}, TP: {tp}")
+            logger.info(f"Signal: {signal}, SL: {sl}, TP: {tp}")
 
             if signal:
+                metrics.incr('signals')
                 logger.info(f"SIGNAL DETECTED: {signal}")
-                entry_price = closed_candle['Close']
-                risk_amt = INITIAL_CAPITAL * Config.RISK_PER_TRADE
-                quantity = BiTimeframeStrategy.get_position_size(entry_price, sl, risk_amt)
-                
-                if signal == 'SELL':
-                    print("Short trades not supported in Spot Testnet. Skipping...")
-                    logger.warning("Skipped SELL signal (Spot Long-Only Mode)")
-                    continue
-
-                # Execute Entry on Testnet
-                if client.place_order(signal, quantity):
-                    current_position = {
-                        'type': signal,
-                        'entry': entry_price,
-                        'sl': sl,
-                        'tp': tp,
-                        'size': quantity
-                    }
-                    logger.info(f"Entered {signal}. Size: {quantity:.4f}")
+                # Entered at the open of the new candle, where the signal measures its risk from
+                with metrics.span('cycle.entry'):
+                    enter_position(client, kernel, signal, next_open, sl, tp, candle_close)
             else:
                  logger.info("No Signal. Sleeping...")
 
         except Exception as e:
+            metrics.incr('loop_errors')
             logger.error(f"Error in loop: {e}")
-            time.sleep(10)
+            sleep(10)
+    return kernel
 
 if __name__ == "__main__":
     run_live()
\ No newline at end of file
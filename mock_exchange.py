@@ -0,0 +1,332 @@
+# mock_exchange.py
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+import numpy as np
+import pandas as pd
+from configuration import Config
+from resampler import interval_ms, resample_arrays
+from candle_store import to_epoch_ms
+from utils import setup_logger
+
+logger = setup_logger('MockExchange')
+
+class ReplayClock:
+    """Replayed market time: starts at `start` and runs `speed` x faster than the wall clock."""
+
+    def __init__(self, start, speed=None):
+        self.start = pd.Timestamp(start).timestamp()
+        self.speed = speed or Config.MOCK_SPEED
+        self._t0 = time.monotonic()
+
+    def time(self):
+        """Replayed epoch seconds (drop-in for time.time)."""
+        return self.start + (time.monotonic() - self._t0) * self.speed
+
+    def sleep(self, seconds):
+        """Sleeps `seconds` of replayed time (drop-in for time.sleep)."""
+        time.sleep(max(seconds, 0) / self.speed)
+
+    async def async_sleep(self, seconds):
+        import asyncio
+        await asyncio.sleep(max(seconds, 0) / self.speed)
+
+class MockExchange:
+    """
+    Local stand-in for the Binance endpoints BinanceClient uses, replaying
+    candle history on a ReplayClock:
+        GET  /fapi/v1/klines        closed candles plus the forming one
+        GET  /fapi/v1/ticker/price  one symbol or all of them
+        POST /api/v3/order          signed MARKET orders, filled at the replayed price
+    Inside a 5m candle the price walks open -> low/high -> high/low -> close
+    (the same path as ws_replay_server.py). Orders are checked like Binance
+    does (API key, HMAC-SHA256 signature of the query, recvWindow) and
+    request weight is counted per minute with the X-MBX-USED-WEIGHT-1M header.
+
+    Fault injection: every request is delayed by `latency` real seconds (plus
+    up to `jitter`; `speed` times as long in replayed time), fails with HTTP 503 with probability `error_rate` and is
+    rate limited (HTTP 429 + Retry-After) with probability `rate_limit_rate`.
+    """
+    RECV_WINDOW_MS = 5000
+
+    def __init__(self, datasets, speed=None, clock=None, api_key=None, api_secret=None, latency=0.0, jitter=0.0,
+                 error_rate=0.0, rate_limit_rate=0.0, weight_limit=None, fee_rate=None, seed=None):
+        """
+        datasets: {symbol: (df_5m, df_1h)} candle frames indexed by open time
+                  (df_1h may be None: resampled from the 5m candles).
+        clock:    ReplayClock, by default running at `speed` from LIVE_HISTORY_LIMIT
+                  1H candles into the data (enough history to seed the live indicators).
+        """
+        self.base_ms = interval_ms(Config.TF_ENTRY)
+        self.candles = {}
+        for symbol, (df_5m, df_1h) in datasets.items():
+            self.candles[symbol] = {Config.TF_ENTRY: self._arrays(df_5m)}
+            if df_1h is not None:
+                self.candles[symbol][Config.TF_FILTER] = self._arrays(df_1h)
+        first = min(c[Config.TF_ENTRY]['timestamp'][0] for c in self.candles.values())
+        start = pd.Timestamp(first, unit='ms') + pd.Timedelta(hours=Config.LIVE_HISTORY_LIMIT)
+        self.clock = clock or ReplayClock(start, speed)
+
+        self.api_key = api_key or Config.API_KEY
+        self.api_secret = api_secret or Config.API_SECRET
+        self.latency, self.jitter = latency, jitter
+        self.error_rate, self.rate_limit_rate = error_rate, rate_limit_rate
+        self.weight_limit = weight_limit or Config.DATA_WEIGHT_LIMIT
+        self.fee_rate = Config.FEE_RATE if fee_rate is None else fee_rate  # Commission, paid in the quote asset
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.orders = []
+        self.positions = {}  # symbol -> net filled quantity
+        self.requests = 0
+        self._weight_minute, self._used_weight = None, 0
+        self._server = None
+        self.url = None
+
+    @staticmethod
+    def _arrays(df):
+        df = df.rename(columns=str.lower)
+        arrays = {col: df[col].to_numpy(dtype=float) for col in ('open', 'high', 'low', 'close')}
+        arrays['volume'] = df['volume'].to_numpy(dtype=float) if 'volume' in df else np.zeros(len(df))
+        arrays['timestamp'] = to_epoch_ms(df.index)
+        return arrays
+
+    def series(self, symbol, interval):
+        """Candle arrays of one interval (anything else than the given ones is resampled from 5m)."""
+        candles = self.candles[symbol]
+        if interval not in candles:
+            candles[interval] = resample_arrays(candles[Config.TF_ENTRY], interval, Config.TF_ENTRY)
+        return candles[interval]
+
+    # --- 1. MARKET STATE AT THE REPLAYED TIME ---
+    def _so_far(self, symbol, now_ms):
+        """(5m row, open, high, low, price) of the forming 5m candle at now_ms."""
+        base = self.candles[symbol][Config.TF_ENTRY]
+        j = int(np.searchsorted(base['timestamp'], now_ms, side='right')) - 1
+        if j < 0:
+            return None
+        o, h, l, c = (base[col][j] for col in ('open', 'high', 'low', 'close'))
+        frac = min((now_ms - base['timestamp'][j]) / self.base_ms, 1.0)
+        path = (o, l, h, c) if c >= o else (o, h, l, c)
+        seg = min(int(frac * 3), 2)
+        price = path[seg] + (path[seg + 1] - path[seg]) * (frac * 3 - seg)
+        visited = path[:seg + 1] + (price,)
+        return j, o, max(visited), min(visited), price
+
+    def price(self, symbol, now_ms=None):
+        state = self._so_far(symbol, self.now_ms() if now_ms is None else now_ms)
+        return None if state is None else float(state[4])
+
+    def now_ms(self):
+        return int(self.clock.time() * 1000)
+
+    def klines(self, symbol, interval, limit=500, start_time=None, end_time=None):
+        """Binance kline rows with open time <= now; the last one is still forming."""
+        now_ms = self.now_ms()
+        arr = self.series(symbol, interval)
+        step = interval_ms(interval)
+        times = arr['timestamp']
+        lo = 0 if start_time is None else int(np.searchsorted(times, start_time, side='left'))
+        hi = int(np.searchsorted(times, min(now_ms, end_time if end_time is not None else now_ms), side='right'))
+        lo = max(lo, hi - limit) if start_time is None else lo
+        hi = min(hi, lo + limit)
+
+        rows = []
+        for i in range(lo, hi):
+            t = int(times[i])
+            o, h, l, c, v = (arr[col][i] for col in ('open', 'high', 'low', 'close', 'volume'))
+            if t + step > now_ms:
+                o, h, l, c, v = self._forming(symbol, t, now_ms)
+            rows.append([t, str(o), str(h), str(l), str(c), str(v), t + step - 1, '0', 0, '0', '0', '0'])
+        return rows
+
+    def _forming(self, symbol, open_ms, now_ms):
+        """OHLCV so far of a candle opened at open_ms: its closed 5m candles plus the forming one."""
+        base = self.candles[symbol][Config.TF_ENTRY]
+        state = self._so_far(symbol, now_ms)
+        if state is None:  # Higher timeframe history from before the 5m data
+            return 0.0, 0.0, 0.0, 0.0, 0.0
+        j, o, h, l, price = state
+        first = int(np.searchsorted(base['timestamp'], open_ms, side='left'))
+        if first < j:
+            o = base['open'][first]
+            h = max(h, base['high'][first:j].max())
+            l = min(l, base['low'][first:j].min())
+        return o, h, l, price, float(base['volume'][first:j].sum())
+
+    # --- 2. ORDERS ---
+    def sign(self, query_string):
+        return hmac.new(self.api_secret.encode('utf-8'), query_string.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def place_order(self, query_string, api_key):
+        """Validates a signed order query like Binance. Returns (HTTP status, body)."""
+        if api_key != self.api_key:
+            return 401, {'code': -2015, 'msg': 'Invalid API-key, IP, or permissions for action.'}
+        payload, _, signature = query_string.rpartition('&signature=')
+        if not payload or not hmac.compare_digest(signature, self.sign(payload)):
+            return 400, {'code': -1022, 'msg': 'Signature for this request is not valid.'}
+        params = dict(parse_qsl(payload))
+        recv_window = int(params.get('recvWindow', self.RECV_WINDOW_MS))
+        if abs(time.time() * 1000 - int(params.get('timestamp', 0))) > recv_window:
+            return 400, {'code': -1021, 'msg': "Timestamp for this request is outside of the recvWindow."}
+        if params.get('type') != 'MARKET' or params.get('side') not in ('BUY', 'SELL') \
+                or float(params.get('quantity', 0)) <= 0 or params.get('symbol') not in self.candles:
+            return 400, {'code': -1102, 'msg': 'Mandatory parameter was not sent, was empty/null, or malformed.'}
+
+        now_ms = self.now_ms()
+        price = self.price(params['symbol'], now_ms)
+        quantity = float(params['quantity']) * (1 if params['side'] == 'BUY' else -1)
+        with self.lock:
+            order_id = len(self.orders) + 1
+            net = self.positions.get(params['symbol'], 0.0)
+            self.positions[params['symbol']] = round(net + quantity, 8)
+            # Decision latency: replayed time since the last 5m close, in real seconds
+            since_close = (now_ms % self.base_ms) / 1000 / self.clock.speed
+            self.orders.append({'orderId': order_id, 'time': pd.Timestamp(now_ms, unit='ms'), 'symbol': params['symbol'],
+                                'side': params['side'], 'quantity': abs(quantity), 'price': price,
+                                'entry': round(net, 8) == 0, 'since_close': since_close})
+        return 200, {'symbol': params['symbol'], 'orderId': order_id, 'transactTime': now_ms, 'status': 'FILLED',
+                     'type': 'MARKET', 'side': params['side'], 'origQty': params['quantity'],
+                     'executedQty': params['quantity'],
+                     'fills': [{'price': str(price), 'qty': params['quantity'], 'commissionAsset': 'USDT',
+                                'commission': str(price * abs(quantity) * self.fee_rate)}]}
+
+    # --- 3. HTTP ---
+    def _take_weight(self, weight):
+        """Used weight of the current minute, None if over the limit."""
+        with self.lock:
+            minute = int(time.time() // 60)
+            if minute != self._weight_minute:
+                self._weight_minute, self._used_weight = minute, 0
+            if self._used_weight + weight > self.weight_limit:
+                return None
+            self._used_weight += weight
+            return self._used_weight
+
+    def handle(self, method, path, query, api_key):
+        """Routes one request. Returns (HTTP status, body, extra headers)."""
+        self.requests += 1
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self.rng.uniform(0, self.jitter))
+        if self.rng.random() < self.rate_limit_rate:
+            return 429, {'code': -1003, 'msg': 'Too many requests (injected).'}, {'Retry-After': '1'}
+        if self.rng.random() < self.error_rate:
+            return 503, {'code': -1001, 'msg': 'Service unavailable (injected).'}, {}
+
+        params = dict(parse_qsl(query))
+        if method == 'GET' and path == '/fapi/v1/klines':
+            limit = min(int(params.get('limit', 500)), 1500)
+            weight = 1 if limit < 100 else 2 if limit < 500 else 5 if limit <= 1000 else 10
+            route = lambda: (200, self.klines(params['symbol'], params['interval'], limit,
+                                              _int(params.get('startTime')), _int(params.get('endTime'))))
+        elif method == 'GET' and path == '/fapi/v1/ticker/price':
+            weight = 1 if 'symbol' in params else 2
+            def route():
+                now_ms = self.now_ms()
+                if 'symbol' in params:
+                    return 200, {'symbol': params['symbol'], 'price': str(self.price(params['symbol'], now_ms)), 'time': now_ms}
+                return 200, [{'symbol': s, 'price': str(self.price(s, now_ms)), 'time': now_ms} for s in self.candles]
+        elif method == 'POST' and path == '/api/v3/order':
+            weight = 1
+            route = lambda: self.place_order(query, api_key)
+        else:
+            return 404, {'code': -1100, 'msg': f'Unknown endpoint {method} {path}'}, {}
+
+        used = self._take_weight(weight)
+        if used is None:
+            return 429, {'code': -1003, 'msg': 'Too much request weight used.'}, {'Retry-After': str(60 - int(time.time()) % 60)}
+        try:
+            status, body = route()
+        except (KeyError, ValueError) as e:
+            status, body = 400, {'code': -1102, 'msg': f'Bad parameter: {e}'}
+        return status, body, {'X-MBX-USED-WEIGHT-1M': str(used)}
+
+    def start(self, host='127.0.0.1', port=None):
+        """Serves on http://host:port from a daemon thread (port 0 = any free port). Returns the base URL."""
+        exchange = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+
+            def _respond(self, method):
+                url = urlsplit(self.path)
+                query = url.query
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    body = self.rfile.read(length).decode()
+                    query = f"{query}&{body}" if query else body
+                status, body, headers = exchange.handle(method, url.path, query, self.headers.get('X-MBX-APIKEY'))
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond('GET')
+
+            def do_POST(self):
+                self._respond('POST')
+
+            def log_message(self, *args):
+                pass  # Keep requests out of the trading log
+
+        port = Config.MOCK_EXCHANGE_PORT if port is None else port
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='mock-exchange', daemon=True).start()
+        self.url = f"http://{host}:{self._server.server_port}"
+        logger.info(f"Mock exchange on {self.url} replaying from {pd.Timestamp(self.clock.start, unit='s')} "
+                    f"at {self.clock.speed:.0f}x")
+        return self.url
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def latency_report(self):
+        """
+        End-to-end decision latency: real seconds from the 5m close to the
+        entry order reaching the exchange (exits follow the price polls, not
+        the candle close, and are left out).
+        """
+        since_close = np.array([o['since_close'] for o in self.orders if o['entry']])
+        if len(since_close) == 0:
+            return {'entries': 0}
+        p50, p95, p99 = np.percentile(since_close, [50, 95, 99])
+        return {'entries': len(since_close), 'p50_s': float(p50), 'p95_s': float(p95), 'p99_s': float(p99),
+                'max_s': float(since_close.max())}
+
+def _int(value):
+    return None if value is None else int(value)
+
+def measure_run_live(cycles=100, speed=None, **faults):
+    """
+    Replays the backtest CSVs on a local MockExchange and runs run_live
+    against it for `cycles` 5m candles (at 100x by default, ~5 min per 100
+    candles). Returns the exchange, whose orders carry the decision latency.
+    """
+    from live_runner import BinanceClient, run_live
+    df_5m = pd.read_csv(Config.CSV_5M, parse_dates=True, index_col='timestamp')
+    df_1h = pd.read_csv(Config.CSV_1H, parse_dates=True, index_col='timestamp')
+    exchange = MockExchange({Config.SYMBOL: (df_5m, df_1h)}, speed=speed, **faults)
+    url = exchange.start(port=0)
+    try:
+        client = BinanceClient(trade_url=url, data_url=url)
+        run_live(client, clock=exchange.clock.time, sleep=exchange.clock.sleep, max_cycles=cycles)
+    finally:
+        exchange.stop()
+    report = exchange.latency_report()
+    logger.info(f"run_live at {exchange.clock.speed:.0f}x: {exchange.requests} requests, {report}")
+    return exchange
+
+if __name__ == "__main__":
+    measure_run_live()
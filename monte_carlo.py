@@ -0,0 +1,189 @@
+# monte_carlo.py
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from configuration import Config
+from utils import log_synchronously, setup_logger
+
+logger = setup_logger('MonteCarlo')
+
+METRICS = ('final_equity', 'max_drawdown', 'sharpe_ratio', 'sortino_ratio')
+
+def resample_paths(pnl, method, n_paths, rng, block_size, skip_prob):
+    """
+    (n_paths, n_trades) resampled PnL sequences:
+        shuffle   - the same trades in a random order
+        bootstrap - circular blocks of block_size consecutive trades, drawn
+                    with replacement (keeps streaks / serial correlation)
+        skip      - original order, every trade missed with probability skip_prob
+    """
+    n = len(pnl)
+    if method == 'shuffle':
+        return rng.permuted(np.tile(pnl, (n_paths, 1)), axis=1)
+    if method == 'bootstrap':
+        starts = rng.integers(0, n, (n_paths, -(-n // block_size)))
+        rows = (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :n]
+        return pnl[rows % n]
+    if method == 'skip':
+        return np.where(rng.random((n_paths, n)) < skip_prob, 0.0, pnl)
+    raise ValueError(f"Unknown method {method!r}")
+
+def path_metrics(paths, day_starts, trade_days, n_days, initial_capital, ruin_level):
+    """
+    Metrics of every path. Trade k of a path is booked on the day of the
+    original trade k, so Sharpe / Sortino come from daily returns exactly
+    like CustomBacktester.calculate_metrics. Overwrites `paths`.
+    """
+    ANNUAL_FACTOR = 365
+    daily = np.zeros((len(paths), n_days))
+    daily[:, trade_days] = np.add.reduceat(paths, day_starts, axis=1)
+    equity_daily = initial_capital + np.cumsum(daily, axis=1)
+    returns = equity_daily[:, 1:] / equity_daily[:, :-1] - 1  # pct_change
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # Paths without losing days
+        mean_return = returns.mean(axis=1) * ANNUAL_FACTOR
+        std_dev = returns.std(axis=1, ddof=1) * np.sqrt(ANNUAL_FACTOR)
+        downside_std = np.nanstd(np.where(returns < 0, returns, np.nan), axis=1, ddof=1) * np.sqrt(ANNUAL_FACTOR)
+        sharpe = np.where(std_dev != 0, mean_return / std_dev, 0.0)
+        sortino = np.where(downside_std != 0, mean_return / downside_std, 0.0)
+
+    # Trade by trade equity for drawdown and ruin (in place, no temporaries)
+    equity = np.cumsum(paths, axis=1, out=paths)
+    equity += initial_capital
+    final_equity = equity[:, -1].copy()
+    ruined = equity.min(axis=1) <= ruin_level
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, initial_capital, out=peak)
+    drawdown = 1 - np.divide(equity, peak, out=equity).min(axis=1)
+    return {
+        'final_equity': final_equity,
+        'max_drawdown': drawdown,
+        'sharpe_ratio': sharpe,
+        'sortino_ratio': sortino,
+        'ruined': ruined,
+    }
+
+def simulate_batch(task):
+    """One vectorized batch of paths (runs in a worker process when workers > 1)."""
+    method, n_paths, seed, analyzer = task
+    rng = np.random.default_rng(seed)
+    paths = resample_paths(analyzer.pnl, method, n_paths, rng, analyzer.block_size, analyzer.skip_prob)
+    return path_metrics(paths, analyzer.day_starts, analyzer.trade_days, analyzer.n_days,
+                        analyzer.initial_capital, analyzer.ruin_level)
+
+class MonteCarloAnalyzer:
+    """
+    Robustness of a backtest's trade list: resamples the trade PnL sequence
+    many times (shuffle / bootstrap / skip) and reports confidence intervals
+    for final equity, max drawdown, Sharpe and Sortino, plus the risk of ruin
+    (share of paths whose equity ever falls to ruin_level).
+    Paths are simulated in NumPy batches of batch_size, optionally spread
+    over a process pool. Results depend on the seed and batch_size, not on workers.
+    """
+    METHODS = ('shuffle', 'bootstrap', 'skip')
+
+    def __init__(self, trades, initial_capital=10000, days=None, block_size=None, skip_prob=None,
+                 ruin_fraction=None, confidence=None):
+        """
+        trades: CustomBacktester.trades or backtest_trades.csv as a DataFrame
+                (PnL is booked on exit_time, or on timestamp if there is none).
+        days:   calendar of the backtest (CustomBacktester.daily_pnl().index),
+                defaults to the days from the first to the last trade.
+        Raises ValueError if there are no trades (nothing to resample).
+        """
+        trades = pd.DataFrame(trades)
+        if trades.empty:
+            raise ValueError("No trades to analyze: the backtest did not close any")
+        times = pd.to_datetime(trades['exit_time'] if 'exit_time' in trades else trades['timestamp'])
+        order = np.argsort(times.to_numpy(), kind='stable')
+        self.pnl = trades['pnl'].to_numpy(dtype=float)[order]
+        trade_day = times.dt.normalize().to_numpy()[order]
+
+        if days is None:
+            days = pd.date_range(trade_day[0], trade_day[-1], freq='D')
+        days = pd.DatetimeIndex(days).normalize()
+        self.n_days = len(days)
+        self.day_starts = np.flatnonzero(np.r_[True, trade_day[1:] != trade_day[:-1]])
+        self.trade_days = days.get_indexer(trade_day[self.day_starts])
+
+        self.initial_capital = initial_capital
+        self.block_size = block_size or Config.MC_BLOCK_SIZE
+        self.skip_prob = Config.MC_SKIP_PROB if skip_prob is None else skip_prob
+        self.ruin_level = initial_capital * (ruin_fraction or Config.MC_RUIN_FRACTION)
+        self.confidence = confidence or Config.MC_CONFIDENCE
+
+    @classmethod
+    def from_backtester(cls, engine, **kwargs):
+        """From a CustomBacktester after run()."""
+        return cls(engine.trades, engine.initial_capital, days=engine.daily_pnl().index, **kwargs)
+
+    def observed(self):
+        """The metrics of the actual trade sequence (Sharpe / Sortino match calculate_metrics)."""
+        result = path_metrics(self.pnl[None, :].copy(), self.day_starts, self.trade_days, self.n_days,
+                              self.initial_capital, self.ruin_level)
+        return {name: float(values[0]) for name, values in result.items()}
+
+    def simulate(self, method, paths=None, batch_size=None, workers=None, seed=None):
+        """Metric arrays of `paths` resampled paths: {metric: (paths,) array, 'ruined': bool array}."""
+        if method not in self.METHODS:
+            raise ValueError(f"method must be one of {self.METHODS}")
+        paths = paths or Config.MC_PATHS
+        batch_size = batch_size or Config.MC_BATCH_SIZE
+        sizes = [min(batch_size, paths - lo) for lo in range(0, paths, batch_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        tasks = [(method, size, s, self) for size, s in zip(sizes, seeds)]
+
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=log_synchronously) as pool:
+                batches = list(pool.map(simulate_batch, tasks))
+        else:
+            batches = [simulate_batch(task) for task in tasks]
+        return {name: np.concatenate([b[name] for b in batches]) for name in batches[0]}
+
+    def summarize(self, results):
+        """Mean, median and the confidence interval of every metric, plus the risk of ruin."""
+        tail = (1 - self.confidence) / 2
+        rows = {}
+        for name in METRICS:
+            values = results[name]
+            lower, median, upper = np.nanquantile(values, [tail, 0.5, 1 - tail])
+            rows[name] = {'mean': np.nanmean(values), 'lower': lower, 'median': median, 'upper': upper}
+        summary = pd.DataFrame(rows).T
+        summary.attrs['risk_of_ruin'] = float(results['ruined'].mean())
+        return summary
+
+    def run(self, methods=None, paths=None, workers=None, seed=None, output_file=None):
+        """Runs every method, logs the intervals and saves them. Returns {method: summary}."""
+        paths = paths or Config.MC_PATHS
+        observed = self.observed()
+        summaries = {}
+        logger.info("-" * 40)
+        logger.info(f"MONTE CARLO ({paths} paths, {len(self.pnl)} trades, {self.confidence:.0%} intervals)")
+        logger.info(f"Observed: equity ${observed['final_equity']:.2f} | max DD {observed['max_drawdown']:.2%} | "
+                    f"Sharpe {observed['sharpe_ratio']:.2f} | Sortino {observed['sortino_ratio']:.2f}")
+        for method in methods or self.METHODS:
+            summary = self.summarize(self.simulate(method, paths, workers=workers, seed=seed))
+            summaries[method] = summary
+            eq, dd, sharpe = (summary.loc[m] for m in ('final_equity', 'max_drawdown', 'sharpe_ratio'))
+            logger.info(f"   {method:<9} equity ${eq['lower']:.2f} - ${eq['upper']:.2f} | "
+                        f"max DD {dd['lower']:.2%} - {dd['upper']:.2%} | "
+                        f"Sharpe {sharpe['lower']:.2f} - {sharpe['upper']:.2f} | "
+                        f"risk of ruin {summary.attrs['risk_of_ruin']:.2%}")
+        logger.info("-" * 40)
+
+        output_file = output_file or Config.MC_OUTPUT
+        table = pd.concat({m: s.assign(risk_of_ruin=s.attrs['risk_of_ruin']) for m, s in summaries.items()},
+                          names=['method', 'metric'])
+        table.to_csv(output_file)
+        logger.info(f"Saved Monte Carlo summary to {output_file}")
+        return summaries
+
+if __name__ == "__main__":
+    try:
+        trades = pd.read_csv(Config.BACKTEST_OUTPUT)
+    except FileNotFoundError:
+        logger.error(f"{Config.BACKTEST_OUTPUT} not found, run backtest_runner.py first.")
+    else:
+        MonteCarloAnalyzer(trades).run()
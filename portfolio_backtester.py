@@ -0,0 +1,142 @@
+# portfolio_backtester.py
+import heapq
+import numpy as np
+import pandas as pd
+from configuration import Config
+from strategy import BiTimeframeStrategy
+from backtest_runner import CustomBacktester, logger
+from dataset_cache import load_dataset
+from execution import ExecutionModel
+
+class PortfolioBacktester(CustomBacktester):
+    """
+    Steps a basket of symbols on one merged timeline against a shared
+    capital pool. Each symbol holds at most one position at a time (same
+    rule as CustomBacktester), positions in different symbols run
+    concurrently. Signals for every symbol come from one 2D batch pass.
+
+    Exposure caps are fractions of current capital (None = no cap):
+        max_symbol_exposure: cost of one position
+        max_total_exposure:  cost of all open positions together
+    """
+
+    def __init__(self, datasets, initial_capital=10000, ema_period=None, rr_ratio=None,
+                 risk_per_trade=None, max_positions=None, max_symbol_exposure=None,
+                 max_total_exposure=None, output_file=None):
+        """datasets: {symbol: calculate_indicators(...).dropna() frame}"""
+        self.symbols = list(datasets)
+        timeline = pd.DatetimeIndex(np.unique(np.concatenate([df.index.values for df in datasets.values()])), name='timestamp')
+        super().__init__(pd.DataFrame(index=timeline), initial_capital, ema_period=ema_period,
+                         rr_ratio=rr_ratio, risk_per_trade=risk_per_trade,
+                         output_file=output_file or Config.PORTFOLIO_OUTPUT)
+        self.datasets = datasets
+        self.executions = {symbol: ExecutionModel(symbol=symbol) for symbol in self.symbols}  # Per-symbol lot sizes
+        self.positions = {}  # symbol -> open position
+        self.max_positions = max_positions
+        self.max_symbol_exposure = max_symbol_exposure
+        self.max_total_exposure = max_total_exposure
+        self.skipped_exposure = 0
+
+    def _stack(self, column):
+        """(bars, symbols) array of one column on the merged timeline (NaN where a symbol has no bar)."""
+        return np.column_stack([df[column].reindex(self.data.index).to_numpy(dtype=float)
+                                for df in self.datasets.values()])
+
+    def run(self, save=True):
+        logger.info(f"Starting Portfolio Backtest on {len(self.symbols)} symbols...")
+        timestamps = self.data.index
+        opens, highs, lows, closes = (self._stack(c) for c in ('Open', 'High', 'Low', 'Close'))
+        closes_1h, emas_1h = self._stack('Close_1h'), self._stack(f'EMA_{self.ema_period}_1h')
+
+        # --- 1. BATCH SIGNALS for every symbol at once ---
+        signals, sls, tps = BiTimeframeStrategy.get_signals_batch(
+            opens, highs, lows, closes, closes_1h, emas_1h, rr_ratio=self.rr_ratio
+        )
+        bars, cols = np.nonzero(signals)  # Sorted by time, then symbol
+
+        # Per-symbol contiguous columns for the exit search
+        highs_by_symbol, lows_by_symbol = np.ascontiguousarray(highs.T), np.ascontiguousarray(lows.T)
+        busy_until = np.full(len(self.symbols), -1)  # Exit bar of the symbol's last position
+        exits = []  # Heap of (exit bar, symbol column, reason)
+        open_cost = 0.0
+
+        for i, s in zip(bars, cols):
+            # --- 2. CLOSE POSITIONS THAT EXITED BEFORE THIS BAR OPENED (frees capital first) ---
+            while exits and exits[0][0] < i:
+                j, s_exit, reason = heapq.heappop(exits)
+                trade = self.positions.pop(self.symbols[s_exit])
+                open_cost -= trade.cost
+                self.close_trade(timestamps[j], reason, trade.sl if reason == 'SL' else trade.tp, trade)
+
+            # One position per symbol; the exit candle is not checked for a new setup
+            if i <= busy_until[s]:
+                continue
+
+            symbol = self.symbols[s]
+            signal = 'BUY' if signals[i, s] == 1 else 'SELL'
+            sl, tp = sls[i, s], tps[i, s]
+
+            # --- 3. CAPITAL AND EXPOSURE CHECKS ---
+            # The kernel sizes and fills the entry at the bar's open, against the capital the open positions leave free
+            trade = self.kernel.prepare(timestamps[i], signal, opens[i, s], sl, tp, symbol=symbol,
+                                        available=self.capital - open_cost, execution=self.executions[symbol])
+            if trade is None:
+                continue
+            trade_cost = trade.cost + trade.fee
+            if not self._within_limits(trade_cost, open_cost):
+                self.skipped_exposure += 1
+                logger.warning(f"SKIPPED {symbol} {signal}: Exposure cap (Cost ${trade_cost:.2f}, Open ${open_cost:.2f})")
+                continue
+            self.kernel.commit(trade)
+
+            exit_index, exit_reason = BiTimeframeStrategy.resolve_exit(
+                signal, sl, tp, lows_by_symbol[s], highs_by_symbol[s], start=i
+            )
+            self.positions[symbol] = trade
+            open_cost += trade.cost  # The fee is booked with the PnL
+            if exit_index is None:
+                busy_until[s] = len(timestamps)  # Still open at end of data
+            else:
+                busy_until[s] = exit_index
+                heapq.heappush(exits, (exit_index, s, exit_reason))
+
+        # Remaining resolved exits after the last candidate
+        while exits:
+            j, s_exit, reason = heapq.heappop(exits)
+            trade = self.positions.pop(self.symbols[s_exit])
+            self.close_trade(timestamps[j], reason, trade.sl if reason == 'SL' else trade.tp, trade)
+
+        metrics = self.calculate_metrics()
+        metrics['skipped_exposure'] = self.skipped_exposure
+        logger.info(f"Skipped (Exposure Cap): {self.skipped_exposure} | Still Open: {len(self.positions)}")
+        if save:
+            self.save_log()
+        return metrics
+
+    def _within_limits(self, trade_cost, open_cost):
+        if self.max_positions is not None and len(self.positions) >= self.max_positions:
+            return False
+        if self.max_symbol_exposure is not None and trade_cost > self.max_symbol_exposure * self.capital:
+            return False
+        if self.max_total_exposure is not None and open_cost + trade_cost > self.max_total_exposure * self.capital:
+            return False
+        return True
+
+def run_portfolio_backtest(symbols=None):
+    datasets = {}
+    for symbol in symbols or Config.PORTFOLIO_SYMBOLS:
+        try:
+            datasets[symbol] = load_dataset(symbol)
+        except (FileNotFoundError, ValueError):
+            logger.error(f"No candles for {symbol}, run data_fetcher.py first.")
+
+    if not datasets:
+        return
+    engine = PortfolioBacktester(
+        datasets, initial_capital=10000, max_positions=Config.MAX_OPEN_POSITIONS,
+        max_symbol_exposure=Config.MAX_SYMBOL_EXPOSURE, max_total_exposure=Config.MAX_TOTAL_EXPOSURE
+    )
+    engine.run()
+
+if __name__ == "__main__":
+    run_portfolio_backtest()
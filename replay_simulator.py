@@ -0,0 +1,156 @@
+# replay_simulator.py
+import time
+import numpy as np
+import pandas as pd
+from configuration import Config
+from strategy import BiTimeframeStrategy
+from backtest_runner import CustomBacktester, logger
+from candle_store import load_candles
+from dataset_cache import load_dataset
+
+class ReplaySimulator(CustomBacktester):
+    """
+    Backtest whose exits are replayed on intrabar data (1m candles or
+    trades/ticks) instead of the 5m high/low. Entries, sizing and capital
+    handling are the ones of CustomBacktester, exits still go through
+    BiTimeframeStrategy.check_exit (via the vectorized first-touch search
+    of resolve_exit), just on finer bars.
+
+    Exit modes:
+        bar      - 5m high/low, fill at the SL/TP level (CustomBacktester)
+        intrabar - first touch in the intrabar data, fill at the level
+        stream   - first touch, fill at the touching price: the bar open if
+                   it gapped through the level (a tick's own price for ticks),
+                   like StreamTrader reacting to every tick
+        polling  - price sampled every poll_seconds like run_live's monitor
+                   loop, market exit at the sampled price
+    """
+    MODES = ('bar', 'intrabar', 'stream', 'polling')
+
+    def __init__(self, data, intrabar, mode='intrabar', poll_seconds=None, initial_capital=10000, **params):
+        """
+        data:     calculate_indicators(...).dropna() frame
+        intrabar: finer candles indexed by open time, with open/high/low/close
+                  columns (any case). Ticks: see ticks_to_frame.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}")
+        intrabar = intrabar.rename(columns=str.lower)
+        # Only replay the period both datasets cover
+        data = data[(data.index >= intrabar.index[0]) & (data.index <= intrabar.index[-1])]
+        super().__init__(data, initial_capital, **params)
+        self.mode = mode
+
+        self._bar_times = data.index.as_unit('ns').asi8
+        times = intrabar.index.as_unit('ns').asi8
+        self._times = times
+        self._opens, self._highs, self._lows = (intrabar[c].to_numpy(dtype=float) for c in ('open', 'high', 'low'))
+
+        if mode == 'polling':
+            # Last traded price at every poll (polls run from just after the first candle close)
+            poll_ns = int((poll_seconds or Config.REPLAY_POLL_SECONDS) * 1e9)
+            grid = np.arange(times[0] + poll_ns, times[-1] + poll_ns, poll_ns)
+            last = np.searchsorted(times, grid, side='right') - 1
+            price = intrabar['close'].to_numpy(dtype=float)[last]
+            self._times, self._opens, self._highs, self._lows = grid, price, price, price
+
+    def manage_position(self, timestamps, highs, lows, start):
+        if self.mode == 'bar':
+            return super().manage_position(timestamps, highs, lows, start)
+        if start >= len(self._bar_times):
+            return None
+
+        trade = self.position
+        # Watch the position from the open of the entry bar
+        first = int(np.searchsorted(self._times, self._bar_times[start], side='left'))
+        j, reason = BiTimeframeStrategy.resolve_exit(
+            trade.type, trade.sl, trade.tp, self._lows, self._highs, start=first
+        )
+        if j is None:
+            return None
+
+        self.close_trade(pd.Timestamp(self._times[j]), reason, self._fill_price(trade, reason, j))
+        # The 5m bar the exit happened in
+        return int(np.searchsorted(self._bar_times, self._times[j], side='right') - 1)
+
+    def close_trade(self, exit_time, reason, exit_price, trade=None):
+        trade = trade or self.position
+        super().close_trade(exit_time, reason, exit_price, trade)
+        self.trades[-1]['level'] = trade.sl if reason == 'SL' else trade.tp
+
+    def _fill_price(self, trade, reason, j):
+        level = trade.sl if reason == 'SL' else trade.tp
+        if self.mode == 'intrabar':
+            return level
+        if self.mode == 'polling':
+            return self._lows[j]
+        # Stream: a bar that opens beyond the level fills at its open
+        falling = (trade.type == 'BUY') == (reason == 'SL')
+        return min(self._opens[j], level) if falling else max(self._opens[j], level)
+
+def ticks_to_frame(ticks):
+    """
+    Trades / aggTrades to the intrabar layout: one row per trade with
+    open = high = low = close = price. Accepts a frame indexed by time with
+    a 'price' column, or a Binance aggTrades dump read with header=None
+    (agg_id, price, qty, first_id, last_id, time, is_buyer_maker, ...).
+    """
+    if 'price' not in ticks.columns:
+        ticks = pd.DataFrame({'price': ticks[1].to_numpy(dtype=float)},
+                             index=_epoch_to_datetime(ticks[5].to_numpy()))
+    price = ticks['price'].to_numpy(dtype=float)
+    return pd.DataFrame({'open': price, 'high': price, 'low': price, 'close': price},
+                        index=ticks.index.rename('timestamp'))
+
+def _epoch_to_datetime(values):
+    """aggTrades dumps use ms, newer ones µs."""
+    unit = 'us' if values.max() > 1e14 else 'ms'
+    return pd.DatetimeIndex(pd.to_datetime(values, unit=unit))
+
+def compare_fills(data, intrabar, modes=None, **params):
+    """
+    Runs every exit mode on the same signals and logs trade count, PnL,
+    win rate and the exit price slippage against the SL/TP level.
+    Returns {mode: trades DataFrame}.
+    """
+    results = {}
+    modes = modes or ReplaySimulator.MODES
+    simulated_days = (intrabar.index[-1] - intrabar.index[0]) / pd.Timedelta(days=1)
+    logger.info("-" * 40)
+    logger.info(f"FILL QUALITY ({simulated_days:.0f} days of intrabar data)")
+    for mode in modes:
+        engine = ReplaySimulator(data, intrabar, mode=mode, **params)
+        t0 = time.perf_counter()
+        engine.run(save=False)
+        elapsed = time.perf_counter() - t0
+        trades = pd.DataFrame(engine.trades)
+        results[mode] = trades
+        if trades.empty:
+            logger.info(f"   {mode:<9} no trades")
+            continue
+
+        # Exit price vs the level it was meant to fill at (negative = worse for us)
+        sign = np.where(trades['direction'] == 'BUY', 1, -1)
+        slippage = (trades['exit_price'] - trades['level']) * sign
+        speed = simulated_days * 86400 / elapsed
+        logger.info(f"   {mode:<9} trades {len(trades):>5} | net ${trades['pnl'].sum():>9.2f} | "
+                    f"win {np.mean(trades['pnl'] > 0):6.1%} | SL {np.mean(trades['reason'] == 'SL'):6.1%} | "
+                    f"slip avg {slippage.mean():8.4f} | {speed:,.0f}x real time")
+
+    # Same entries, different exit reason: how often the SL-first assumption was wrong
+    if 'bar' in results and 'intrabar' in results and not results['bar'].empty:
+        merged = results['bar'].merge(results['intrabar'], on='timestamp', suffixes=('_bar', '_fine'))
+        flipped = merged['reason_bar'] != merged['reason_fine']
+        logger.info(f"   {flipped.sum()} of {len(merged)} common entries exit differently on intrabar data "
+                    f"({(flipped & (merged['reason_bar'] == 'SL')).sum()} bar SLs were TPs first)")
+    logger.info("-" * 40)
+    return results
+
+if __name__ == "__main__":
+    try:
+        data = load_dataset(Config.SYMBOL)
+        df_1m = load_candles(Config.SYMBOL, Config.TF_INTRABAR)
+    except (FileNotFoundError, ValueError):
+        logger.error(f"Data files not found (fetch {Config.TF_INTRABAR} candles with data_fetcher.py).")
+    else:
+        compare_fills(data, df_1m)
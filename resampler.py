@@ -0,0 +1,139 @@
+# resampler.py
+import numpy as np
+import pandas as pd
+from configuration import Config
+from candle_store import CandleStore, to_epoch_ms
+from utils import interval_to_seconds
+
+WEEK_ORIGIN_MS = 4 * 86400 * 1000  # Binance weeks start on Monday, the epoch was a Thursday
+
+def interval_ms(interval):
+    return interval_to_seconds(interval) * 1000
+
+def bucket_start(times_ms, interval):
+    """Open time (epoch ms) of the `interval` candle each timestamp falls in."""
+    step = interval_ms(interval)
+    origin = WEEK_ORIGIN_MS if interval.endswith('w') else 0
+    return times_ms - (times_ms - origin) % step
+
+def resample_arrays(columns, interval, base_interval=None):
+    """
+    Vectorized OHLCV resampling of base candle arrays ({'timestamp': epoch ms
+    open times, 'open', 'high', 'low', 'close', 'volume'}, as CandleStore.open
+    returns them). Only finished candles are returned: the last bucket is
+    dropped until the base candles reach its close, and so is a first bucket
+    the data starts in the middle of (it would miss its first candles).
+    """
+    base_interval = base_interval or Config.TF_BASE
+    step, base = interval_ms(interval), interval_ms(base_interval)
+    if step % base:
+        raise ValueError(f"{interval} is not a multiple of {base_interval}")
+
+    times = np.asarray(columns['timestamp'], dtype=np.int64)
+    if len(times) == 0:
+        return {col: np.array([], dtype=np.int64 if col == 'timestamp' else float) for col in CandleStore.COLUMNS}
+    buckets = bucket_start(times, interval)
+    first = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    last = np.r_[first[1:], len(times)] - 1
+
+    keep = np.ones(len(first), dtype=bool)
+    keep[0] = times[0] == buckets[0]
+    keep[-1] &= times[-1] + base >= buckets[-1] + step
+
+    values = {col: np.asarray(columns[col], dtype=float) for col in CandleStore.COLUMNS[1:]}
+    result = {
+        'timestamp': buckets[first],
+        'open': values['open'][first],
+        'high': np.maximum.reduceat(values['high'], first),
+        'low': np.minimum.reduceat(values['low'], first),
+        'close': values['close'][last],
+        'volume': np.add.reduceat(values['volume'], first),
+    }
+    return {col: arr[keep] for col, arr in result.items()}
+
+def resample_ohlcv(df, interval, base_interval=None):
+    """resample_arrays on a candle frame indexed by open time (any column case), same layout back."""
+    df = df.rename(columns=str.lower)
+    columns = {col: df[col].to_numpy() if col in df.columns else np.zeros(len(df)) for col in CandleStore.COLUMNS[1:]}
+    columns['timestamp'] = to_epoch_ms(df.index)
+    return _to_frame(resample_arrays(columns, interval, base_interval))
+
+def _to_frame(columns):
+    index = pd.DatetimeIndex(pd.to_datetime(columns['timestamp'], unit='ms'), name='timestamp')
+    return pd.DataFrame({col: columns[col] for col in CandleStore.COLUMNS[1:]}, index=index)
+
+class CandleResampler:
+    """
+    Incremental version of resample_arrays for live trading: update() takes
+    one CLOSED base candle and returns the higher timeframe candles it
+    finished, as (interval, (open time, open, high, low, close, volume)).
+    A candle is finished by its last base candle, or by the first base
+    candle past its close if that one never came.
+    """
+
+    def __init__(self, intervals=None, base_interval=None):
+        self.base_interval = base_interval or Config.TF_BASE
+        self.intervals = list(intervals or Config.RESAMPLE_INTERVALS)
+        self._base = interval_ms(self.base_interval)
+        for interval in self.intervals:
+            if interval_ms(interval) % self._base:
+                raise ValueError(f"{interval} is not a multiple of {self.base_interval}")
+        self._bars = {}  # interval -> [open time, open, high, low, close, volume, complete]
+        self._started = set()  # Intervals past their first candle
+
+    def update(self, timestamp, open_, high, low, close, volume=0.0):
+        time_ms = int(to_epoch_ms(timestamp))
+        finished = []
+        for interval in self.intervals:
+            start = int(bucket_start(time_ms, interval))
+            bar = self._bars.get(interval)
+            if bar is not None and bar[0] != start:
+                # The previous candle's last base candle is missing
+                if bar[6]:
+                    finished.append((interval, self._emit(bar)))
+                bar = None
+            if bar is None:
+                # The very first candle is incomplete unless we start on its open
+                complete = interval in self._started or time_ms == start
+                bar = self._bars[interval] = [start, open_, high, low, close, volume, complete]
+                self._started.add(interval)
+            else:
+                bar[2] = max(bar[2], high)
+                bar[3] = min(bar[3], low)
+                bar[4] = close
+                bar[5] += volume
+
+            if time_ms + self._base >= start + interval_ms(interval):
+                if bar[6]:
+                    finished.append((interval, self._emit(bar)))
+                del self._bars[interval]
+        return finished
+
+    @staticmethod
+    def _emit(bar):
+        return (pd.Timestamp(bar[0], unit='ms'), *bar[1:6])
+
+    def state(self):
+        """The candles being built, as plain (JSON-able) values."""
+        bars = {interval: [int(bar[0])] + [float(v) for v in bar[1:6]] + [bool(bar[6])] for interval, bar in self._bars.items()}
+        return {'intervals': self.intervals, 'base_interval': self.base_interval, 'bars': bars, 'started': sorted(self._started)}
+
+    @classmethod
+    def from_state(cls, state):
+        resampler = cls(state['intervals'], state['base_interval'])
+        resampler._bars = {interval: list(bar) for interval, bar in state['bars'].items()}
+        resampler._started = set(state['started'])
+        return resampler
+
+def store_resampled(symbol=None, intervals=None, base_interval=None, store=None):
+    """Builds every interval from the stored base candles and writes it to the store."""
+    symbol = symbol or Config.SYMBOL
+    base_interval = base_interval or Config.TF_BASE
+    store = store or CandleStore()
+    columns = store.open(symbol, base_interval)
+    for interval in intervals or Config.RESAMPLE_INTERVALS:
+        store.write(symbol, interval, _to_frame(resample_arrays(columns, interval, base_interval)))
+
+if __name__ == "__main__":
+    # Rebuild the higher timeframes from the stored base candles
+    store_resampled()
@@ -0,0 +1,136 @@
+# state_store.py
+import json
+import sqlite3
+import threading
+import pandas as pd
+from configuration import Config
+from indicators import IncrementalIndicators
+from strategy_kernel import Position
+from utils import setup_logger
+
+logger = setup_logger('StateStore')
+
+TRADE_COLUMNS = ['time', 'symbol', 'direction', 'entry_time', 'entry_price', 'exit_price', 'size', 'pnl', 'capital_after',
+                 'reason', 'entry_quote', 'exit_quote', 'fees', 'entry_latency', 'exit_latency']
+
+class StateStore:
+    """
+    Crash-recovery state of the live runners in one SQLite file (WAL mode):
+    - kernels:    capital and the open position (SL/TP, size) per symbol
+    - indicators: incremental indicator state and the last processed 5m candle
+    - trades:     append-only journal of closed trades (was live_trades.csv)
+    Each write is one small transaction appended to the WAL. With
+    synchronous=NORMAL a commit does not wait for fsync (only checkpoints
+    do), so the order path never blocks on disk and a committed write
+    survives a crash of the process. A restart reads a few rows back and
+    resumes in milliseconds; refresh_indicators then only fetches the
+    candles closed while the runner was down.
+    State is keyed by symbol: runners trading the same symbol must not share a file.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS kernels (
+            symbol TEXT PRIMARY KEY, capital REAL, skipped INTEGER, position TEXT, updated TEXT);
+        CREATE TABLE IF NOT EXISTS indicators (
+            symbol TEXT PRIMARY KEY, last_5m_time TEXT, state TEXT);
+        CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY, time TEXT, symbol TEXT, direction TEXT, entry_time TEXT, entry_price REAL,
+            exit_price REAL, size REAL, pnl REAL, capital_after REAL, reason TEXT,
+            entry_quote REAL, exit_quote REAL, fees REAL, entry_latency REAL, exit_latency REAL);
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Config.STATE_DB
+        # Shared by the to_thread calls of the async runners, one statement at a time
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+
+    def _write(self, *statements):
+        """Runs (sql, params) statements in one transaction."""
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                for sql, params in statements:
+                    self._conn.execute(sql, params)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def _read(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # --- 1. KERNEL (CAPITAL, OPEN POSITION) ---
+    @staticmethod
+    def _kernel_row(kernel):
+        position = kernel.position
+        if position is not None:
+            position = json.dumps({'entry_time': str(position.entry_time), 'type': position.type, 'entry': position.entry,
+                                   'sl': position.sl, 'tp': position.tp, 'size': position.size, 'quote': position.quote,
+                                   'fee': position.fee, 'latency': position.latency})
+        sql = 'INSERT OR REPLACE INTO kernels VALUES (?, ?, ?, ?, ?)'
+        return sql, (kernel.symbol, kernel.capital, kernel.skipped, position, str(pd.Timestamp.now()))
+
+    def save_kernel(self, kernel):
+        """Stores capital and the open position (call after every commit / close)."""
+        self._write(self._kernel_row(kernel))
+
+    def restore_kernel(self, kernel):
+        """Loads the symbol's capital and open position into a fresh kernel. Returns True if there was state."""
+        rows = self._read('SELECT capital, skipped, position FROM kernels WHERE symbol = ?', (kernel.symbol,))
+        if not rows:
+            return False
+        kernel.capital, kernel.skipped, position = rows[0]
+        if position is not None:
+            p = json.loads(position)
+            kernel.position = Position(pd.Timestamp(p['entry_time']), kernel.symbol, p['type'], p['entry'],
+                                       p['sl'], p['tp'], p['size'], p['quote'], p['fee'], p['latency'])
+            logger.info(f"Resumed {kernel.symbol}: open {p['type']} at {p['entry']:.2f} (SL: {p['sl']:.2f} TP: {p['tp']:.2f})")
+        logger.info(f"Resumed {kernel.symbol}: capital ${kernel.capital:.2f}")
+        return True
+
+    def record_exit(self, kernel, record, entry_latency=None, exit_latency=None):
+        """Appends the closed trade (StrategyKernel.close record, order latencies) and stores the flat kernel, atomically."""
+        values = {**record, 'time': str(record['exit_time']), 'entry_time': str(record['timestamp']),
+                  'entry_latency': entry_latency, 'exit_latency': exit_latency}
+        trade = (f"INSERT INTO trades ({', '.join(TRADE_COLUMNS)}) VALUES ({', '.join('?' * len(TRADE_COLUMNS))})",
+                 tuple(values[col] for col in TRADE_COLUMNS))
+        self._write(trade, self._kernel_row(kernel))
+
+    # --- 2. INDICATORS ---
+    def save_indicators(self, symbol, indicators):
+        self._write(('INSERT OR REPLACE INTO indicators VALUES (?, ?, ?)',
+                     (symbol, str(indicators.last_5m_time), json.dumps(indicators.state()))))
+
+    def load_indicators(self, symbol):
+        """The stored IncrementalIndicators of the symbol, None if there are none."""
+        rows = self._read('SELECT last_5m_time, state FROM indicators WHERE symbol = ?', (symbol,))
+        if not rows:
+            return None
+        logger.info(f"Restored {symbol} indicators, last processed 5m candle {rows[0][0]}")
+        return IncrementalIndicators.from_state(json.loads(rows[0][1]))
+
+    # --- 3. TRADE JOURNAL ---
+    def trades(self, symbol=None):
+        """Closed trades, oldest first."""
+        sql = f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades"
+        rows = self._read(sql + ' WHERE symbol = ? ORDER BY id', (symbol,)) if symbol else self._read(sql + ' ORDER BY id')
+        return pd.DataFrame(rows, columns=TRADE_COLUMNS)
+
+    def export_trades(self, path=None):
+        """Writes the trade journal to CSV (Config.LIVE_OUTPUT)."""
+        path = path or Config.LIVE_OUTPUT
+        trades = self.trades()
+        trades.to_csv(path, index=False)
+        return len(trades)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+if __name__ == "__main__":
+    count = StateStore().export_trades()
+    logger.info(f"Exported {count} trades to {Config.LIVE_OUTPUT}")
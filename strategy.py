@@ -1,6 +1,7 @@
 # strategy.py
+import numpy as np
 from configuration import Config
-from utils import check_engulfing
+from utils import check_engulfing, check_engulfing_batch
 
 class BiTimeframeStrategy:
     """
@@ -10,11 +11,13 @@ class BiTimeframeStrategy:
     """
     
     @staticmethod
-    def get_signal(opens, highs, lows, closes, closes_1h, emas_1h):
+    def get_signal(opens, highs, lows, closes, closes_1h, emas_1h, rr_ratio=None):
         """
         DETERMINISTIC LOGIC [cite: 21]
+        rr_ratio defaults to Config.RR_RATIO.
         Returns: (Signal, SL, TP)
         """
+        if rr_ratio is None: rr_ratio = Config.RR_RATIO
         # Need at least 2 candles
         if len(closes) < 2: return None, None, None
         # 1. 1H Trend Filter
@@ -33,7 +36,7 @@ class BiTimeframeStrategy:
                 sl = curr_l # SL = closed Candle Low
                 risk = opens[-1] - sl
                 if risk <= 0: return None, None, None # Safety
-                tp = opens[-1] + (risk * Config.RR_RATIO)
+                tp = opens[-1] + (risk * rr_ratio)
                 return 'BUY', sl, tp
 
         # --- SHORT LOGIC ---
@@ -42,10 +45,67 @@ class BiTimeframeStrategy:
                 sl = curr_h  # SL = closed Candle High
                 risk = sl - opens[-1]
                 if risk <= 0: return None, None, None # Safety
-                tp = opens[-1] - (risk * Config.RR_RATIO)
+                tp = opens[-1] - (risk * rr_ratio)
                 return 'SELL', sl, tp
 
         return None, None, None
+
+    @staticmethod
+    def get_signals_batch(opens, highs, lows, closes, closes_1h, emas_1h, rr_ratio=None, engulfing=None):
+        """
+        BATCH MODE of get_signal for the whole series in one NumPy pass.
+        Element i equals get_signal(opens[:i+1], ..., emas_1h[:i+1]).
+        Time runs along axis 0: 2D (bars, symbols) inputs give every symbol in one pass.
+        engulfing: optional precomputed (BULLISH, BEARISH) check_engulfing_batch
+        masks of the same opens / closes (see walk_forward.IndicatorCache).
+        Returns: (signals, sls, tps)
+            signals: int8 array, 1 = BUY, -1 = SELL, 0 = no signal
+            sls, tps: float arrays, NaN where there is no signal
+        """
+        if rr_ratio is None: rr_ratio = Config.RR_RATIO
+        n, shape = len(closes), np.shape(closes)
+        signals = np.zeros(shape, dtype=np.int8)
+        sls = np.full(shape, np.nan)
+        tps = np.full(shape, np.nan)
+        if n < 3: return signals, sls, tps
+
+        # 1. 1H Trend Filter (last CLOSED candle -> index i-1)
+        trend_bullish = np.zeros(shape, dtype=bool)
+        trend_bearish = np.zeros(shape, dtype=bool)
+        trend_bullish[1:] = closes_1h[:-1] > emas_1h[:-1]
+        trend_bearish[1:] = closes_1h[:-1] < emas_1h[:-1]
+
+        # 2. 5M Trigger (Engulfing of candle i-1 over candle i-2)
+        bullish = np.zeros(shape, dtype=bool)
+        bearish = np.zeros(shape, dtype=bool)
+        if engulfing is None:
+            engulfing = (check_engulfing_batch(opens, closes, 'BULLISH'),
+                         check_engulfing_batch(opens, closes, 'BEARISH'))
+        bullish[1:] = engulfing[0][:-1]
+        bearish[1:] = engulfing[1][:-1]
+
+        prev_highs = np.empty(shape)
+        prev_lows = np.empty(shape)
+        prev_highs[1:], prev_lows[1:] = highs[:-1], lows[:-1]
+        prev_highs[0] = prev_lows[0] = np.nan
+
+        # --- LONG LOGIC ---
+        long_risk = opens - prev_lows
+        longs = trend_bullish & bullish & (long_risk > 0)
+        longs[:2] = False
+        signals[longs] = 1
+        sls[longs] = prev_lows[longs]
+        tps[longs] = opens[longs] + (long_risk[longs] * rr_ratio)
+
+        # --- SHORT LOGIC ---
+        short_risk = prev_highs - opens
+        shorts = trend_bearish & bearish & (short_risk > 0)
+        shorts[:2] = False
+        signals[shorts] = -1
+        sls[shorts] = prev_highs[shorts]
+        tps[shorts] = opens[shorts] - (short_risk[shorts] * rr_ratio)
+
+        return signals, sls, tps
     
     @staticmethod
     def get_position_size(entry_price, sl_price, capital_to_risk):
@@ -84,4 +144,50 @@ class BiTimeframeStrategy:
             elif low_price <= tp:
                 return 'TP'
                 
-        return None
\ No newline at end of file
+        return None
+
+    @staticmethod
+    def resolve_exit(direction, sl, tp, lows, highs, start=0, scan=32, window=64):
+        """
+        VECTORIZED FIRST-TOUCH EXIT
+        Finds the first bar j >= start where check_exit would fire.
+        The first `scan` bars are checked one by one with check_exit's
+        comparisons inlined: at the strategy's SL/TP distances most trades
+        close within a few bars, where NumPy's per-call overhead costs more
+        than it saves. After that array searches run over windows that
+        double in size.
+
+        Returns: (index, reason) or (None, None) if neither level is hit.
+        Ties inside one bar keep the SL-first rule of check_exit.
+        """
+        n = len(lows)
+        stop = min(start + scan, n)
+        if direction == 'BUY':
+            for j in range(start, stop):
+                if lows[j] <= sl:
+                    return j, 'SL'
+                if highs[j] >= tp:
+                    return j, 'TP'
+        else:
+            for j in range(start, stop):
+                if highs[j] >= sl:
+                    return j, 'SL'
+                if lows[j] <= tp:
+                    return j, 'TP'
+
+        start = stop
+        while start < n:
+            stop = min(start + window, n)
+            if direction == 'BUY':
+                hit = (lows[start:stop] <= sl) | (highs[start:stop] >= tp)
+            else:
+                hit = (highs[start:stop] >= sl) | (lows[start:stop] <= tp)
+
+            if hit.any():
+                j = start + int(hit.argmax())
+                return j, BiTimeframeStrategy.check_exit(direction, sl, tp, lows[j], highs[j])
+
+            start = stop
+            window *= 2
+
+        return None, None
@@ -0,0 +1,246 @@
+# strategy_kernel.py
+import numpy as np
+from configuration import Config
+from execution import ExecutionModel
+from strategy import BiTimeframeStrategy
+from utils import setup_logger
+
+class Position:
+    """One open trade. `entry` is the fill price, `quote` the price the entry was decided on."""
+    __slots__ = ('entry_time', 'symbol', 'type', 'entry', 'sl', 'tp', 'size', 'quote', 'fee', 'latency')
+
+    def __init__(self, entry_time, symbol, type, entry, sl, tp, size, quote=None, fee=0.0, latency=None):
+        self.entry_time = entry_time
+        self.symbol = symbol
+        self.type = type
+        self.entry = entry
+        self.sl = sl
+        self.tp = tp
+        self.size = size
+        self.quote = entry if quote is None else quote
+        self.fee = fee          # Entry fee (quote asset)
+        self.latency = latency  # Entry order latency (live only)
+
+    @property
+    def cost(self):
+        return self.entry * self.size
+
+class StrategyKernel:
+    """
+    The one per-trade codepath shared by the backtests and the live runners:
+    signal -> sizing -> capital check -> position -> exit -> PnL.
+
+    Timing model (same everywhere): a setup on the closed candles i-2 / i-1
+    is entered at the OPEN of candle i (the price get_signal measures the
+    risk from, and the first price live trading can act on). From then on
+    every price of candle i onwards can hit SL/TP.
+
+    Per-bar path (live, replays): on_open -> on_range -> on_close, or on_bar.
+    Batch fast path (backtests): run_batch, the same decisions found with
+    get_signals_batch and resolve_exit instead of one bar at a time.
+    """
+    __slots__ = ('symbol', 'initial_capital', 'capital', 'risk_amount', 'rr_ratio', 'execution',
+                 'position', 'skipped', 'logger', 'on_trade', '_window', '_count')
+
+    def __init__(self, initial_capital=10000, symbol=None, rr_ratio=None, risk_per_trade=None,
+                 logger=None, on_trade=None, execution=None):
+        self.symbol = symbol or Config.SYMBOL
+        self.initial_capital = initial_capital
+        self.capital = initial_capital
+        # Fixed risk per trade, from the starting balance
+        self.risk_amount = initial_capital * (Config.RISK_PER_TRADE if risk_per_trade is None else risk_per_trade)
+        self.rr_ratio = Config.RR_RATIO if rr_ratio is None else rr_ratio
+        self.execution = execution or ExecutionModel(symbol=self.symbol)  # Fees, spread, slippage, lot step
+        self.position = None
+        self.skipped = 0  # Entries skipped for insufficient capital
+        self.logger = logger or setup_logger('StrategyKernel')
+        self.on_trade = on_trade  # Called with every closed trade record
+        self._window = np.full((2, 6), np.nan)  # Last 2 closed candles (per-bar path)
+        self._count = 0
+
+    # --- ENTRIES ---
+
+    def signal(self, inputs):
+        """get_signal on (opens, highs, lows, closes, closes_1h, emas_1h) ending with the forming candle."""
+        return BiTimeframeStrategy.get_signal(*inputs, rr_ratio=self.rr_ratio)
+
+    def prepare(self, timestamp, signal, entry, sl, tp, symbol=None, available=None, execution=None):
+        """
+        Sizes an entry at the quoted `entry` price and simulates its fill.
+        `available` is the capital it may use (all of it by default; the
+        portfolio backtest passes what its open positions leave free, and
+        the ExecutionModel of the entry's symbol as `execution`).
+        Returns the Position (not yet open), or None if it is skipped.
+        """
+        execution = execution or self.execution
+        size = execution.round_qty(BiTimeframeStrategy.get_position_size(entry, sl, self.risk_amount))
+        if size <= 0:
+            return None
+        fill = execution.simulate(signal, entry, size)
+        symbol = symbol or self.symbol
+        available = self.capital if available is None else available
+
+        # Cost to open trade (Spot) = Price * Size + Fee
+        trade_cost = fill.price * size + fill.fee
+        if available < trade_cost:
+            self.skipped += 1
+            self.logger.warning(f"SKIPPED {symbol} {signal}: Insufficient Capital. Need ${trade_cost:.2f}, Have ${available:.2f}")
+            return None
+        return Position(timestamp, symbol, signal, fill.price, sl, tp, size, quote=entry, fee=fill.fee)
+
+    def commit(self, position, fill=None):
+        """
+        Marks a prepared position as open (live: once the order is filled, at
+        the exchange's `fill`). It becomes the kernel's position; runners
+        holding several (the portfolio backtest) track them themselves.
+        """
+        if fill is not None:
+            position.entry, position.size, position.fee, position.latency = fill.price, fill.quantity, fill.fee, fill.latency
+        self.position = position
+        self.logger.info(f"Open {position.symbol} {position.type} at {position.entry:.2f} "
+                         f"(Risk: ${self.risk_amount:.2f}, Cost: ${position.cost:.2f})")
+
+    # --- EXITS ---
+
+    def check_exit(self, low, high=None):
+        """SL/TP check of the open position against a price range (or a single price)."""
+        position = self.position
+        if position is None:
+            return None
+        return BiTimeframeStrategy.check_exit(position.type, position.sl, position.tp,
+                                              low, low if high is None else high)
+
+    def close(self, exit_time, reason, exit_price, position=None, fill=None):
+        """
+        Books the exit at the quoted `exit_price` (SL/TP level, polled price),
+        filled as simulated or, live, at the exchange's `fill`: PnL net of
+        fees, capital and the trade record (also passed to on_trade).
+        """
+        position = position or self.position
+        if fill is None:
+            fill = self.execution.simulate('SELL' if position.type == 'BUY' else 'BUY', exit_price, position.size)
+        if position.type == 'BUY':
+            pnl = (fill.price - position.entry) * position.size
+        else:
+            pnl = (position.entry - fill.price) * position.size
+        pnl -= position.fee + fill.fee
+
+        self.capital += pnl
+        record = {
+            'timestamp': position.entry_time,
+            'symbol': position.symbol,
+            'direction': position.type,
+            'entry_price': position.entry,
+            'exit_price': fill.price,
+            'exit_time': exit_time,
+            'pnl': pnl,
+            'capital_after': self.capital,
+            'reason': reason,
+            'size': position.size,
+            'entry_quote': position.quote,
+            'exit_quote': exit_price,
+            'fees': position.fee + fill.fee,
+        }
+        self.logger.info(f"Closed {position.symbol} {position.type} ({reason}) PnL: {pnl:.2f}")
+        if position is self.position:
+            self.position = None
+        if self.on_trade:
+            self.on_trade(record)
+        return record
+
+    def manage_position(self, timestamps, highs, lows, start, close=None):
+        """
+        While in a trade we ONLY check for exits, so jump straight from
+        `start` to the first SL/TP touch and close there at the level.
+        Returns the exit bar, or None if the position is still open.
+        """
+        position = self.position
+        exit_index, reason = BiTimeframeStrategy.resolve_exit(
+            position.type, position.sl, position.tp, lows, highs, start=start
+        )
+        if exit_index is not None:
+            exit_price = position.sl if reason == 'SL' else position.tp
+            (close or self.close)(timestamps[exit_index], reason, exit_price)
+        return exit_index
+
+    # --- PER-BAR PATH ---
+
+    def on_open(self, timestamp, open_, inputs=None):
+        """
+        A new candle opened: enter if the last 2 closed candles form a setup.
+        `inputs` are get_signal arguments (e.g. IncrementalIndicators.signal_inputs),
+        by default built from the candles passed to on_close.
+        """
+        if self.position is not None:
+            return None
+        if inputs is None:
+            if self._count < 2:
+                return None
+            bars = np.vstack([self._window, [open_] * 4 + [np.nan, np.nan]])
+            inputs = tuple(bars.T)
+        signal, sl, tp = self.signal(inputs)
+        if not signal:
+            return None
+        position = self.prepare(timestamp, signal, open_, sl, tp)
+        if position is not None:
+            self.commit(position)
+        return position
+
+    def on_range(self, timestamp, low, high):
+        """Prices seen while the candle is open. Closes at the SL/TP level if one is touched."""
+        reason = self.check_exit(low, high)
+        if not reason:
+            return None
+        return self.close(timestamp, reason, self.position.sl if reason == 'SL' else self.position.tp)
+
+    def on_close(self, open_, high, low, close, close_1h, ema_1h):
+        """The candle closed: it becomes the newest of the 2 signal candles."""
+        self._window[0] = self._window[1]
+        self._window[1] = (open_, high, low, close, close_1h, ema_1h)
+        self._count += 1
+
+    def on_bar(self, timestamp, open_, high, low, close, close_1h, ema_1h):
+        """One whole candle (replays): open, full range, close. Returns the closed trade, if any."""
+        self.on_open(timestamp, open_)
+        record = self.on_range(timestamp, low, high)
+        self.on_close(open_, high, low, close, close_1h, ema_1h)
+        return record
+
+    # --- BATCH FAST PATH ---
+
+    def run_batch(self, timestamps, opens, highs, lows, closes, closes_1h, emas_1h, start=0,
+                  manage_position=None, signals=None):
+        """
+        Same trades as calling on_bar for every bar from `start`, but only the
+        signal bars and the exit bars are visited. Stops early if a position is
+        still open at the end of the arrays (it is kept in self.position).
+        `manage_position(timestamps, highs, lows, start)` replaces the exit search.
+        `signals` is an already computed get_signals_batch result for these bars.
+        """
+        manage_position = manage_position or self.manage_position
+        if signals is None:
+            signals = BiTimeframeStrategy.get_signals_batch(
+                opens, highs, lows, closes, closes_1h, emas_1h, rr_ratio=self.rr_ratio
+            )
+        signals, sls, tps = signals
+        candidates = np.flatnonzero(signals[start:]) + start
+        directions = np.where(signals[candidates] == 1, 'BUY', 'SELL')
+
+        # Only step through candidate entry bars
+        k = 0
+        while k < len(candidates):
+            i = candidates[k]
+            position = self.prepare(timestamps[i], directions[k], opens[i], sls[i], tps[i])
+            if position is None:
+                k += 1
+                continue
+            self.commit(position)
+
+            # The entry candle itself can already hit SL/TP
+            exit_index = manage_position(timestamps, highs, lows, start=i)
+            if exit_index is None:
+                break  # Position still open at end of data
+
+            # The exit candle is not checked for a new setup,
+            # so resume from the first candidate after it.
+            k = np.searchsorted(candidates, exit_index, side='right')
@@ -0,0 +1,172 @@
+# stream_runner.py
+import asyncio
+import json
+import time
+import pandas as pd
+import websockets
+from configuration import Config
+from strategy_kernel import StrategyKernel
+from live_runner import BinanceClient, enter_position, exit_position, refresh_indicators, state_store, track_performance
+from telemetry import metrics
+from utils import interval_to_seconds, setup_logger
+
+logger = setup_logger('StreamTrading')
+
+class StreamTrader:
+    """
+    Event-driven live trader on the Binance combined WebSocket stream.
+    - Closed 1H kline  -> O(1) EMA update (resampled from the 5m klines with Config.RESAMPLE_LIVE)
+    - Closed 5m kline  -> signal check and entry right at the candle close
+    - bookTicker / kline ticks -> SL/TP check on every price update
+    Same strategy, sizing and order path as run_live.
+    """
+
+    def __init__(self, client, indicators, symbol=None, stream_url=None, capital=10000, hour_close_timeout=2.0,
+                 clock=time.time):
+        self.client = client
+        self.clock = clock  # Epoch seconds, replaceable to run on a replayed stream
+        self.indicators = indicators
+        self.symbol = symbol or Config.SYMBOL
+        self.stream_url = stream_url or Config.STREAM_URL
+        self.kernel = StrategyKernel(capital, symbol=self.symbol, logger=logger)  # Same per-trade logic as the backtests
+        self.performance = track_performance(self.kernel, clock=clock)
+        state_store().restore_kernel(self.kernel)  # Open position from before a restart
+
+        # Without resampling, a 5m candle closing on the hour waits (briefly) for
+        # the 1H close event so it is aligned with the same 1H candle as in run_live.
+        self.hour_close_timeout = hour_close_timeout
+        self._pending = None
+        self._pending_timer = None
+        self._order_in_flight = False
+
+    @property
+    def position(self):
+        return self.kernel.position
+
+    @property
+    def url(self):
+        name = self.symbol.lower()
+        klines = [Config.TF_ENTRY] if Config.RESAMPLE_LIVE else [Config.TF_ENTRY, Config.TF_FILTER]
+        streams = '/'.join([f"{name}@kline_{interval}" for interval in klines] + [f"{name}@bookTicker"])
+        return f"{self.stream_url}/stream?streams={streams}"
+
+    async def run(self):
+        """Connects (and reconnects) to the stream until cancelled."""
+        while True:
+            try:
+                async with websockets.connect(self.url) as ws:
+                    logger.info(f"Connected to {self.url}")
+                    async for message in ws:
+                        await self.on_message(json.loads(message))
+                return  # Server closed the stream cleanly (e.g. end of a replay)
+            except (OSError, websockets.ConnectionClosedError) as e:
+                logger.error(f"Stream disconnected: {e}. Reconnecting...")
+                await asyncio.sleep(1)
+                # Catch up on any candles closed while we were offline
+                self.indicators, _ = await asyncio.to_thread(refresh_indicators, self.client, self.indicators,
+                                                             self.symbol, self.clock())
+
+    async def on_message(self, message):
+        data = message.get('data', message)
+        event = data.get('e')
+        # Exchange event time: exits are booked at the tick that triggered them
+        event_time = _to_timestamp(data['E'] / 1000) if 'E' in data else None
+        if event == 'kline':
+            await self.on_kline(data['k'], event_time)
+        elif event == 'bookTicker':
+            # Long positions exit on the bid, shorts on the ask
+            if self.position:
+                side = 'b' if self.position.type == 'BUY' else 'a'
+                await self.on_price(float(data[side]), event_time)
+
+    async def on_kline(self, k, event_time=None):
+        if not k['x']:
+            # Intrabar update: its last trade price is a tick too
+            await self.on_price(float(k['c']), event_time)
+            return
+
+        open_time = k['t'] // 1000
+        if k['i'] == Config.TF_FILTER:
+            if _is_seen(self.indicators.last_1h_time, open_time): return
+            self.indicators.update_1h(_to_timestamp(open_time), float(k['c']))
+            if self._pending and self._hour_ready(self._pending[0]):
+                await self._flush_pending()
+        elif k['i'] == Config.TF_ENTRY:
+            if _is_seen(self.indicators.last_5m_time, open_time): return
+            if self._pending:
+                if self._pending[0] >= open_time: return  # Replayed while it waits for its 1H candle
+                await self._flush_pending()  # The next candle closed first: don't hold the previous one back
+            self._pending = (open_time, float(k['o']), float(k['h']), float(k['l']), float(k['c']))
+            if self._hour_ready(open_time):
+                await self._flush_pending()
+            else:
+                loop = asyncio.get_running_loop()
+                self._pending_timer = loop.call_later(
+                    self.hour_close_timeout, lambda: asyncio.ensure_future(self._flush_pending()))
+
+    def _hour_ready(self, open_time_5m):
+        """True if every 1H candle closed by the end of this 5m candle has been received."""
+        if Config.RESAMPLE_LIVE:
+            return True  # The 5m candle closes its own 1H candle
+        close_time = open_time_5m + interval_to_seconds(Config.TF_ENTRY)
+        hour = interval_to_seconds(Config.TF_FILTER)
+        last_closed_hour = close_time - close_time % hour - hour
+        last_1h = self.indicators.last_1h_time
+        return last_1h is not None and last_1h.timestamp() >= last_closed_hour
+
+    async def _flush_pending(self):
+        if self._pending_timer:
+            self._pending_timer.cancel()
+            self._pending_timer = None
+        if not self._pending:
+            return
+        open_time, o, h, l, c = self._pending
+        self._pending = None
+        self.indicators.update_5m(_to_timestamp(open_time), o, h, l, c)
+        await self.on_candle_close(c, _to_timestamp(open_time + interval_to_seconds(Config.TF_ENTRY)))
+        metrics.observe('decision_lag', self.clock() - open_time - interval_to_seconds(Config.TF_ENTRY))
+
+    async def on_candle_close(self, close, next_open_time=None):
+        """Entry check as soon as the 5m candle closes. The next open is taken as the close."""
+        if self.position or not self.indicators.ready:
+            return
+        with metrics.span('cycle.signal'):
+            signal, sl, tp = self.kernel.signal(self.indicators.signal_inputs(close))
+        if signal:
+            metrics.incr('signals')
+            logger.info(f"SIGNAL DETECTED: {signal} (SL: {sl:.2f} TP: {tp:.2f})")
+            await asyncio.to_thread(enter_position, self.client, self.kernel, signal, close, sl, tp, next_open_time)
+
+    async def on_price(self, price, event_time=None):
+        """Exit check on every tick (`event_time`: the tick's exchange time, the clock's if None)."""
+        if not self.position or self._order_in_flight:
+            return
+        exit_reason = self.kernel.check_exit(price)
+        if exit_reason:
+            self._order_in_flight = True
+            try:
+                timestamp = event_time if event_time is not None else _to_timestamp(self.clock())
+                await asyncio.to_thread(exit_position, self.client, self.kernel, price, exit_reason, timestamp)
+            finally:
+                self._order_in_flight = False
+
+def _is_seen(last_time, open_time):
+    """Closed klines replayed after a reconnect are ignored."""
+    return last_time is not None and last_time.timestamp() >= open_time
+
+def _to_timestamp(seconds):
+    return pd.Timestamp(seconds, unit='s')
+
+async def run_stream(client=None, stream_url=None, clock=time.time):
+    client = client or BinanceClient()
+    logger.info(f"Starting Stream Trading on {Config.SYMBOL} (WebSocket Mode)")
+    metrics.start_snapshots(Config.METRICS_FILE, Config.METRICS_INTERVAL)
+    if Config.METRICS_PORT:
+        metrics.serve(port=Config.METRICS_PORT)
+    # Indicators stored by the last run only need the candles closed since then
+    indicators, _ = await asyncio.to_thread(refresh_indicators, client, state_store().load_indicators(Config.SYMBOL),
+                                            Config.SYMBOL, clock())
+    await StreamTrader(client, indicators, stream_url=stream_url, clock=clock).run()
+
+if __name__ == "__main__":
+    asyncio.run(run_stream())
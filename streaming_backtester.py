@@ -0,0 +1,145 @@
+# streaming_backtester.py
+import os
+import numpy as np
+import pandas as pd
+from configuration import Config
+from backtest_runner import TRADE_LOG_COLUMNS, CustomBacktester, logger
+from candle_store import CandleStore
+from indicators import IncrementalEMA
+from performance import LiveMetrics
+from utils import interval_to_seconds
+
+class StreamingBacktester(CustomBacktester):
+    """
+    Out-of-core version of CustomBacktester for histories larger than memory.
+    Reads the 5m candles from the CandleStore in row chunks and only keeps
+    one chunk in memory. Carried across chunk boundaries:
+    - the 1H EMA state and the last closed 1H values
+    - the last 2 valid 5m bars (the signal looks back 2 candles)
+    - the open position, whose exit search continues in the next chunk
+    Closed trades are appended to output_file after every chunk and the
+    metrics come from the incremental LiveMetrics tracker, so peak memory does not
+    grow with the length of the history. Trades and metrics are identical
+    to calculate_indicators(...).dropna() + CustomBacktester.run().
+    """
+    LOOKBACK = 2  # Closed bars get_signals_batch reads before bar i
+
+    def __init__(self, symbol=None, initial_capital=10000, ema_period=None, rr_ratio=None,
+                 risk_per_trade=None, output_file=None, store=None, chunk_size=None,
+                 start=None, end=None):
+        super().__init__(None, initial_capital, symbol=symbol, ema_period=ema_period,
+                         rr_ratio=rr_ratio, risk_per_trade=risk_per_trade, output_file=output_file)
+        self.store = store or CandleStore()
+        self.chunk_size = chunk_size or Config.BACKTEST_CHUNK_SIZE
+        self.start, self.end = start, end
+
+        self.tracker = LiveMetrics(initial_capital)
+        self._first_time = self._last_time = None
+        self._header = True
+
+    @property
+    def total_trades(self):
+        return self.tracker.total_trades
+
+    def run(self, save=True):
+        logger.info(f"Starting Streaming Backtest on {self.symbol} ({self.chunk_size} bars per chunk)...")
+        candles_5m = self.store.open(self.symbol, Config.TF_ENTRY, self.start, self.end)
+        candles_1h = self.store.open(self.symbol, Config.TF_FILTER, None, self.end)
+        if save and os.path.exists(self.output_file):
+            os.remove(self.output_file)
+
+        ema = IncrementalEMA(self.ema_period)
+        fill = np.array([np.nan, np.nan])  # Last closed (Close_1h, EMA_1h)
+        next_1h = 0
+        # A 1H candle is visible from the 5m candle closing with or after it
+        lag_ms = (interval_to_seconds(Config.TF_FILTER) - interval_to_seconds(Config.TF_ENTRY)) * 1000
+        carry = None  # Last valid bars of the previous chunk
+
+        for lo in range(0, len(candles_5m['timestamp']), self.chunk_size):
+            chunk = {col: np.asarray(values[lo:lo + self.chunk_size]) for col, values in candles_5m.items()}
+            times = chunk['timestamp']
+
+            # --- 1. 1H EMA + ALIGNMENT (same as alignment.visible_rows) ---
+            hi_1h = int(np.searchsorted(candles_1h['timestamp'], times[-1] - lag_ms, side='right'))
+            times_1h = np.asarray(candles_1h['timestamp'][next_1h:hi_1h])
+            closes_1h = np.asarray(candles_1h['close'][next_1h:hi_1h], dtype=float)
+            emas_1h = np.array([ema.update(close) for close in closes_1h])
+            next_1h = hi_1h
+
+            # Row 0 is the last 1H candle of the previous chunks, row k + 1 the new 1H row k
+            values = np.vstack([fill, np.column_stack([closes_1h, emas_1h]).reshape(-1, 2)])
+            aligned = values[np.searchsorted(times_1h, times - lag_ms, side='right')]
+            fill = values[-1]
+
+            bars = np.column_stack([chunk['open'], chunk['high'], chunk['low'], chunk['close'], aligned])
+            valid = ~np.isnan(bars).any(axis=1) & ~np.isnan(chunk['volume'])
+            bars, times = bars[valid], times[valid]
+            if len(times) == 0:
+                continue
+            if self._first_time is None:
+                self._first_time = times[0]
+            self._last_time = times[-1]
+
+            # --- 2. PREPEND THE CARRIED BARS ---
+            skip = 0
+            if carry is not None:
+                skip = len(carry[0])
+                times = np.concatenate([carry[0], times])
+                bars = np.vstack([carry[1], bars])
+            carry = (times[-self.LOOKBACK:], bars[-self.LOOKBACK:])
+            timestamps = pd.DatetimeIndex(pd.to_datetime(times, unit='ms'), name='timestamp')
+            opens, highs, lows, closes, c_1h, e_1h = bars.T
+
+            # --- 3. BACKTEST THE NEW BARS ---
+            start = skip
+            if self.position is not None:
+                exit_index = self.manage_position(timestamps, highs, lows, start=skip)
+                start = len(times) if exit_index is None else exit_index + 1
+            if start < len(times):
+                self.trade_signals(timestamps, opens, highs, lows, closes, c_1h, e_1h, start=start)
+
+            if save:
+                self.save_log()
+            self.trades = []
+
+        metrics = self.calculate_metrics()
+        if save:
+            if self.total_trades:
+                logger.info(f"Saved trades to {self.output_file}")
+            else:
+                logger.warning("No trades generated.")
+        return metrics
+
+    def close_trade(self, exit_time, reason, exit_price, trade=None):
+        super().close_trade(exit_time, reason, exit_price, trade)
+        self.tracker.add(self.trades[-1])
+
+    def performance(self):
+        self.tracker.start = pd.to_datetime(self._first_time, unit='ms')
+        self.tracker.end = pd.to_datetime(self._last_time, unit='ms')
+        return self.tracker
+
+    def save_log(self):
+        """Appends the trades closed since the last call to output_file."""
+        if not self.trades:
+            return
+        cols = TRADE_LOG_COLUMNS
+        df_trades = pd.DataFrame(self.trades)
+        df_trades['pnl'] = df_trades['pnl'].round(2)
+        df_trades['capital_after'] = df_trades['capital_after'].round(2)
+        # Fixed format: pandas drops the time when every timestamp in a batch is midnight
+        df_trades[cols].to_csv(self.output_file, index=False, mode='a', header=self._header,
+                               date_format='%Y-%m-%d %H:%M:%S')
+        self._header = False
+
+def run_streaming_backtest(symbol=None, chunk_size=None):
+    symbol = symbol or Config.SYMBOL
+    store = CandleStore()
+    if not (store.exists(symbol, Config.TF_ENTRY) and store.exists(symbol, Config.TF_FILTER)):
+        logger.error(f"{symbol} not in {store.root}, run candle_store.py (or data_fetcher.py) first.")
+        return
+    engine = StreamingBacktester(symbol, initial_capital=10000, store=store, chunk_size=chunk_size)
+    engine.run()
+
+if __name__ == "__main__":
+    run_streaming_backtest()
@@ -0,0 +1,149 @@
+# sweep_runner.py
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from configuration import Config
+from backtest_runner import CustomBacktester
+from candle_store import load_candles
+from dataset_cache import FEATURES_VERSION, dataset_sources, default_cache
+from alignment import visible_rows
+from utils import calculate_ema, log_synchronously, setup_logger
+
+logger = setup_logger('ParameterSweep')
+
+# Worker side views onto the shared arrays (filled by _init_worker)
+_SHARED = {}
+
+def _share_arrays(arrays):
+    """
+    Copies each array into a SharedMemory block once.
+    Returns the blocks (kept alive by the parent) and the specs workers need to attach.
+    """
+    blocks, specs = [], {}
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+        blocks.append(shm)
+        specs[name] = (shm.name, arr.shape, arr.dtype.str)
+    return blocks, specs
+
+def _init_worker(specs):
+    """Attaches to the shared blocks once per worker process (no per-task copies)."""
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _SHARED[name] = (shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+    # One line per trade from every worker would flood the console
+    logging.getLogger('CustomBacktest').setLevel(logging.ERROR)
+    log_synchronously()  # Nothing is left queued when the worker exits
+
+def align_1h(arr, ema_1h):
+    """
+    Forward-fills the 1H close and EMA onto the 5m rows of load_sweep_arrays.
+    Returns (valid, closes_1h, emas_1h): valid marks the rows dropna() keeps.
+    """
+    row_1h = arr['row_1h']
+    has_1h = row_1h >= 0
+    safe_rows = np.where(has_1h, row_1h, 0)
+    closes_1h = np.where(has_1h, arr['close_1h'][safe_rows], np.nan)
+    emas_1h = np.where(has_1h, ema_1h[safe_rows], np.nan)
+
+    valid = arr['valid_5m'] & ~np.isnan(closes_1h) & ~np.isnan(emas_1h)
+    return valid, closes_1h, emas_1h
+
+def _build_data(ema_period):
+    """
+    Rebuilds the calculate_indicators(...).dropna() frame for one EMA period
+    from the shared 5m arrays and the 5m -> 1H row mapping.
+    """
+    arr = {name: a for name, (_, a) in _SHARED.items()}
+    valid, closes_1h, emas_1h = align_1h(arr, calculate_ema(arr['close_1h'], ema_period))
+    return pd.DataFrame({
+        'Open': arr['open'][valid],
+        'High': arr['high'][valid],
+        'Low': arr['low'][valid],
+        'Close': arr['close'][valid],
+        'Close_1h': closes_1h[valid],
+        f'EMA_{ema_period}_1h': emas_1h[valid],
+    }, index=pd.DatetimeIndex(arr['timestamp'][valid], name='timestamp'))
+
+def _run_task(params):
+    """Runs one backtest inside a worker process."""
+    ema_period, rr_ratio, risk_per_trade, initial_capital = params
+    engine = CustomBacktester(
+        _build_data(ema_period), initial_capital=initial_capital,
+        ema_period=ema_period, rr_ratio=rr_ratio, risk_per_trade=risk_per_trade
+    )
+    metrics = engine.run(save=False)
+    return {'ema_period': ema_period, 'rr_ratio': rr_ratio,
+            'risk_per_trade': risk_per_trade, **metrics}
+
+def load_sweep_arrays(df_5m, df_1h):
+    """
+    Prepares the parameter-independent arrays shared by every run.
+    row_1h[i] is the last 1H row closed by the close of 5m row i, exactly
+    as calculate_indicators aligns it (-1 = none yet).
+    """
+    df_5m = df_5m.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close'})
+    df_1h = df_1h.rename(columns={'close': 'Close'})
+    row_1h = visible_rows(df_5m.index, Config.TF_ENTRY, df_1h.index, Config.TF_FILTER)
+
+    return {
+        'timestamp': df_5m.index.values,
+        'open': df_5m['Open'].to_numpy(dtype=float),
+        'high': df_5m['High'].to_numpy(dtype=float),
+        'low': df_5m['Low'].to_numpy(dtype=float),
+        'close': df_5m['Close'].to_numpy(dtype=float),
+        'valid_5m': df_5m.notna().all(axis=1).to_numpy(),
+        'close_1h': df_1h['Close'].to_numpy(dtype=float),
+        'row_1h': row_1h,
+    }
+
+def load_sweep_data(symbol=None, cache=None):
+    """load_sweep_arrays of the symbol's stored candles, cached on disk until they change."""
+    symbol = symbol or Config.SYMBOL
+    csv_5m, csv_1h, sources = dataset_sources(symbol)
+    spec = {'features': 'sweep_arrays', 'version': FEATURES_VERSION, 'symbol': symbol,
+            'intervals': [Config.TF_ENTRY, Config.TF_FILTER]}
+    build = lambda: load_sweep_arrays(load_candles(symbol, Config.TF_ENTRY, csv_5m),
+                                      load_candles(symbol, Config.TF_FILTER, csv_1h))
+    return (cache or default_cache()).cached(spec, sources, build)
+
+def run_sweep(df_5m, df_1h, ema_periods, rr_ratios, risk_per_trades,
+              initial_capital=10000, output_file=None, workers=None, arrays=None):
+    """
+    Backtests every combination of the parameter grids on all CPU cores
+    and writes one results row per combination to output_file.
+    `arrays` (load_sweep_data) replaces df_5m / df_1h.
+    """
+    output_file = output_file or Config.SWEEP_OUTPUT
+    grid = [(ema, rr, risk, initial_capital)
+            for ema, rr, risk in itertools.product(ema_periods, rr_ratios, risk_per_trades)]
+    workers = workers or os.cpu_count()
+    logger.info(f"Sweeping {len(grid)} parameter sets on {workers} workers...")
+
+    blocks, specs = _share_arrays(load_sweep_arrays(df_5m, df_1h) if arrays is None else arrays)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(specs,)) as pool:
+            results = list(pool.map(_run_task, grid))
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    df_results = pd.DataFrame(results).sort_values('sharpe_ratio', ascending=False)
+    df_results.to_csv(output_file, index=False)
+    logger.info(f"Saved {len(df_results)} sweep results to {output_file}")
+    return df_results
+
+if __name__ == "__main__":
+    try:
+        arrays = load_sweep_data()
+    except FileNotFoundError:
+        logger.error("Data files not found.")
+    else:
+        run_sweep(None, None, Config.SWEEP_EMA_PERIODS, Config.SWEEP_RR_RATIOS, Config.SWEEP_RISK_PER_TRADE, arrays=arrays)
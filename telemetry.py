@@ -0,0 +1,111 @@
+# telemetry.py
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http_client import LatencyStats
+from utils import setup_logger
+
+logger = setup_logger('Telemetry')
+
+class Telemetry:
+    """
+    In-process metrics for the live loop:
+    - spans: timed phases, summarised as count / errors / p50 / p95 / p99 (ms)
+    - counters: monotonically increasing event counts
+    - gauges: last observed value
+    Exposed as a JSON snapshot, either written to a file periodically or
+    served on a local HTTP endpoint (GET /metrics).
+    """
+
+    def __init__(self, window=1000):
+        self.spans = LatencyStats(window)
+        self.counters = {}
+        self.gauges = {}
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        """Times the enclosed block. An exception marks the sample as an error."""
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.spans.record(name, time.perf_counter() - start, ok=ok)
+
+    def observe(self, name, seconds):
+        """Adds a duration measured elsewhere (e.g. lag behind the candle close)."""
+        self.spans.record(name, seconds)
+
+    def incr(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def snapshot(self):
+        with self.lock:
+            counters, gauges = dict(self.counters), dict(self.gauges)
+        return {
+            'time': time.time(),
+            'uptime_s': time.time() - self.started,
+            'spans': self.spans.summary(),
+            'counters': counters,
+            'gauges': gauges,
+        }
+
+    def write_snapshot(self, path):
+        """Atomic write, so a reader never sees half a file."""
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2, default=float)
+        os.replace(tmp, path)
+
+    def start_snapshots(self, path, interval=60):
+        """Writes the snapshot to `path` every `interval` seconds from a daemon thread."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_snapshot(path)
+                except OSError as e:
+                    logger.error(f"Could not write metrics snapshot: {e}")
+
+        threading.Thread(target=loop, name='metrics-snapshot', daemon=True).start()
+        logger.info(f"Writing metrics snapshot to {path} every {interval}s")
+
+    def serve(self, host='127.0.0.1', port=9108):
+        """Serves the snapshot as JSON on http://host:port/metrics from a daemon thread."""
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                body = json.dumps(telemetry.snapshot(), default=float).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # Keep scrapes out of the trading log
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        logger.info(f"Serving metrics on http://{host}:{server.server_port}/metrics")
+        return server
+
+# Process-wide registry used by the live and streaming runners
+metrics = Telemetry()
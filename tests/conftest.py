@@ -0,0 +1,38 @@
+# tests/conftest.py
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules under test live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resampler import resample_ohlcv
+
+def synthetic_candles(bars=3000, seed=0, start='2024-01-01', price=40000.0):
+    """Random-walk 5m candles and the 1H candles resampled from them, laid out like the backtest CSVs."""
+    rng = np.random.default_rng(seed)
+    closes = price * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    opens = np.r_[price, closes[:-1]]
+    highs = np.maximum(opens, closes) * (1 + rng.uniform(0, 0.001, bars))
+    lows = np.minimum(opens, closes) * (1 - rng.uniform(0, 0.001, bars))
+    index = pd.date_range(start, periods=bars, freq='5min', name='timestamp')
+    df_5m = pd.DataFrame({'open': opens, 'high': highs, 'low': lows, 'close': closes,
+                          'volume': rng.uniform(1, 10, bars)}, index=index)
+    return df_5m, resample_ohlcv(df_5m, '1h', '5m')
+
+@pytest.fixture
+def candles():
+    return synthetic_candles()
+
+@pytest.fixture
+def state_db(tmp_path, monkeypatch):
+    """A fresh live state store in tmp_path for the live runners."""
+    import live_runner
+    from configuration import Config
+    monkeypatch.setattr(Config, 'STATE_DB', str(tmp_path / 'live_state.db'))
+    monkeypatch.setattr(live_runner, '_store', None)
+    yield
+    if live_runner._store is not None:
+        live_runner._store.close()
@@ -0,0 +1,41 @@
+# tests/test_alignment.py
+import numpy as np
+import pandas as pd
+from alignment import TimeframeAligner, visible_rows
+from conftest import synthetic_candles
+
+def test_1h_candle_is_visible_from_the_5m_candle_closing_with_it():
+    times_5m = pd.date_range('2024-01-01 09:00', '2024-01-01 11:55', freq='5min')
+    times_1h = pd.date_range('2024-01-01 09:00', periods=3, freq='1h')
+    rows = pd.Series(visible_rows(times_5m, '5m', times_1h, '1h'), index=times_5m)
+
+    assert (rows[:'2024-01-01 09:50'] == -1).all()  # 09:00 bar still forming
+    # The candle opened at 10:50 closes at 10:55: only the 09:00 bar has closed
+    assert rows['2024-01-01 10:50'] == 0
+    # The candle opened at 10:55 closes at 11:00, with the 10:00 bar
+    assert rows['2024-01-01 10:55'] == 1
+    assert rows['2024-01-01 11:50'] == 1
+    assert rows['2024-01-01 11:55'] == 2
+
+def test_aligned_columns_follow_the_visible_rows(candles):
+    df_5m, df_1h = candles
+    aligned = TimeframeAligner().align(df_5m, {'1h': df_1h}, {'1h': [('SMA', 3)]})
+    hour = df_1h.index[5]
+    assert aligned.loc[hour + pd.Timedelta(minutes=50), 'Close_1h'] == df_1h['close'].iloc[4]
+    assert aligned.loc[hour + pd.Timedelta(minutes=55), 'Close_1h'] == df_1h['close'].iloc[5]
+    assert aligned.loc[hour + pd.Timedelta(minutes=55), 'SMA_3_1h'] == df_1h['close'].iloc[3:6].mean()
+    assert aligned['Close_1h'].iloc[:11].isna().all()
+
+def test_evicted_entries_are_rebuilt_correctly():
+    datasets = [synthetic_candles(600, seed=seed) for seed in range(3)]
+    spec = {'1h': [('EMA', 5), ('SMA', 3)]}
+    expected = [TimeframeAligner(cache_size=64).align(df_5m, {'1h': df_1h}, spec) for df_5m, df_1h in datasets]
+
+    # 3 entries (rows + 2 indicators) per dataset, so every align evicts the previous dataset
+    aligner = TimeframeAligner(cache_size=3)
+    for _ in range(2):
+        for (df_5m, df_1h), want in zip(datasets, expected):
+            got = aligner.align(df_5m, {'1h': df_1h}, spec)
+            assert len(aligner._cache) <= 3
+            pd.testing.assert_frame_equal(got, want)
+    assert not np.array_equal(expected[0]['EMA_5_1h'], expected[1]['EMA_5_1h'], equal_nan=True)
@@ -0,0 +1,42 @@
+# tests/test_backtest_runner.py
+import logging
+import pandas as pd
+from backtest_runner import CustomBacktester
+from candle_store import CandleStore
+from configuration import Config
+from streaming_backtester import StreamingBacktester
+from utils import calculate_indicators
+
+logging.getLogger('CustomBacktest').disabled = True
+
+def test_explicit_zero_parameters_are_not_replaced(candles):
+    data = calculate_indicators(*candles).dropna()
+    engine = CustomBacktester(data, rr_ratio=0.0, risk_per_trade=0.0)
+    assert engine.rr_ratio == 0.0 and engine.kernel.rr_ratio == 0.0
+    assert engine.risk_per_trade == 0.0 and engine.kernel.risk_amount == 0.0
+
+    # Nothing at risk: every entry sizes to zero
+    assert engine.run(save=False)['total_trades'] == 0
+
+def test_streaming_backtester_matches_in_memory_run(candles, tmp_path):
+    df_5m, df_1h = candles
+    store = CandleStore(str(tmp_path / 'data'))
+    store.write('BTCUSDT', Config.TF_ENTRY, df_5m)
+    store.write('BTCUSDT', Config.TF_FILTER, df_1h)
+
+    engine = CustomBacktester(calculate_indicators(df_5m, df_1h).dropna(), symbol='BTCUSDT',
+                              output_file=str(tmp_path / 'batch.csv'))
+    expected = engine.run()
+    # Small chunks so open positions are carried across chunk boundaries
+    chunk_size = 97
+    entry_chunks = [df_5m.index.get_loc(t['timestamp']) // chunk_size for t in engine.trades]
+    exit_chunks = [df_5m.index.get_loc(t['exit_time']) // chunk_size for t in engine.trades]
+    assert any(a != b for a, b in zip(entry_chunks, exit_chunks))
+
+    streaming = StreamingBacktester('BTCUSDT', store=store, chunk_size=chunk_size,
+                                    output_file=str(tmp_path / 'streaming.csv'))
+    got = streaming.run()
+    assert got['final_balance'] == expected['final_balance']
+    assert got['total_trades'] == expected['total_trades'] > 0
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'streaming.csv', parse_dates=['timestamp']),
+                                  pd.read_csv(tmp_path / 'batch.csv', parse_dates=['timestamp']))
@@ -0,0 +1,53 @@
+# tests/test_candle_store.py
+import os
+import numpy as np
+import pandas as pd
+from candle_store import CandleStore, convert_csv, load_candles
+
+def test_converted_csv_loads_like_the_csv(candles, tmp_path):
+    df_5m, _ = candles
+    csv_path = tmp_path / '5m.csv'
+    df_5m.to_csv(csv_path)
+    store = CandleStore(str(tmp_path / 'data'))
+
+    from_csv = load_candles('BTCUSDT', '5m', str(csv_path), store)  # Not converted yet: parses the CSV
+    convert_csv(str(csv_path), 'BTCUSDT', '5m', store)
+    from_store = load_candles('BTCUSDT', '5m', None, store)
+    pd.testing.assert_frame_equal(from_store, from_csv, check_freq=False, check_index_type=False)
+
+    opened = store.open('BTCUSDT', '5m', start='2024-01-02', end='2024-01-03')
+    assert len(opened['timestamp']) == 288
+    assert opened['timestamp'][0] == pd.Timestamp('2024-01-02').value // 10**6
+
+def test_rewrite_swaps_the_whole_dataset(candles, tmp_path):
+    df_5m, _ = candles
+    store = CandleStore(str(tmp_path / 'data'))
+    store.write('BTCUSDT', '5m', df_5m.iloc[:100])
+    first = store.folder('BTCUSDT', '5m')
+    old = store.open('BTCUSDT', '5m')  # Memory-mapped before the rewrite
+
+    store.write('BTCUSDT', '5m', df_5m.iloc[:200])
+    assert store.folder('BTCUSDT', '5m') != first
+    assert len(store.open('BTCUSDT', '5m')['close']) == 200
+    np.testing.assert_array_equal(old['close'], df_5m['close'].to_numpy()[:100])
+
+    # Only the current and the previous version are kept
+    store.write('BTCUSDT', '5m', df_5m.iloc[:300])
+    path = store.path('BTCUSDT', '5m')
+    versions = [name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name))]
+    assert len(versions) == 2 and first not in [os.path.join(path, v) for v in versions]
+    assert len(store.read_frame('BTCUSDT', '5m')) == 300
+
+def test_store_written_before_versioning_is_read_and_replaced(candles, tmp_path):
+    df_5m, _ = candles
+    store = CandleStore(str(tmp_path / 'data'))
+    path = store.path('BTCUSDT', '5m')
+    os.makedirs(path)
+    np.save(os.path.join(path, 'timestamp.npy'), df_5m.index.as_unit('ms').asi8[:50])
+    for col in CandleStore.COLUMNS[1:]:
+        np.save(os.path.join(path, f'{col}.npy'), df_5m[col].to_numpy()[:50])
+    assert store.exists('BTCUSDT', '5m') and len(store.read_frame('BTCUSDT', '5m')) == 50
+
+    store.write('BTCUSDT', '5m', df_5m.iloc[:80])
+    assert len(store.read_frame('BTCUSDT', '5m')) == 80
+    assert not any(name.endswith('.npy') for name in os.listdir(path))
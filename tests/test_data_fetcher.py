@@ -0,0 +1,75 @@
+# tests/test_data_fetcher.py
+import pytest
+from candle_store import CandleStore
+from data_fetcher import LIMIT, fetch_binance_data
+
+STEP_MS = 3600 * 1000
+DAYS = 200  # 4800 1h candles, 5 chunks
+
+class FakeKlines:
+    """
+    Serves synthetic 1h klines for any startTime / endTime; `fail_at` chunk
+    starts raise, and no candles are served inside the `empty` [start, end) ranges.
+    """
+
+    def __init__(self, fail_at=(), empty=()):
+        self.fail_at = set(fail_at)
+        self.empty = list(empty)
+        self.requests = []
+
+    def get(self, path, params=None, weight=1):
+        start, end = params['startTime'], params['endTime']
+        self.requests.append(start)
+        if start in self.fail_at:
+            raise ConnectionError('injected chunk failure')
+        return [[t, '1', '2', '0.5', '1.5', '10'] for t in range(start, end + 1, STEP_MS)
+                if not any(a <= t < b for a, b in self.empty)][:LIMIT]
+
+def test_failed_chunk_keeps_downloaded_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr('data_fetcher.time.time', lambda: 1_700_000_000)
+    store = CandleStore(str(tmp_path))
+    end_ms = 1_700_000_000_000 // STEP_MS * STEP_MS
+    starts = [end_ms - DAYS * 24 * STEP_MS + k * LIMIT * STEP_MS for k in range(5)]
+
+    with pytest.raises(ConnectionError):
+        fetch_binance_data('BTCUSDT', '1h', DAYS, workers=1, session=FakeKlines(fail_at=[starts[2]]), store=store)
+    stored = store.open('BTCUSDT', '1h')['timestamp']
+    assert len(stored) >= 2 * LIMIT
+    assert not ((stored >= starts[2]) & (stored < starts[3])).any()
+
+    # The rerun only requests the chunks that are still missing
+    session = FakeKlines()
+    df = fetch_binance_data('BTCUSDT', '1h', DAYS, workers=2, session=session, store=store)
+    assert starts[2] in session.requests
+    assert starts[0] not in session.requests and starts[1] not in session.requests
+    assert len(df) == DAYS * 24
+    assert len(store.open('BTCUSDT', '1h')['timestamp']) == DAYS * 24
+
+def test_ranges_answered_empty_are_not_requested_again(tmp_path, monkeypatch):
+    monkeypatch.setattr('data_fetcher.time.time', lambda: 1_700_000_000)
+    store = CandleStore(str(tmp_path))
+    end_ms = 1_700_000_000_000 // STEP_MS * STEP_MS
+    start_ms = end_ms - DAYS * 24 * STEP_MS
+    listing = (start_ms, start_ms + 30 * STEP_MS)  # Before the symbol was listed
+    maintenance = (start_ms + 1500 * STEP_MS, start_ms + 1506 * STEP_MS)
+    session = FakeKlines(empty=[listing, maintenance])
+
+    df = fetch_binance_data('BTCUSDT', '1h', DAYS, workers=2, session=session, store=store)
+    assert len(df) == DAYS * 24 - 36
+
+    rerun = FakeKlines(empty=[listing, maintenance])
+    df = fetch_binance_data('BTCUSDT', '1h', DAYS, workers=2, session=rerun, store=store)
+    assert rerun.requests == []
+    assert len(df) == DAYS * 24 - 36
+
+def test_missing_newest_candles_are_requested_again(tmp_path, monkeypatch):
+    monkeypatch.setattr('data_fetcher.time.time', lambda: 1_700_000_000)
+    store = CandleStore(str(tmp_path))
+    end_ms = 1_700_000_000_000 // STEP_MS * STEP_MS
+    late = (end_ms - 2 * STEP_MS, end_ms)  # Not published yet
+    fetch_binance_data('BTCUSDT', '1h', DAYS, workers=2, session=FakeKlines(empty=[late]), store=store)
+
+    rerun = FakeKlines()
+    df = fetch_binance_data('BTCUSDT', '1h', DAYS, workers=2, session=rerun, store=store)
+    assert rerun.requests == [late[0]]
+    assert len(df) == DAYS * 24
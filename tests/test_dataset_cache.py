@@ -0,0 +1,81 @@
+# tests/test_dataset_cache.py
+import time
+import numpy as np
+import pandas as pd
+import pytest
+import dataset_cache
+import utils
+from configuration import Config
+from dataset_cache import DatasetCache, load_dataset
+
+@pytest.fixture
+def csvs(candles, tmp_path, monkeypatch):
+    """The fixture candles as the backtest CSVs, with an empty candle store."""
+    monkeypatch.setattr(Config, 'DATA_DIR', str(tmp_path / 'data'))
+    paths = {'csv_5m': str(tmp_path / '5m.csv'), 'csv_1h': str(tmp_path / '1h.csv')}
+    candles[0].to_csv(paths['csv_5m'])
+    candles[1].to_csv(paths['csv_1h'])
+    return paths
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Counts the calculate_indicators calls, i.e. the cache misses of load_dataset."""
+    calls = []
+    calculate_indicators = utils.calculate_indicators
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return calculate_indicators(*args, **kwargs)
+
+    monkeypatch.setattr(utils, 'calculate_indicators', counted)
+    return calls
+
+def test_hit_returns_the_built_dataset(csvs, builds, tmp_path):
+    cache = DatasetCache(str(tmp_path / 'cache'))
+    first = load_dataset(Config.SYMBOL, cache=cache, **csvs)
+    second = load_dataset(Config.SYMBOL, cache=cache, **csvs)
+    assert len(builds) == 1
+    pd.testing.assert_frame_equal(first, second)
+    df_5m = pd.read_csv(csvs['csv_5m'], parse_dates=True, index_col='timestamp')
+    df_1h = pd.read_csv(csvs['csv_1h'], parse_dates=True, index_col='timestamp')
+    pd.testing.assert_frame_equal(second, utils.calculate_indicators(df_5m, df_1h).dropna(),
+                                  check_freq=False, check_index_type=False)
+
+def test_changed_inputs_miss(csvs, builds, tmp_path, monkeypatch):
+    cache = DatasetCache(str(tmp_path / 'cache'))
+    load_dataset(Config.SYMBOL, cache=cache, **csvs)
+    load_dataset(Config.SYMBOL, ema_period=50, cache=cache, **csvs)
+    load_dataset(Config.SYMBOL, start='2024-01-05', cache=cache, **csvs)
+    assert len(builds) == 3
+
+    # Same spec, new candles
+    df_5m = pd.read_csv(csvs['csv_5m'], index_col='timestamp')
+    df_5m.iloc[-1, df_5m.columns.get_loc('close')] *= 1.01
+    df_5m.to_csv(csvs['csv_5m'])
+    load_dataset(Config.SYMBOL, cache=cache, **csvs)
+    assert len(builds) == 4
+
+    # calculate_indicators changed
+    monkeypatch.setattr(dataset_cache, 'FEATURES_VERSION', dataset_cache.FEATURES_VERSION + 1)
+    load_dataset(Config.SYMBOL, cache=cache, **csvs)
+    assert len(builds) == 5
+    load_dataset(Config.SYMBOL, cache=cache, **csvs)
+    assert len(builds) == 5
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry = {'values': np.zeros(1000)}  # ~8 KB
+    cache = DatasetCache(str(tmp_path / 'cache'), max_mb=20 / 1024)  # Room for two entries
+    for key in ('a', 'b'):
+        cache.put(key, entry)
+        time.sleep(0.01)
+    assert cache.get('a') is not None  # Now used more recently than b
+    time.sleep(0.01)
+
+    cache.put('c', entry)
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+
+def test_newest_entry_is_kept_even_if_too_large(tmp_path):
+    cache = DatasetCache(str(tmp_path / 'cache'), max_mb=0)
+    cache.put('a', {'values': np.zeros(10)})
+    assert cache.get('a') is not None
@@ -0,0 +1,63 @@
+# tests/test_execution.py
+import numpy as np
+import pytest
+from execution import ExecutionModel, parse_fill
+from strategy_kernel import StrategyKernel
+
+MODEL = ExecutionModel(fee_rate=0.001, spread_bps=2.0, slippage_bps=1.0, qty_step=0.001, min_qty=0.001)
+
+def test_round_qty_floors_to_the_step():
+    assert MODEL.round_qty(0.0129) == 0.012
+    assert MODEL.round_qty(1.0) == 1.0
+    assert MODEL.round_qty(0.0009) == 0.0  # Below the minimum: no trade
+    assert np.array_equal(MODEL.round_qty(np.array([0.0129, 0.0009, 2.5])), [0.012, 0.0, 2.5])
+
+def test_round_qty_has_no_float_noise():
+    model = ExecutionModel(qty_step=0.1, min_qty=0.1)
+    # 0.3 / 0.1 == 2.9999999999999996 and 3 * 0.1 == 0.30000000000000004
+    assert model.round_qty(0.3) == 0.3
+    assert model.round_qty(0.7) == 0.7
+    assert repr(model.round_qty(1.23)) == '1.2'
+
+def test_lot_sizes_are_per_symbol():
+    assert ExecutionModel(symbol='SOLUSDT').round_qty(12.7) == 12
+    assert ExecutionModel(symbol='SOLUSDT').round_qty(0.9) == 0.0
+    assert ExecutionModel(symbol='BNBUSDT').round_qty(0.129) == 0.12
+    assert ExecutionModel(symbol='BTCUSDT').round_qty(0.0129) == 0.012
+    assert ExecutionModel(symbol='SOLUSDT', qty_step=0.1, min_qty=0.1).round_qty(12.77) == 12.7
+    assert StrategyKernel(symbol='SOLUSDT').execution.qty_step == 1
+
+def test_fill_price_moves_against_the_order():
+    # Half the 2 bps spread plus 1 bp slippage
+    assert MODEL.fill_price('BUY', 10000.0) == pytest.approx(10002.0)
+    assert MODEL.fill_price('SELL', 10000.0) == pytest.approx(9998.0)
+    assert np.allclose(MODEL.fill_price(np.array(['BUY', 'SELL']), np.array([100.0, 200.0])), [100.02, 199.96])
+
+def test_parse_spot_fills():
+    response = {'executedQty': '0.003', 'fills': [
+        {'price': '40000', 'qty': '0.001', 'commission': '0.04', 'commissionAsset': 'USDT'},
+        {'price': '40010', 'qty': '0.002', 'commission': '0.08', 'commissionAsset': 'USDT'}]}
+    fill = parse_fill(response, 'BUY', 39990.0, 0.003, 'BTCUSDT', latency=0.05, model=MODEL)
+    assert fill.price == pytest.approx((40000 * 0.001 + 40010 * 0.002) / 0.003)
+    assert fill.quantity == pytest.approx(0.003)
+    assert fill.fee == pytest.approx(0.12)
+    assert (fill.quote, fill.latency) == (39990.0, 0.05)
+
+def test_parse_futures_average_price():
+    response = {'executedQty': '0.003', 'avgPrice': '40005.5', 'cummulativeQuoteQty': '0'}
+    fill = parse_fill(response, 'SELL', 40000.0, 0.003, 'BTCUSDT', model=MODEL)
+    assert fill.price == 40005.5
+    assert fill.fee == pytest.approx(40005.5 * 0.003 * 0.001)  # Not reported: model fee
+
+def test_parse_commission_in_the_base_asset():
+    response = {'executedQty': '0.002', 'fills': [
+        {'price': '40000', 'qty': '0.002', 'commission': '0.000002', 'commissionAsset': 'BTC'}]}
+    fill = parse_fill(response, 'BUY', 40000.0, 0.002, 'BTCUSDT', model=MODEL)
+    assert fill.fee == pytest.approx(0.000002 * 40000)
+
+def test_parse_commission_in_bnb_falls_back_to_the_model_fee():
+    response = {'executedQty': '0.002', 'fills': [
+        {'price': '40000', 'qty': '0.002', 'commission': '0.0001', 'commissionAsset': 'BNB'}]}
+    fill = parse_fill(response, 'BUY', 40000.0, 0.002, 'BTCUSDT', model=MODEL)
+    assert fill.price == 40000.0
+    assert fill.fee == pytest.approx(40000 * 0.002 * 0.001)
@@ -0,0 +1,99 @@
+# tests/test_http_client.py
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+import pytest
+import requests
+import http_client
+from http_client import WEIGHT_HEADER, HttpSession
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers each request with the next (status, headers) of the server's script."""
+
+    def do_GET(self):
+        self.reply()
+
+    def do_POST(self):
+        self.reply()
+
+    def reply(self):
+        self.server.requests.append(self.command)
+        status, headers = self.server.script.pop(0) if self.server.script else (200, {})
+        body = json.dumps({'status': status}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+    httpd.script, httpd.requests = [], []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Replaces the client's clock: sleeping is recorded and moves time forward instantly."""
+    clock = SimpleNamespace(now=0.0, sleeps=[])
+
+    def sleep(seconds):
+        clock.sleeps.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(http_client, 'time', SimpleNamespace(
+        monotonic=lambda: clock.now, perf_counter=lambda: clock.now, sleep=sleep))
+    return clock.sleeps
+
+def session_for(server, **kwargs):
+    return HttpSession(f"http://127.0.0.1:{server.server_port}", **kwargs)
+
+def test_get_is_retried_with_backoff(server, sleeps):
+    server.script = [(503, {}), (503, {}), (200, {})]
+    session = session_for(server, backoff=0.5)
+    assert session.get('/api/v3/time') == {'status': 200}
+    assert server.requests == ['GET'] * 3
+    assert len(sleeps) == 2
+    assert all(0 <= s <= 0.5 * 2 ** attempt for attempt, s in enumerate(sleeps))
+
+def test_rate_limit_waits_for_retry_after(server, sleeps):
+    server.script = [(429, {'Retry-After': '2'}), (200, {})]
+    session = session_for(server, weight_limit=1200)
+    assert session.get('/api/v3/klines') == {'status': 200}
+    assert server.requests == ['GET'] * 2
+    # Drained bucket: the retry waits the 2 s plus the refill of its own weight
+    assert sleeps == [pytest.approx(2 + 1 / 20)]
+
+def test_post_is_not_retried_on_server_error(server, sleeps):
+    server.script = [(500, {}), (200, {})]
+    session = session_for(server)
+    with pytest.raises(requests.HTTPError):
+        session.post('/api/v3/order', params={'side': 'BUY'})
+    assert server.requests == ['POST']
+    assert sleeps == []
+
+def test_post_is_retried_when_rate_limited(server, sleeps):
+    server.script = [(429, {'Retry-After': '1'}), (200, {})]
+    session = session_for(server)
+    assert session.post('/api/v3/order', params={'side': 'BUY'}) == {'status': 200}
+    assert server.requests == ['POST'] * 2
+
+def test_bucket_follows_used_weight_header(server, sleeps):
+    server.script = [(200, {WEIGHT_HEADER: '1195'})]
+    session = session_for(server, weight_limit=1200)
+    session.get('/api/v3/depth', weight=1)
+    assert session.limiter.tokens == pytest.approx(5)
+
+    # The next request of weight 10 waits for the missing 5 (capacity 1200/min = 20/s)
+    session.get('/api/v3/depth', weight=10)
+    assert sleeps == [pytest.approx(5 / 20)]
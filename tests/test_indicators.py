@@ -0,0 +1,58 @@
+# tests/test_indicators.py
+import json
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+from configuration import Config
+from indicators import HTF_LAG, IncrementalEMA, IncrementalIndicators
+from utils import calculate_indicators
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Close_1h', f'EMA_{Config.EMA_PERIOD}_1h']
+
+def replay(state, df_5m, df_1h=None):
+    """Feeds the candles one at a time like the live loop, returns the newest row after each 5m candle."""
+    rows = []
+    visible_1h = [] if df_1h is None else df_1h.index + HTF_LAG
+    k = 0 if df_1h is None else int(np.searchsorted(visible_1h, state.last_5m_time, side='right'))
+    for ts, bar in zip(df_5m.index, df_5m[['open', 'high', 'low', 'close']].to_numpy()):
+        while k < len(visible_1h) and visible_1h[k] <= ts:
+            state.update_1h(df_1h.index[k], df_1h['close'].iloc[k])
+            k += 1
+        state.update_5m(ts, *bar)
+        rows.append(state.window()[1][-1])
+    return pd.DataFrame(rows, index=df_5m.index, columns=COLUMNS).dropna()
+
+def test_incremental_ema_matches_ta_ema(candles):
+    _, df_1h = candles
+    ema = IncrementalEMA(Config.EMA_PERIOD)
+    got = np.array([ema.update(c) for c in df_1h['close'].to_numpy()])
+    expected = ta.ema(df_1h['close'], length=Config.EMA_PERIOD).to_numpy()
+    assert np.array_equal(got, expected, equal_nan=True)
+
+def test_incremental_indicators_match_calculate_indicators(candles):
+    df_5m, df_1h = candles
+    expected = calculate_indicators(df_5m, df_1h).dropna()
+    split = len(df_5m) // 2
+    state = IncrementalIndicators.seed(df_5m.iloc[:split], df_1h[df_1h.index + HTF_LAG <= df_5m.index[split - 1]])
+    got = replay(state, df_5m.iloc[split:], df_1h)
+
+    assert len(got) > 0
+    assert np.array_equal(got.to_numpy(), expected.loc[got.index, COLUMNS].to_numpy())
+
+def test_resampled_1h_matches_calculate_indicators(candles):
+    # The 1H candles of the fixture are resampled from its 5m ones
+    df_5m, df_1h = candles
+    expected = calculate_indicators(df_5m, df_1h).dropna()
+    split = len(df_5m) // 2
+    got = replay(IncrementalIndicators.seed(df_5m.iloc[:split]), df_5m.iloc[split:])
+
+    assert np.array_equal(got.to_numpy(), expected.loc[got.index, COLUMNS].to_numpy())
+
+def test_restored_state_continues_identically(candles):
+    df_5m, _ = candles
+    split = len(df_5m) // 2
+    state = IncrementalIndicators.seed(df_5m.iloc[:split])
+    restored = IncrementalIndicators.from_state(json.loads(json.dumps(state.state())))
+    rest = df_5m.iloc[split:]
+
+    assert replay(state, rest).equals(replay(restored, rest))
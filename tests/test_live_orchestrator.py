@@ -0,0 +1,39 @@
+# tests/test_live_orchestrator.py
+import asyncio
+import pandas as pd
+from configuration import Config
+from conftest import synthetic_candles
+from live_orchestrator import LiveOrchestrator
+from live_runner import BinanceClient, state_store
+from mock_exchange import MockExchange
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT']
+
+def test_trades_are_booked_in_replayed_time(state_db):
+    bars = Config.LIVE_HISTORY_LIMIT * 12 + 1000
+    datasets = {s: synthetic_candles(bars, seed=i) for i, s in enumerate(SYMBOLS)}
+    exchange = MockExchange(datasets, speed=3000)
+    url = exchange.start(port=0)
+    try:
+        clock = exchange.clock
+        orchestrator = LiveOrchestrator(BinanceClient(trade_url=url, data_url=url), SYMBOLS,
+                                        clock=clock.time, sleep=clock.async_sleep)
+        asyncio.run(orchestrator.run(cycles=100))
+        end = pd.Timestamp(clock.time(), unit='s')
+    finally:
+        exchange.stop()
+
+    trades = state_store().trades()
+    assert len(trades) > 0
+    entry_times, exit_times = pd.to_datetime(trades['entry_time']), pd.to_datetime(trades['time'])
+    assert (exit_times >= entry_times).all()
+    assert (exit_times <= end).all()
+    start = pd.Timestamp(exchange.clock.start, unit='s')
+    assert (entry_times >= start).all()
+
+    # Live metrics cover the replayed period only
+    for trader in orchestrator.traders.values():
+        assert start <= trader.performance.start <= entry_times.min()
+        summary = trader.performance.summary()
+        if summary['total_trades']:
+            assert 0 <= summary['time_in_market'] <= 1
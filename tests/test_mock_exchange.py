@@ -0,0 +1,70 @@
+# tests/test_mock_exchange.py
+import time
+from urllib.parse import urlencode
+import pytest
+from configuration import Config
+from conftest import synthetic_candles
+from live_runner import BinanceClient
+from mock_exchange import MockExchange, measure_run_live
+
+@pytest.fixture
+def exchange():
+    exchange = MockExchange({'BTCUSDT': synthetic_candles(Config.LIVE_HISTORY_LIMIT * 12 + 100)}, speed=1)
+    exchange.url = exchange.start(port=0)
+    yield exchange
+    exchange.stop()
+
+def signed(exchange, **overrides):
+    params = {'symbol': 'BTCUSDT', 'side': 'BUY', 'type': 'MARKET', 'quantity': '0.01',
+              'timestamp': int(time.time() * 1000), **overrides}
+    payload = urlencode(params)
+    return f"{payload}&signature={exchange.sign(payload)}"
+
+def test_signed_order_is_filled(exchange):
+    client = BinanceClient(trade_url=exchange.url, data_url=exchange.url)
+    quote = exchange.price('BTCUSDT')
+    fill = client.place_order('BUY', 0.01, symbol='BTCUSDT', quote=quote)
+
+    assert fill is not None
+    assert fill.side == 'BUY' and fill.quantity == 0.01
+    assert fill.price == exchange.orders[0]['price']
+    assert fill.fee == pytest.approx(fill.price * 0.01 * exchange.fee_rate)
+    assert exchange.positions == {'BTCUSDT': 0.01}
+
+def test_order_with_wrong_api_key_is_rejected(exchange):
+    status, body = exchange.place_order(signed(exchange), api_key='someone else')
+    assert (status, body['code']) == (401, -2015)
+
+def test_tampered_order_is_rejected(exchange):
+    query = signed(exchange).replace('quantity=0.01', 'quantity=10')
+    status, body = exchange.place_order(query, exchange.api_key)
+    assert (status, body['code']) == (400, -1022)
+
+def test_stale_order_is_rejected(exchange):
+    stale = int(time.time() * 1000) - exchange.RECV_WINDOW_MS - 1000
+    status, body = exchange.place_order(signed(exchange, timestamp=stale), exchange.api_key)
+    assert (status, body['code']) == (400, -1021)
+
+def test_rejected_orders_are_not_filled(exchange, monkeypatch):
+    monkeypatch.setattr(Config, 'API_SECRET', 'not the secret')
+    client = BinanceClient(trade_url=exchange.url, data_url=exchange.url)
+    assert client.place_order('BUY', 0.01, symbol='BTCUSDT') is None
+    assert exchange.orders == [] and exchange.positions == {}
+
+def test_measure_run_live(tmp_path, monkeypatch, state_db):
+    df_5m, df_1h = synthetic_candles(Config.LIVE_HISTORY_LIMIT * 12 + 1000)
+    df_5m.to_csv(tmp_path / '5m.csv')
+    df_1h.to_csv(tmp_path / '1h.csv')
+    monkeypatch.setattr(Config, 'CSV_5M', str(tmp_path / '5m.csv'))
+    monkeypatch.setattr(Config, 'CSV_1H', str(tmp_path / '1h.csv'))
+    monkeypatch.setattr(Config, 'SYMBOL', 'BTCUSDT')
+    monkeypatch.chdir(tmp_path)  # Metrics snapshots
+
+    exchange = measure_run_live(cycles=40, speed=3000)
+    assert exchange.requests > 40 and exchange.orders
+    report = exchange.latency_report()
+    assert report['entries'] == sum(o['entry'] for o in exchange.orders)
+    # Every exit closes the position opened before it
+    for entry, exit in zip(exchange.orders[::2], exchange.orders[1::2]):
+        assert entry['entry'] and not exit['entry']
+        assert entry['side'] != exit['side'] and entry['quantity'] == exit['quantity']
@@ -0,0 +1,22 @@
+# tests/test_monte_carlo.py
+import numpy as np
+import pandas as pd
+import pytest
+from monte_carlo import MonteCarloAnalyzer
+
+def test_no_trades_is_a_clear_error():
+    with pytest.raises(ValueError, match='No trades'):
+        MonteCarloAnalyzer([])
+    with pytest.raises(ValueError, match='No trades'):
+        MonteCarloAnalyzer(pd.DataFrame(columns=['timestamp', 'exit_time', 'pnl']))
+
+def test_shuffle_keeps_final_equity():
+    rng = np.random.default_rng(0)
+    times = pd.date_range('2024-01-01', periods=200, freq='6h')
+    trades = pd.DataFrame({'timestamp': times, 'exit_time': times + pd.Timedelta(hours=1),
+                           'pnl': rng.normal(5, 20, len(times))})
+    analyzer = MonteCarloAnalyzer(trades)
+    results = analyzer.simulate('shuffle', paths=50, batch_size=10, seed=1)
+
+    # Reordering trades changes the path, never the total
+    assert np.allclose(results['final_equity'], analyzer.observed()['final_equity'])
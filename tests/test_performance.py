@@ -0,0 +1,55 @@
+# tests/test_performance.py
+import numpy as np
+import pandas as pd
+import pytest
+from performance import LiveMetrics, PerformanceReport
+
+def trade(day, pnl):
+    """A trade opened at 10:00 and closed at 12:00 on `day`."""
+    return {'timestamp': pd.Timestamp(f'{day} 10:00'), 'exit_time': pd.Timestamp(f'{day} 12:00'), 'pnl': pnl}
+
+# Equity 1000 -> 1100 -> 880 -> 990 -> 1199, across a month end
+TRADES = [trade('2024-01-30', 100.0), trade('2024-01-31', -220.0),
+          trade('2024-02-01', 110.0), trade('2024-02-02', 209.0)]
+
+def live(trades):
+    metrics = LiveMetrics(1000)
+    for t in trades:
+        metrics.add(t)
+    return metrics
+
+@pytest.mark.parametrize('build', [lambda t: PerformanceReport(t, 1000), live], ids=['report', 'live'])
+def test_summary_of_a_known_trade_list(build):
+    summary = build(TRADES).summary()
+    returns = np.array([880 / 1100, 990 / 880, 1199 / 990]) - 1  # Day over day
+    assert summary['sharpe_ratio'] == pytest.approx(returns.mean() / returns.std(ddof=1) * np.sqrt(365))
+    assert np.isnan(summary['sortino_ratio'])  # A single losing day
+    assert summary['max_drawdown'] == pytest.approx(0.2)  # 1100 -> 880
+    assert summary['max_drawdown_days'] == pytest.approx(3.0)  # Below the peak from Jan 30 to Feb 2, 12:00
+    assert summary['net_profit'] == pytest.approx(199.0)
+    assert summary['win_rate'] == 0.75
+    assert summary['profit_factor'] == pytest.approx(419 / 220)
+    assert summary['time_in_market'] == pytest.approx(4 * 2 / (3 * 24 + 2))
+
+@pytest.mark.parametrize('build', [lambda t: PerformanceReport(t, 1000), live], ids=['report', 'live'])
+def test_monthly_returns(build):
+    monthly = build(TRADES).monthly_returns()
+    assert list(monthly.index.astype(str)) == ['2024-01', '2024-02']
+    assert monthly.to_numpy() == pytest.approx([-120 / 1000, 319 / 880])
+
+def test_unrecovered_drawdown_runs_to_the_period_end():
+    report = PerformanceReport(TRADES[:2], 1000, end=pd.Timestamp('2024-02-05 12:00'))
+    assert report.drawdown() == pytest.approx((0.2, 6.0))
+
+@pytest.mark.parametrize('trades', [TRADES[:1], TRADES[:2]], ids=['1 day', '2 days'])
+def test_ratios_need_two_returns(trades):
+    # One day has no return, two days have one: no standard deviation
+    for metrics in (PerformanceReport(trades, 1000), live(trades)):
+        summary = metrics.summary()
+        assert np.isnan(summary['sharpe_ratio']) and np.isnan(summary['sortino_ratio'])
+
+def test_no_trades():
+    summary = PerformanceReport([], 1000).summary()
+    assert summary['total_trades'] == 0 and summary['max_drawdown'] == 0.0
+    assert np.isnan(summary['sharpe_ratio'])
+    assert live([]).summary() == pytest.approx(summary, nan_ok=True)
@@ -0,0 +1,36 @@
+# tests/test_portfolio_backtester.py
+import logging
+import pandas as pd
+from backtest_runner import CustomBacktester
+from conftest import synthetic_candles
+from portfolio_backtester import PortfolioBacktester
+from utils import calculate_indicators
+
+logging.getLogger('CustomBacktest').disabled = True
+
+def test_single_symbol_portfolio_matches_backtester(candles):
+    data = calculate_indicators(*candles).dropna()
+    single = CustomBacktester(data)
+    single.run(save=False)
+    portfolio = PortfolioBacktester({'BTCUSDT': data})
+    portfolio.run(save=False)
+
+    assert len(single.trades) > 0
+    pd.testing.assert_frame_equal(pd.DataFrame(portfolio.trades), pd.DataFrame(single.trades), check_exact=True)
+    assert portfolio.skipped_trades == single.skipped_trades
+
+def test_open_positions_never_exceed_capital():
+    datasets = {s: calculate_indicators(*synthetic_candles(3000, seed=i, price=p)).dropna()
+                for i, (s, p) in enumerate([('BTCUSDT', 40000.0), ('ETHUSDT', 2000.0), ('SOLUSDT', 100.0)])}
+    engine = PortfolioBacktester(datasets, max_positions=2)
+    engine.run(save=False)
+
+    trades = pd.DataFrame(engine.trades)
+    assert trades['symbol'].nunique() == 3
+    # At every entry, the open positions (exits on the entry bar included) fit in the capital booked so far
+    for entry in trades['timestamp']:
+        open_trades = trades[(trades['timestamp'] <= entry) & (trades['exit_time'] >= entry)]
+        closed = trades[trades['exit_time'] < entry]
+        capital = engine.initial_capital + closed['pnl'].sum()
+        assert len(open_trades) <= 2
+        assert (open_trades['entry_price'] * open_trades['size']).sum() <= capital
@@ -0,0 +1,56 @@
+# tests/test_resampler.py
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import synthetic_candles
+from resampler import CandleResampler, resample_ohlcv
+
+OHLCV = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+@pytest.fixture
+def gapped():
+    """5m candles starting mid-hour, with a 3-hour outage and a partial hour (last candle missing)."""
+    df_5m, _ = synthetic_candles(3000)
+    outage = (df_5m.index >= '2024-01-03 10:00') & (df_5m.index < '2024-01-03 13:00')
+    partial = df_5m.index == '2024-01-04 07:55'
+    return df_5m[~outage & ~partial].iloc[2:]  # From 00:10
+
+def finished_pandas(df, interval):
+    """pandas resample of the complete buckets: no empty ones, none the data starts or ends inside."""
+    expected = df.resample(interval).agg(OHLCV).dropna()
+    step, base = pd.Timedelta(interval), pd.Timedelta(minutes=5)
+    return expected[(expected.index >= df.index[0]) & (expected.index + step <= df.index[-1] + base)]
+
+@pytest.mark.parametrize('interval', ['1h', '4h'])
+def test_matches_pandas_resample(gapped, interval):
+    got = resample_ohlcv(gapped, interval, '5m')
+    expected = finished_pandas(gapped, interval)
+    assert got.index[0] > gapped.index[0]  # The bucket started mid-way is dropped
+    assert pd.Timestamp('2024-01-03 11:00') not in got.index  # No candle for the outage
+    pd.testing.assert_frame_equal(got, expected, check_freq=False, check_index_type=False)
+
+def test_streaming_emits_only_completed_bars(gapped):
+    resampler = CandleResampler(['1h', '4h'], '5m')
+    emitted = {'1h': [], '4h': []}
+    for ts, row in zip(gapped.index, gapped[list(OHLCV)].to_numpy()):
+        for interval, bar in resampler.update(ts, *row):
+            # Finished by its last 5m candle, or by the first one past its close
+            assert ts + pd.Timedelta(minutes=5) >= bar[0] + pd.Timedelta(interval)
+            emitted[interval].append(bar)
+
+    for interval, bars in emitted.items():
+        got = pd.DataFrame([b[1:] for b in bars], columns=list(OHLCV),
+                           index=pd.DatetimeIndex([b[0] for b in bars], name='timestamp'))
+        expected = resample_ohlcv(gapped, interval, '5m')
+        # The batch version knows the partial hour is complete as soon as the data moves past it
+        pd.testing.assert_frame_equal(got, expected, check_index_type=False)
+
+def test_bar_is_held_until_its_last_candle():
+    df_5m, _ = synthetic_candles(12)
+    resampler = CandleResampler(['1h'], '5m')
+    rows = df_5m[list(OHLCV)].to_numpy()
+    for ts, row in zip(df_5m.index[:-1], rows[:-1]):
+        assert resampler.update(ts, *row) == []
+    [(interval, bar)] = resampler.update(df_5m.index[-1], *rows[-1])
+    assert bar[0] == df_5m.index[0]
+    assert np.allclose(bar[1:], [rows[0, 0], rows[:, 1].max(), rows[:, 2].min(), rows[-1, 3], rows[:, 4].sum()])
@@ -0,0 +1,63 @@
+# tests/test_state_store.py
+import logging
+import pandas as pd
+import pytest
+from indicators import IncrementalIndicators
+from live_runner import state_store
+from strategy_kernel import StrategyKernel
+
+QUIET = logging.getLogger('StateStoreTest')
+QUIET.disabled = True
+
+def open_kernel():
+    kernel = StrategyKernel(10000, symbol='BTCUSDT', logger=QUIET)
+    kernel.commit(kernel.prepare(pd.Timestamp('2024-01-01 10:05'), 'BUY', 40000.0, 39800.0, 40400.0))
+    return kernel
+
+def test_kernel_round_trip_keeps_the_open_position(state_db):
+    kernel = open_kernel()
+    kernel.skipped = 3
+    state_store().save_kernel(kernel)
+
+    restored = StrategyKernel(10000, symbol='BTCUSDT', logger=QUIET)
+    assert state_store().restore_kernel(restored)
+    assert (restored.capital, restored.skipped) == (kernel.capital, 3)
+    for field in ('entry_time', 'symbol', 'type', 'entry', 'sl', 'tp', 'size', 'quote', 'fee', 'latency'):
+        assert getattr(restored.position, field) == getattr(kernel.position, field), field
+
+def test_unknown_symbol_is_not_restored(state_db):
+    kernel = StrategyKernel(10000, symbol='ETHUSDT', logger=QUIET)
+    assert not state_store().restore_kernel(kernel)
+    assert kernel.position is None and kernel.capital == 10000
+
+def test_indicator_round_trip(state_db, candles):
+    df_5m, _ = candles
+    indicators = IncrementalIndicators.seed(df_5m.iloc[:1000])
+    state_store().save_indicators('BTCUSDT', indicators)
+
+    restored = state_store().load_indicators('BTCUSDT')
+    assert restored.state() == indicators.state()
+    assert restored.last_5m_time == indicators.last_5m_time
+    assert state_store().load_indicators('ETHUSDT') is None
+
+def test_record_exit_is_atomic(state_db):
+    kernel = open_kernel()
+    state_store().save_kernel(kernel)
+    record = kernel.close(pd.Timestamp('2024-01-01 11:00'), 'TP', 40400.0)
+
+    # The trade row is inserted, then storing the kernel fails: neither may persist
+    kernel.skipped = ['not', 'storable']
+    with pytest.raises(Exception):
+        state_store().record_exit(kernel, record)
+    assert state_store().trades().empty
+    restored = StrategyKernel(10000, symbol='BTCUSDT', logger=QUIET)
+    state_store().restore_kernel(restored)
+    assert restored.position is not None and restored.capital == 10000
+
+    kernel.skipped = 0
+    state_store().record_exit(kernel, record, entry_latency=0.01, exit_latency=0.02)
+    trades = state_store().trades()
+    assert len(trades) == 1 and trades['pnl'].iloc[0] == record['pnl']
+    restored = StrategyKernel(10000, symbol='BTCUSDT', logger=QUIET)
+    state_store().restore_kernel(restored)
+    assert restored.position is None and restored.capital == kernel.capital
@@ -0,0 +1,71 @@
+# tests/test_strategy_kernel.py
+import logging
+import pandas as pd
+import pytest
+from backtest_runner import CustomBacktester
+from configuration import Config
+from indicators import HTF_LAG, IncrementalIndicators
+from strategy_kernel import StrategyKernel
+from utils import calculate_indicators
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Close_1h', f'EMA_{Config.EMA_PERIOD}_1h']
+QUIET = logging.getLogger('KernelParity')
+QUIET.disabled = True
+
+@pytest.fixture
+def data(candles):
+    df_5m, df_1h = candles
+    return calculate_indicators(df_5m, df_1h).dropna()
+
+def batch_trades(data):
+    trades = []
+    StrategyKernel(logger=QUIET, on_trade=trades.append).run_batch(
+        data.index, *(data[c].to_numpy() for c in COLUMNS))
+    return trades
+
+def assert_same_trades(got, expected):
+    assert len(got) == len(expected)
+    got, expected = pd.DataFrame(got), pd.DataFrame(expected)
+    assert list(got.columns) == list(expected.columns)
+    for column in expected.columns:
+        pd.testing.assert_series_equal(got[column], expected[column], check_exact=True, obj=column)
+
+def test_batch_path_has_trades(data):
+    trades = batch_trades(data)
+    assert len(trades) > 10
+    assert {t['reason'] for t in trades} == {'SL', 'TP'}
+
+def test_backtester_matches_kernel_batch(data):
+    engine = CustomBacktester(data)
+    engine.kernel.logger = QUIET
+    engine.run(save=False)
+    assert_same_trades(engine.trades, batch_trades(data))
+
+def test_per_bar_path_matches_batch(data):
+    trades = []
+    kernel = StrategyKernel(logger=QUIET, on_trade=trades.append)
+    for ts, row in zip(data.index, data[COLUMNS].to_numpy()):
+        kernel.on_bar(ts, *row)
+    assert_same_trades(trades, batch_trades(data))
+
+def test_live_replay_matches_batch(candles, data):
+    # IncrementalIndicators fed one closed candle at a time, like run_live
+    df_5m, df_1h = candles
+    trades = []
+    kernel = StrategyKernel(logger=QUIET, on_trade=trades.append)
+    state = IncrementalIndicators()
+    opens, highs, lows, closes = (df_5m[c].to_numpy(dtype=float) for c in ('open', 'high', 'low', 'close'))
+    times_1h, closes_1h = df_1h.index, df_1h['close'].to_numpy(dtype=float)
+    first_bar = data.index[2]  # The batch path needs 2 candles of history inside `data`
+    k = 0
+    for i, ts in enumerate(df_5m.index):
+        # The candle that just opened is traded on what the indicators know so far
+        if ts >= first_bar and state.ready:
+            kernel.on_open(ts, opens[i], state.signal_inputs(opens[i]))
+            kernel.on_range(ts, lows[i], highs[i])
+        while k < len(times_1h) and times_1h[k] + HTF_LAG <= ts:  # 1H candles closed with this one
+            state.update_1h(times_1h[k], closes_1h[k])
+            k += 1
+        state.update_5m(ts, opens[i], highs[i], lows[i], closes[i])
+
+    assert_same_trades(trades, batch_trades(data))
@@ -0,0 +1,68 @@
+# tests/test_stream_runner.py
+import asyncio
+import pandas as pd
+from conftest import synthetic_candles
+from execution import Fill
+from indicators import IncrementalIndicators
+from live_runner import state_store
+from stream_runner import StreamTrader
+from ws_replay_server import serve_replay
+
+class FilledAtQuote:
+    """Order client filling every MARKET order at the quoted price."""
+
+    def place_order(self, side, quantity, symbol=None, quote=None):
+        return Fill(side, quote, quote, quantity)
+
+def test_exits_are_booked_at_the_event_time(state_db):
+    df_5m, df_1h = synthetic_candles(3000)
+    split = 1000
+    indicators = IncrementalIndicators.seed(df_5m.iloc[:split])
+    replayed = df_5m.iloc[split:]
+
+    async def run():
+        server = await serve_replay(replayed, df_1h.iloc[:0], port=0, speed=1e7)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            trader = StreamTrader(FilledAtQuote(), indicators, stream_url=f'ws://127.0.0.1:{port}',
+                                  clock=lambda: replayed.index[0].timestamp())
+            await trader.run()
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(run())
+    trades = state_store().trades()
+    assert len(trades) > 0
+    entry_times, exit_times = pd.to_datetime(trades['entry_time']), pd.to_datetime(trades['time'])
+    assert (exit_times >= entry_times).all()
+    assert (entry_times >= replayed.index[0]).all()
+    assert (exit_times <= replayed.index[-1] + pd.Timedelta(minutes=5)).all()
+
+def kline(ts, row, interval='5m'):
+    """A closed kline stream payload for the candle opened at `ts`."""
+    return {'t': ts.value // 10**6, 'i': interval, 'x': True,
+            'o': row['open'], 'h': row['high'], 'l': row['low'], 'c': row['close']}
+
+def test_candle_closing_before_the_pending_one_is_flushed_keeps_both(state_db, monkeypatch):
+    monkeypatch.setattr('stream_runner.Config.RESAMPLE_LIVE', False)
+    df_5m, _ = synthetic_candles(3000)
+    split = 1007  # The next candle opens at HH:55 and closes the hour
+    indicators = IncrementalIndicators.seed(df_5m.iloc[:split])
+    pushed = []
+    update_5m = indicators.update_5m
+    monkeypatch.setattr(indicators, 'update_5m', lambda ts, *ohlc: (pushed.append(ts), update_5m(ts, *ohlc)))
+    (hour_close, row), (next_open, next_row) = df_5m.iloc[split:split + 2].iterrows()
+    assert hour_close.minute == 55
+
+    async def run():
+        trader = StreamTrader(FilledAtQuote(), indicators, hour_close_timeout=60,
+                              clock=lambda: next_open.timestamp())
+        await trader.on_kline(kline(hour_close, row))  # Waits for the 1H close event
+        assert pushed == []
+        await trader.on_kline(kline(next_open, next_row))  # The 1H event is late
+        await trader.on_kline(kline(hour_close, row))  # Replayed after a reconnect
+        await trader._flush_pending()
+
+    asyncio.run(run())
+    assert pushed == [hour_close, next_open]
@@ -0,0 +1,54 @@
+# tests/test_sweep_runner.py
+import logging
+from multiprocessing import shared_memory
+import pytest
+import sweep_runner
+from backtest_runner import CustomBacktester
+from sweep_runner import run_sweep
+from utils import calculate_indicators
+
+logging.getLogger('CustomBacktest').disabled = True
+
+@pytest.fixture
+def shared_names(monkeypatch):
+    """Names of the SharedMemory blocks run_sweep creates."""
+    names = []
+    share_arrays = sweep_runner._share_arrays
+
+    def recorded(arrays):
+        blocks, specs = share_arrays(arrays)
+        names.extend(shm.name for shm in blocks)
+        return blocks, specs
+
+    monkeypatch.setattr(sweep_runner, '_share_arrays', recorded)
+    return names
+
+def assert_unlinked(names):
+    assert names
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+def _failing_task(params):
+    raise RuntimeError("backtest failed")
+
+def test_sweep_matches_direct_backtests(candles, tmp_path, shared_names):
+    df_5m, df_1h = candles
+    results = run_sweep(df_5m, df_1h, [10, 21], [1.5, 2.0], [0.001], output_file=str(tmp_path / 'sweep.csv'),
+                        workers=2)
+    assert len(results) == 4
+    for row in results.to_dict('records'):
+        engine = CustomBacktester(calculate_indicators(df_5m, df_1h, row['ema_period']).dropna(),
+                                  ema_period=row['ema_period'], rr_ratio=row['rr_ratio'],
+                                  risk_per_trade=row['risk_per_trade'])
+        expected = engine.run(save=False)
+        assert expected['total_trades'] > 0
+        for key in ('total_trades', 'final_balance', 'max_drawdown', 'sharpe_ratio'):
+            assert row[key] == expected[key], key
+    assert_unlinked(shared_names)
+
+def test_shared_memory_is_released_when_a_run_fails(candles, tmp_path, shared_names, monkeypatch):
+    monkeypatch.setattr(sweep_runner, '_run_task', _failing_task)
+    with pytest.raises(RuntimeError):
+        run_sweep(*candles, [21], [1.5], [0.001], output_file=str(tmp_path / 'sweep.csv'), workers=1)
+    assert_unlinked(shared_names)
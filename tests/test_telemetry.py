@@ -0,0 +1,47 @@
+# tests/test_telemetry.py
+import json
+import urllib.error
+import urllib.request
+import pytest
+from telemetry import Telemetry
+
+def test_snapshot_summarises_spans_counters_and_gauges(tmp_path):
+    telemetry = Telemetry()
+    for _ in range(3):
+        with telemetry.span('cycle'):
+            pass
+    with pytest.raises(ValueError):
+        with telemetry.span('cycle'):
+            raise ValueError('failed phase')
+    telemetry.observe('decision_lag', 0.25)
+    telemetry.incr('signals')
+    telemetry.incr('signals', 2)
+    telemetry.gauge('balance', 1000.5)
+
+    snapshot = telemetry.snapshot()
+    assert snapshot['spans']['cycle']['count'] == 4 and snapshot['spans']['cycle']['errors'] == 1
+    assert snapshot['spans']['decision_lag']['p50_ms'] == pytest.approx(250)
+    assert snapshot['counters'] == {'signals': 3}
+    assert snapshot['gauges'] == {'balance': 1000.5}
+    assert snapshot['uptime_s'] >= 0
+
+    path = tmp_path / 'metrics.json'
+    telemetry.write_snapshot(str(path))
+    assert json.loads(path.read_text())['counters'] == {'signals': 3}
+    assert not (tmp_path / 'metrics.json.tmp').exists()
+
+def test_metrics_endpoint_serves_the_snapshot():
+    telemetry = Telemetry()
+    telemetry.incr('orders')
+    server = telemetry.serve(port=0)
+    base = f'http://127.0.0.1:{server.server_port}'
+    try:
+        with urllib.request.urlopen(f'{base}/metrics', timeout=5) as response:
+            assert response.headers['Content-Type'] == 'application/json'
+            assert json.load(response)['counters'] == {'orders': 1}
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f'{base}/other', timeout=5)
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,45 @@
+# tests/test_utils.py
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from utils import log_synchronously, setup_logger
+
+LINES = 200
+
+def _log_lines(args):
+    log_file, task = args
+    logger = setup_logger('PoolWorker', log_file=log_file)
+    for line in range(LINES):
+        logger.info(f"task {task} line {line}")
+    return task
+
+def test_pool_workers_lose_no_log_records(tmp_path):
+    log_file = str(tmp_path / 'workers.log')
+    setup_logger('PoolWorker', log_file=log_file)
+    with ProcessPoolExecutor(4, initializer=log_synchronously) as pool:
+        list(pool.map(_log_lines, [(log_file, task) for task in range(8)]))
+
+    with open(log_file) as f:
+        assert sum(1 for _ in f) == 8 * LINES
+
+def _log_in_child(log_file):
+    log_synchronously()
+    setup_logger('ForkChild', log_file=log_file).info("child")
+
+def test_forked_child_leaves_the_parent_writer_running(tmp_path):
+    log_file = str(tmp_path / 'parent.log')
+    logger = setup_logger('ForkParent', log_file=log_file)
+    child = multiprocessing.get_context('fork').Process(target=_log_in_child, args=(log_file,))
+    child.start()
+    child.join()
+    assert child.exitcode == 0
+
+    logger.info("parent")
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with open(log_file) as f:
+            messages = sorted(line.rsplit(' - ', 1)[-1].strip() for line in f)
+        if len(messages) == 2:
+            break
+        time.sleep(0.01)
+    assert messages == ['child', 'parent']
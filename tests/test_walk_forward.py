@@ -0,0 +1,56 @@
+# tests/test_walk_forward.py
+import logging
+import numpy as np
+import pandas as pd
+import pytest
+from backtest_runner import CustomBacktester
+from configuration import Config
+from conftest import synthetic_candles
+from utils import calculate_indicators
+from walk_forward import WalkForwardOptimizer, best_parameters
+
+logging.getLogger('CustomBacktest').disabled = True
+
+@pytest.fixture(scope='module')
+def optimizer():
+    # 12 days: 3-day in-sample windows rolled by 1 day
+    df_5m, df_1h = synthetic_candles(12 * 288)
+    optimizer = WalkForwardOptimizer(df_5m, df_1h, ema_periods=[Config.EMA_PERIOD], rr_ratios=[Config.RR_RATIO],
+                                     in_sample_days=3, out_of_sample_days=1, workers=1)
+    optimizer.run(save=False)
+    return optimizer, df_5m, df_1h
+
+def test_windows_roll_by_the_out_of_sample_length(optimizer):
+    optimizer, df_5m, _ = optimizer
+    windows = optimizer.make_windows()
+    assert len(windows) == 9
+    for is_start, oos_start, oos_end in windows:
+        assert oos_start - is_start == pd.Timedelta(days=3)
+        assert oos_end - oos_start == pd.Timedelta(days=1)
+    for (_, _, previous_end), (is_start, oos_start, _) in zip(windows, windows[1:]):
+        assert oos_start == previous_end
+    assert windows[-1][1] <= df_5m.index[-1]
+
+def test_positions_are_carried_across_window_ends(optimizer):
+    optimizer, df_5m, df_1h = optimizer
+    trades = optimizer.trades
+    ends = [oos_end for _, _, oos_end in optimizer.make_windows()]
+    carried = [t for t in trades if any(t['timestamp'] < end <= t['exit_time'] for end in ends)]
+    assert carried
+    # The next window only enters after the carried exit
+    for previous, trade in zip(trades, trades[1:]):
+        if previous in carried:
+            assert trade['timestamp'] > previous['exit_time']
+
+    # With one parameter set the stitched windows trade like one backtest over the same period
+    data = calculate_indicators(df_5m, df_1h).dropna()
+    engine = CustomBacktester(data[data.index >= optimizer.make_windows()[0][1]])
+    engine.run(save=False)
+    assert [(t['timestamp'], t['exit_time'], t['pnl']) for t in trades] == \
+           [(t['timestamp'], t['exit_time'], t['pnl']) for t in engine.trades[:len(trades)]]
+
+def test_nan_metrics_rank_last():
+    results = [{'ema_period': 10, 'sharpe_ratio': np.nan}, {'ema_period': 21, 'sharpe_ratio': -0.5},
+               {'ema_period': 50, 'sharpe_ratio': np.nan}]
+    assert best_parameters(results, 'sharpe_ratio')['ema_period'] == 21
+    assert best_parameters([results[0], results[2]], 'sharpe_ratio') is None
@@ -1,48 +1,129 @@
 # utils.py
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
+import atexit
 import logging
+import os
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
+from configuration import Config
 
-def setup_logger(name, log_file='system.log'):
-    """Sets up a logger to file and console """
+# Running background writers: log_file -> (queue, listener, pid of the process that started it)
+_LOG_QUEUES = {}
+# log_file -> handlers, once the process logs synchronously (see log_synchronously)
+_SYNC_HANDLERS = None
+_STOP_AT_EXIT = False  # _stop_listeners registered with atexit
+
+class _AsyncHandler(QueueHandler):
+    """Enqueues the record as is (no copy / pre-format): the listener thread formats it."""
+
+    def prepare(self, record):
+        record.msg = record.getMessage()  # Freeze mutable args at call time
+        record.args = None
+        return record
+
+def _make_handlers(log_file):
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
+
     handler = logging.FileHandler(log_file)
     handler.setFormatter(formatter)
-    
+
     console = logging.StreamHandler(sys.stdout)
     console.setFormatter(formatter)
-    
+    return handler, console
+
+def setup_logging(log_file='system.log'):
+    """
+    Starts the background thread that formats and writes the records of
+    `log_file` (once per file; setup_logger calls it) and registers its
+    shutdown at exit, so the queue is drained before the interpreter stops.
+    Returns the queue the loggers enqueue to.
+    """
+    global _STOP_AT_EXIT
+    if log_file in _LOG_QUEUES:
+        return _LOG_QUEUES[log_file][0]
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *_make_handlers(log_file))
+    listener.start()
+    _LOG_QUEUES[log_file] = (log_queue, listener, os.getpid())
+    if not _STOP_AT_EXIT:
+        atexit.register(_stop_listeners)
+        _STOP_AT_EXIT = True
+    return log_queue
+
+def _stop_listeners():
+    """Writes what is queued and stops the writer threads this process started."""
+    for log_file, (_, listener, pid) in list(_LOG_QUEUES.items()):
+        # A forked child holds a copy of its parent's listener, without the thread
+        if pid == os.getpid():
+            listener.stop()
+        del _LOG_QUEUES[log_file]
+
+def log_synchronously():
+    """
+    Makes this process write its log records itself, without the listener
+    threads. Forked processes do not inherit the threads, so process pool
+    workers call it from their initializer (they also exit with os._exit,
+    where atexit never runs).
+    """
+    global _SYNC_HANDLERS
+    _SYNC_HANDLERS = {}
+    running = list(_LOG_QUEUES.items())
+    _stop_listeners()
+    for log_file, (log_queue, listener, _) in running:
+        _SYNC_HANDLERS[log_file] = listener.handlers
+        for logger in logging.Logger.manager.loggerDict.values():
+            for handler in list(getattr(logger, 'handlers', ())):
+                if isinstance(handler, QueueHandler) and handler.queue is log_queue:
+                    logger.removeHandler(handler)
+                    for target in listener.handlers:
+                        logger.addHandler(target)
+
+def setup_logger(name, log_file='system.log'):
+    """
+    Sets up a logger to file and console.
+    The caller only enqueues the record; a background listener thread does
+    the formatting and the file / console I/O, so logging never blocks the
+    trading or backtest loop.
+    """
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
-    logger.addHandler(handler)
-    logger.addHandler(console)
+    if _SYNC_HANDLERS is not None:
+        if log_file not in _SYNC_HANDLERS:
+            _SYNC_HANDLERS[log_file] = _make_handlers(log_file)
+        if not logger.handlers:
+            for handler in _SYNC_HANDLERS[log_file]:
+                logger.addHandler(handler)
+        return logger
+
+    log_queue = setup_logging(log_file)
+    if not any(isinstance(h, QueueHandler) for h in logger.handlers):
+        logger.addHandler(_AsyncHandler(log_queue))
     return logger
 
-def calculate_indicators(df_5m, df_1h):
+def interval_to_seconds(interval):
+    """Converts a Binance interval string ('5m', '1h', '1d', ...) to seconds."""
+    units = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+    return int(interval[:-1]) * units[interval[-1].lower()]
+
+def calculate_ema(closes, period=None):
+    """EMA used by the 1H trend filter. Returns a numpy array."""
+    import pandas_ta as ta  # Slow to import: only loaded when an EMA is actually computed
+    if period is None: period = Config.EMA_PERIOD
+    return ta.ema(pd.Series(closes, dtype=float), length=period).to_numpy()
+
+def calculate_indicators(df_5m, df_1h, ema_period=None):
     """
-    Calculates EMA on 1H data and merges it onto 5M data.
+    Calculates EMA on 1H data and aligns it onto 5M data.
     Ensures 'Single Source of Truth' for data processing.
+    The EMA column is named EMA_<period>_1h (EMA_21_1h by default).
+    Every 5m row only sees 1H candles closed by its own close, like
+    live trading (see alignment.TimeframeAligner for more timeframes).
     """
-
-    df_1h = df_1h.rename(columns= {'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close'})
-    df_5m = df_5m.rename(columns= {'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close'})
-    # Calculate EMA on 1H data
-    df_1h['EMA_21'] = ta.ema(df_1h['Close'], length=21)
-    
-    # Rename columns to avoid collision during merge
-    df_1h_renamed = df_1h[['Close', 'EMA_21']].rename(
-        columns={'Close': 'Close_1h', 'EMA_21': 'EMA_21_1h'}
-    )
-    
-    # Merge 1H data onto 5m data
-    # We forward fill the 1H data to align with 5m timestamps
-    # This simulates the "Wait until next 1hr candle closes" logic
-    df_merged = df_5m.merge(df_1h_renamed, left_index=True, right_index=True, how='left')
-    df_merged[['Close_1h', 'EMA_21_1h']] = df_merged[['Close_1h', 'EMA_21_1h']].ffill()
-    
-    return df_merged
+    from alignment import ALIGNER  # alignment imports utils
+    if ema_period is None: ema_period = Config.EMA_PERIOD
+    return ALIGNER.align(df_5m, {Config.TF_FILTER: df_1h}, {Config.TF_FILTER: [('EMA', ema_period)]})
 
 def check_engulfing(open_curr, close_curr, open_prev, close_prev, direction):
     """
@@ -61,4 +142,25 @@ def check_engulfing(open_curr, close_curr, open_prev, close_prev, direction):
             # Body Engulfs Body
             if close_curr < open_prev and open_curr >= close_prev:
                 return True
-    return False
\ No newline at end of file
+    return False
+
+def check_engulfing_batch(opens, closes, direction):
+    """
+    Vectorized version of check_engulfing over whole arrays.
+    Element i compares candle i (current) against candle i-1 (previous).
+    Element 0 has no previous candle and is always False.
+    Time runs along axis 0, so (bars, symbols) arrays work too.
+    """
+    mask = np.zeros(np.shape(closes), dtype=bool)
+    open_curr, close_curr = opens[1:], closes[1:]
+    open_prev, close_prev = opens[:-1], closes[:-1]
+
+    if direction == 'BULLISH':
+        # Previous Red, Current Green, Body Engulfs Body
+        mask[1:] = ((close_prev < open_prev) & (close_curr > open_curr) &
+                    (close_curr > open_prev) & (open_curr <= close_prev))
+    elif direction == 'BEARISH':
+        # Previous Green, Current Red, Body Engulfs Body
+        mask[1:] = ((close_prev > open_prev) & (close_curr < open_curr) &
+                    (close_curr < open_prev) & (open_curr >= close_prev))
+    return mask
@@ -0,0 +1,258 @@
+# walk_forward.py
+import hashlib
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from configuration import Config
+from strategy import BiTimeframeStrategy
+from backtest_runner import CustomBacktester
+from candle_store import load_candles
+from sweep_runner import align_1h, load_sweep_arrays
+from utils import calculate_ema, check_engulfing_batch, interval_to_seconds, log_synchronously, setup_logger
+
+logger = setup_logger('WalkForward')
+
+# Worker side cache (set by _init_worker)
+_CACHE = None
+
+class IndicatorCache:
+    """
+    Memoized indicator arrays for one 5m + 1H dataset, keyed by
+    (name, parameters, data hash). Every EMA series, engulfing mask and
+    signal array is computed once for the whole history; windows and trials
+    only take slices of them.
+    """
+
+    def __init__(self, df_5m, df_1h):
+        self.arrays = load_sweep_arrays(df_5m, df_1h)
+        self.data_hash = self.digest(*self.arrays.values())
+        self._memo = {}
+
+    @staticmethod
+    def digest(*arrays):
+        h = hashlib.blake2b(digest_size=16)
+        for arr in arrays:
+            h.update(np.ascontiguousarray(arr).view(np.uint8))
+        return h.hexdigest()
+
+    def _cached(self, key, build):
+        key = key + (self.data_hash,)
+        if key not in self._memo:
+            self._memo[key] = build()
+        return self._memo[key]
+
+    def ema(self, period):
+        """1H EMA of the 1H closes."""
+        return self._cached(('ema', period), lambda: calculate_ema(self.arrays['close_1h'], period))
+
+    def bars(self, period):
+        """
+        The calculate_indicators(...).dropna() rows for one EMA period as arrays:
+        (timestamps, opens, highs, lows, closes, closes_1h, emas_1h).
+        """
+        def build():
+            arr = self.arrays
+            valid, closes_1h, emas_1h = align_1h(arr, self.ema(period))
+            return (arr['timestamp'][valid], arr['open'][valid], arr['high'][valid], arr['low'][valid],
+                    arr['close'][valid], closes_1h[valid], emas_1h[valid])
+        return self._cached(('bars', period), build)
+
+    def engulfing(self, period):
+        """(BULLISH, BEARISH) check_engulfing_batch masks of the rows of bars(period)."""
+        def build():
+            _, opens, _, _, closes, _, _ = self.bars(period)
+            return (check_engulfing_batch(opens, closes, 'BULLISH'),
+                    check_engulfing_batch(opens, closes, 'BEARISH'))
+        return self._cached(('engulfing', period), build)
+
+    def signals(self, period, rr_ratio):
+        """get_signals_batch over the whole history (element i only looks at bars <= i)."""
+        def build():
+            bars = self.bars(period)[1:]
+            return BiTimeframeStrategy.get_signals_batch(*bars, rr_ratio=rr_ratio,
+                                                         engulfing=self.engulfing(period))
+        return self._cached(('signals', period, rr_ratio), build)
+
+    def window(self, period, rr_ratio, start, end):
+        """Bars and signals of [start, end) for one parameter set."""
+        bars = self.bars(period)
+        lo, hi = np.searchsorted(bars[0], [start, end])
+        timestamps = pd.DatetimeIndex(bars[0][lo:hi], name='timestamp')
+        return (timestamps, *(b[lo:hi] for b in bars[1:])), tuple(s[lo:hi] for s in self.signals(period, rr_ratio))
+
+def _init_worker(cache):
+    global _CACHE
+    _CACHE = cache
+    # One line per trade (and a metrics block per trial) would flood the console
+    logging.getLogger('CustomBacktest').setLevel(logging.ERROR)
+    log_synchronously()  # Nothing is left queued when the worker exits
+
+def _optimize_window(task):
+    """Backtests every parameter set on one in-sample window (inside a worker process)."""
+    start, end, grid, initial_capital, risk_per_trade = task
+    results = []
+    for ema_period, rr_ratio in grid:
+        bars, signals = _CACHE.window(ema_period, rr_ratio, start, end)
+        engine = CustomBacktester(pd.DataFrame(index=bars[0]), initial_capital, ema_period=ema_period,
+                                  rr_ratio=rr_ratio, risk_per_trade=risk_per_trade)
+        if len(bars[0]) > 2:
+            engine.trade_signals(*bars, signals=signals)
+        results.append({'ema_period': ema_period, 'rr_ratio': rr_ratio, **engine.calculate_metrics()})
+    return results
+
+def best_parameters(results, metric):
+    """
+    The in-sample result with the highest `metric`. NaN metrics (no trades,
+    fewer than 2 returns) rank below every number; None if all are NaN.
+    """
+    best = max(results, key=lambda r: -np.inf if pd.isna(r[metric]) else r[metric])
+    return None if pd.isna(best[metric]) else best
+
+class WalkForwardOptimizer(CustomBacktester):
+    """
+    Rolling walk-forward: every in-sample window picks the EMA period / RR
+    ratio with the best `metric`, which then trades the out-of-sample window
+    right after it. The in-sample grids run in parallel across windows; the
+    out-of-sample windows run in order on this backtester's own capital, so
+    self.trades and calculate_metrics() are the stitched out-of-sample result.
+    A position still open at the end of a window runs to its exit, and the
+    next window only enters after that. A window where no parameter set has
+    a valid in-sample metric keeps the previous window's parameters (and is
+    skipped if there are none yet).
+    """
+
+    def __init__(self, df_5m, df_1h, ema_periods=None, rr_ratios=None, in_sample_days=None,
+                 out_of_sample_days=None, metric=None, initial_capital=10000, risk_per_trade=None,
+                 output_file=None, equity_file=None, workers=None):
+        super().__init__(None, initial_capital, risk_per_trade=risk_per_trade,
+                         output_file=output_file or Config.WALK_FORWARD_TRADES)
+        self.cache = IndicatorCache(df_5m, df_1h)
+        self.grid = list(itertools.product(Config.SWEEP_EMA_PERIODS if ema_periods is None else ema_periods,
+                                           Config.SWEEP_RR_RATIOS if rr_ratios is None else rr_ratios))
+        in_sample_days = Config.WALK_FORWARD_IN_SAMPLE_DAYS if in_sample_days is None else in_sample_days
+        out_of_sample_days = Config.WALK_FORWARD_OUT_OF_SAMPLE_DAYS if out_of_sample_days is None else out_of_sample_days
+        self.in_sample = pd.Timedelta(days=in_sample_days)
+        self.out_of_sample = pd.Timedelta(days=out_of_sample_days)
+        self.metric = metric or Config.WALK_FORWARD_METRIC
+        self.equity_file = equity_file or Config.WALK_FORWARD_OUTPUT
+        self.workers = workers
+        self.windows = []
+
+    def make_windows(self):
+        """(in-sample start, out-of-sample start, out-of-sample end) rolled by one out-of-sample length."""
+        times = self.cache.arrays['timestamp']
+        first, last = pd.Timestamp(times[0]), pd.Timestamp(times[-1])
+        windows = []
+        start = first
+        while start + self.in_sample <= last:
+            oos_start = start + self.in_sample
+            windows.append((start, oos_start, oos_start + self.out_of_sample))
+            start += self.out_of_sample
+        return windows
+
+    def run(self, save=True):
+        windows = self.make_windows()
+        if not windows:
+            logger.error("Not enough data for one in-sample window.")
+            return self.calculate_metrics()
+
+        # --- 1. FILL THE CACHE ONCE (workers inherit it) ---
+        for ema_period, rr_ratio in self.grid:
+            self.cache.signals(ema_period, rr_ratio)
+
+        # --- 2. IN-SAMPLE OPTIMIZATION, ONE TASK PER WINDOW ---
+        workers = min(self.workers or os.cpu_count(), len(windows))
+        logger.info(f"Walk-forward: {len(windows)} windows x {len(self.grid)} parameter sets on {workers} workers...")
+        tasks = [(np.datetime64(s), np.datetime64(e), self.grid, self.initial_capital, self.risk_per_trade)
+                 for s, e, _ in windows]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self.cache,)) as pool:
+            in_sample = list(pool.map(_optimize_window, tasks))
+
+        # --- 3. OUT-OF-SAMPLE, IN ORDER ---
+        resume = None  # Entries only after the exit of a position carried over a window end
+        params = None  # Parameters of the last window with a valid in-sample metric
+        for (is_start, oos_start, oos_end), results in zip(windows, in_sample):
+            best = best_parameters(results, self.metric)
+            if best is not None:
+                params = best['ema_period'], best['rr_ratio']
+            elif params is None:
+                logger.warning(f"OOS {oos_start:%Y-%m-%d}: no in-sample {self.metric} for any parameter set, skipped")
+                continue
+            else:
+                logger.warning(f"OOS {oos_start:%Y-%m-%d}: no in-sample {self.metric} for any parameter set, "
+                               f"keeping EMA {params[0]} RR {params[1]}")
+            ema_period, rr_ratio = params
+            in_sample_score = np.nan if best is None else best[self.metric]
+            trades_before = len(self.trades)
+            self.trade_window(ema_period, rr_ratio, max(oos_start, resume or oos_start), oos_end)
+            if self.position is not None:
+                resume = self.finish_position(ema_period, oos_end)
+
+            window_pnl = sum(t['pnl'] for t in self.trades[trades_before:])
+            self.windows.append({
+                'in_sample_start': is_start, 'out_of_sample_start': oos_start, 'out_of_sample_end': oos_end,
+                'ema_period': ema_period, 'rr_ratio': rr_ratio, f'in_sample_{self.metric}': in_sample_score,
+                'trades': len(self.trades) - trades_before, 'pnl': window_pnl,
+            })
+            logger.info(f"OOS {oos_start:%Y-%m-%d} -> {oos_end:%Y-%m-%d}: EMA {ema_period} RR {rr_ratio} "
+                        f"(in-sample {self.metric} {in_sample_score:.2f}) | "
+                        f"{len(self.trades) - trades_before} trades, PnL ${window_pnl:.2f}")
+            if self.position is not None:
+                break  # Still open at the end of the data
+
+        # Metrics over the out-of-sample period only
+        oos_times = self.cache.arrays['timestamp']
+        oos_times = oos_times[(oos_times >= np.datetime64(windows[0][1])) & (oos_times < np.datetime64(windows[-1][2]))]
+        self.data = pd.DataFrame(index=pd.DatetimeIndex(oos_times, name='timestamp'))
+        metrics = self.calculate_metrics()
+        if save:
+            self.save_log()
+            self.save_equity()
+        return metrics
+
+    def trade_window(self, ema_period, rr_ratio, start, end):
+        """Trades [start, end) with one parameter set on the carried capital."""
+        bars, signals = self.cache.window(ema_period, rr_ratio, np.datetime64(start), np.datetime64(end))
+        if len(bars[0]) < 3:
+            return
+        self.ema_period, self.rr_ratio = ema_period, rr_ratio
+        self.kernel.rr_ratio = rr_ratio
+        self.trade_signals(*bars, signals=signals)
+
+    def finish_position(self, ema_period, end):
+        """
+        Runs the exit search of the open position past the window end.
+        Returns the open time of the candle after the exit candle (which is
+        not checked for a setup, like in run_batch), None if it never exits.
+        """
+        timestamps, _, highs, lows = self.cache.bars(ema_period)[:4]
+        start = int(np.searchsorted(timestamps, np.datetime64(end)))
+        exit_index = self.manage_position(pd.DatetimeIndex(timestamps, name='timestamp'), highs, lows, start)
+        if exit_index is None:
+            return None
+        return pd.Timestamp(timestamps[exit_index]) + pd.Timedelta(seconds=interval_to_seconds(Config.TF_ENTRY))
+
+    def equity_curve(self):
+        """Stitched out-of-sample equity at the end of every day."""
+        return (self.initial_capital + self.daily_pnl().cumsum()).rename('equity')
+
+    def save_equity(self):
+        if not self.trades:
+            return
+        self.equity_curve().rename_axis('date').to_csv(self.equity_file)
+        logger.info(f"Saved out-of-sample equity curve to {self.equity_file}")
+
+def run_walk_forward():
+    try:
+        df_5m = load_candles(Config.SYMBOL, Config.TF_ENTRY, Config.CSV_5M)
+        df_1h = load_candles(Config.SYMBOL, Config.TF_FILTER, Config.CSV_1H)
+    except FileNotFoundError:
+        logger.error("Data files not found.")
+        return
+    WalkForwardOptimizer(df_5m, df_1h).run()
+
+if __name__ == "__main__":
+    run_walk_forward()
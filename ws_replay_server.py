@@ -0,0 +1,80 @@
+# ws_replay_server.py
+import asyncio
+import json
+import pandas as pd
+import websockets
+from configuration import Config
+from utils import interval_to_seconds, setup_logger
+
+logger = setup_logger('ReplayServer')
+
+def _kline(symbol, interval, open_time, o, h, l, c, v, closed, event_time):
+    start = int(open_time.timestamp() * 1000)
+    return {
+        'e': 'kline', 'E': event_time, 's': symbol,
+        'k': {'t': start, 'T': start + interval_to_seconds(interval) * 1000 - 1, 's': symbol, 'i': interval,
+              'o': str(o), 'h': str(h), 'l': str(l), 'c': str(c), 'v': str(v), 'x': closed}
+    }
+
+def _message(stream, data):
+    return json.dumps({'stream': stream, 'data': data})
+
+def replay_messages(df_5m, df_1h, symbol=None):
+    """
+    Turns candle history into the message sequence of the Binance combined stream.
+    Each 5m candle yields ticks along open -> low/high -> high/low -> close
+    (bookTicker + open kline updates), then its closed kline, then the closed
+    1H kline when the hour ends. Event times ('E', epoch ms) run through the
+    candle like the ticks do, closed klines are sent at the close.
+    """
+    symbol = symbol or Config.SYMBOL
+    name = symbol.lower()
+    entry, filt = Config.TF_ENTRY, Config.TF_FILTER
+    step = pd.Timedelta(seconds=interval_to_seconds(entry))
+    hour = pd.Timedelta(seconds=interval_to_seconds(filt))
+    df_5m = df_5m.rename(columns=str.capitalize)
+    df_1h = df_1h.rename(columns=str.capitalize)
+
+    for ts, bar in df_5m.iterrows():
+        o, h, l, c, v = bar['Open'], bar['High'], bar['Low'], bar['Close'], bar.get('Volume', 0.0)
+        path = (o, l, h, c) if c >= o else (o, h, l, c)
+        close_time = ts + step
+        close_ms = int(close_time.timestamp() * 1000)
+        for j, price in enumerate(path):
+            event_time = int((ts + step * j / len(path)).timestamp() * 1000)
+            yield _message(f'{name}@bookTicker', {'e': 'bookTicker', 'E': event_time, 's': symbol,
+                                                  'b': str(price), 'a': str(price)})
+            yield _message(f'{name}@kline_{entry}', _kline(symbol, entry, ts, o, h, l, price, v, False, event_time))
+        yield _message(f'{name}@kline_{entry}', _kline(symbol, entry, ts, o, h, l, c, v, True, close_ms))
+
+        hour_start = close_time - hour
+        if close_time.floor(hour) == close_time and hour_start in df_1h.index:
+            row = df_1h.loc[hour_start]
+            yield _message(f'{name}@kline_{filt}', _kline(symbol, filt, hour_start, row['Open'], row['High'],
+                                                          row['Low'], row['Close'], row.get('Volume', 0.0), True, close_ms))
+
+async def serve_replay(df_5m, df_1h, host='127.0.0.1', port=8765, speed=1000.0):
+    """
+    Local fake Binance stream. Every connection replays the candles from the
+    start at `speed` x real time, then closes the socket.
+    """
+    pause = interval_to_seconds(Config.TF_ENTRY) / speed / 9  # 9 messages per 5m candle
+
+    async def handler(ws):
+        logger.info(f"Client connected, replaying {len(df_5m)} candles at {speed:.0f}x")
+        for message in replay_messages(df_5m, df_1h):
+            await ws.send(message)
+            if pause > 0:
+                await asyncio.sleep(pause)
+
+    return await websockets.serve(handler, host, port)
+
+async def _main():
+    df_5m = pd.read_csv(Config.CSV_5M, parse_dates=True, index_col='timestamp')
+    df_1h = pd.read_csv(Config.CSV_1H, parse_dates=True, index_col='timestamp')
+    server = await serve_replay(df_5m, df_1h)
+    logger.info("Replay server listening on ws://127.0.0.1:8765")
+    await server.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run(_main())